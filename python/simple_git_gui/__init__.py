@@ -9,6 +9,13 @@ __author__ = "SimpleGitGUI"
 
 from .config import Config
 from .git_core import GitCore
-from .app import SimpleGitApp, main
 
 __all__ = ['Config', 'GitCore', 'SimpleGitApp', 'main']
+
+
+def __getattr__(name):
+    """按需导入 GUI 部分，使命令行模式在没有 tkinter 的环境中也能使用"""
+    if name in ('SimpleGitApp', 'main'):
+        from . import app
+        return getattr(app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -9,14 +9,42 @@ import tkinter.ttk as ttk
 import tkinter.scrolledtext as scrolledtext
 import tkinter.messagebox as messagebox
 import tkinter.filedialog as filedialog
+import tkinter.simpledialog as simpledialog
 import os
 import platform
+import queue
 import re
-import fnmatch
+import threading
+import time
+from array import array
 
+from .blame import BlameService, BLAME_GUTTER_WIDTH
+from .commit_pipeline import CommitPipeline
 from .config import Config
+from .conflicts import ConflictStore, STAGE_NAMES
+from .exclusions import ExclusionProfileStore, get_matcher, parse_ignore_file
+from .fetch_scheduler import FetchScheduler
+from .frame_scheduler import FrameScheduler
 from .git_core import GitCore
-from .ui_components import OutputPanel, DialogHelper
+from .maintenance import recommend
+from .patch import FileDiff, build_patch
+from .reflog import ReflogTail
+from .status_model import StatusSnapshot
+from .status_tree import StatusTree
+from .file_filter import FilterIndex
+from .file_info import NO_SIZE, format_size
+from .search import SearchService, SCOPE_REF
+from .submodules import SubmoduleScanner, IGNORE_POLICIES
+from .undo_journal import UndoJournal, KIND_EXCLUDE
+from .worktrees import WorktreeManager
+from .ui_components import (
+    OutputPanel, DialogHelper, StatusBar, FilterBar, BlamePanel, SearchPanel, StashPanel, ReflogPanel, MaintenancePanel,
+    ConflictPanel, DiffPanel
+)
+
+
+# 已排除列表中默认规则（Config.STATUS_EXCLUDE_PATTERNS）的显示前缀
+DEFAULT_EXCLUSION_PREFIX = "[默认] "
 
 
 class SimpleGitApp:
@@ -30,8 +58,98 @@ class SimpleGitApp:
         # 初始化 Git 核心
         self.git = GitCore()
         
+        # 后台自动抓取（引用变化时刷新分支列表）
+        self.fetch_scheduler = FetchScheduler(
+            self.git,
+            on_refs_changed=lambda success, stdout, stderr: self.update_branch_info()
+        )
+        
+        # 追溯 (Blame)：计算服务、面板和当前会话
+        self.blame_service = BlameService(self.git)
+        self.blame_panel = None
+        self._blame_session = None
+        
+        # 内容搜索：搜索服务、面板、当前会话及结果行对应的 (路径, 行号)
+        self.search_service = SearchService(self.git)
+        self.search_panel = None
+        self._search_session = None
+        self._search_job = None
+        self._search_matches = []
+        
+        # 差异面板：当前显示的 (路径, 是否已暂存) 及解析后的差异
+        self.diff_panel = None
+        self._diff_target = None
+        self._diff_generation = 0
+        self._file_diff = None
+        
+        # 储藏管理面板及当前显示的储藏列表
+        self.stash_panel = None
+        self._stashes = []
+        
+        # 引用日志面板及其增量读取器（面板打开时按 REFLOG_POLL_MS 检查文件变化）
+        self.reflog_panel = None
+        self._reflog_tail = None
+        self._reflog_repo = None
+        self._reflog_loading = False
+        self._reflog_polled_at = 0.0
+        
+        # 冲突解决面板、当前显示的未合并条目及各阶段内容的读取与缓存
+        self.conflict_panel = None
+        self._conflicts = []
+        self.conflict_store = ConflictStore(self.git)
+        
+        # 仓库体检面板及当前显示的维护建议
+        self.maintenance_panel = None
+        self._maintenance_tasks = []
+        
+        # 链接工作树：管理器及下拉框各项对应的路径
+        self.worktree_manager = WorktreeManager(self.git)
+        self._worktree_paths = []
+        
+        # 提交流水线及“本次跳过钩子”选项（提交成功后复位）
+        self.commit_pipeline = CommitPipeline(self.git)
+        self.commit_no_verify_var = tk.BooleanVar(value=False)
+        
+        # 暂存 / 取消暂存 / 排除操作的撤销日志（按仓库保存）
+        self.undo_journal = UndoJournal(self.git)
+        
+        # 排除配置：按仓库保存到磁盘，切换仓库时加载；默认规则来自 Config
+        self.exclusion_store = ExclusionProfileStore()
+        self._exclusion_profile = None
+        self._default_exclusions = get_matcher(Config.STATUS_EXCLUDE_PATTERNS)
+        
+        # 子模块：并发扫描器（结果按子模块缓存）及当前仓库的 --ignore-submodules 策略
+        self.submodule_scanner = SubmoduleScanner(self.git)
+        self.submodule_policy_var = tk.StringVar(value=Config.SUBMODULE_IGNORE_DEFAULT)
+        
+        # 界面帧调度：后台结果、输出和刷新请求按帧批量应用到控件
+        self.frame_scheduler = FrameScheduler(self.root)
+        
         # 状态标志
         self.pending_refresh = False
+        self.pending_refresh_paths = None  # 仅需局部刷新的路径，None 表示完整刷新
+        self._refresh_scheduled = False
+        self._scheduled_refresh_paths = None  # 已登记的刷新涉及的路径，None 表示完整刷新
+        
+        # 当前状态快照及列表行到快照索引的映射
+        self.status_snapshot = StatusSnapshot()
+        self._status_sizes = None  # 与快照路径表对齐的文件大小（后台统计，None 表示不显示大小）
+        self._list_rows = {}
+        # 后台完整刷新：每次刷新请求递增代数，过期的结果直接丢弃
+        self._status_generation = 0
+        self._status_refreshing = False
+        
+        # 文件列表筛选：列表 -> 筛选索引 / 筛选栏 / 待执行的筛选任务
+        self._filter_indexes = {}
+        self._filter_bars = {}
+        self._filter_jobs = {}
+        # 进行中的分块筛选：列表 -> (FilterSearch, 已插入列表框的行数)
+        self._filter_searches = {}
+        
+        # 目录树视图：列表 -> Treeview / 目录树模型；被排除规则隐藏的未暂存条目
+        self._trees = {}
+        self._tree_models = {}
+        self._hidden_unstaged = array('I')
         
         # 设置主题
         self._setup_theme()
@@ -55,6 +173,10 @@ class SimpleGitApp:
     
     def _build_ui(self):
         """构建用户界面"""
+        # 状态栏（最先打包，保证始终位于窗口底部）
+        self.status_bar = StatusBar(self.root, on_cancel=self.cancel_running_commands)
+        self._status_commands = None
+        
         # 仓库和分支控制框架 (顶部)
         self._build_repo_branch_frame()
         
@@ -62,7 +184,7 @@ class SimpleGitApp:
         self._build_main_frame()
         
         # 命令输出框架 (底部)
-        self.output_panel = OutputPanel(self.root)
+        self.output_panel = OutputPanel(self.root, self.frame_scheduler)
     
     def _build_repo_branch_frame(self):
         """构建仓库和分支控制区域"""
@@ -114,6 +236,17 @@ class SimpleGitApp:
                    command=lambda: self.delete_local_branch(force=True)).pack(side=tk.LEFT, padx=5)
         ttk.Button(delete_frame, text="远程 (origin)", 
                    command=self.delete_remote_branch).pack(side=tk.LEFT, padx=5)
+        
+        # 第 5 行: 工作树
+        ttk.Label(frame, text="工作树:").grid(row=5, column=0, sticky="e", padx=(0, 5), pady=2)
+        self.worktree_combobox = ttk.Combobox(frame, state="readonly", width=45)
+        self.worktree_combobox.grid(row=5, column=1, sticky="ew", padx=5, pady=2)
+        self.worktree_combobox.bind('<<ComboboxSelected>>', lambda e: self.switch_worktree())
+        ttk.Button(frame, text="刷新所有工作树", command=self.refresh_all_worktrees).grid(
+            row=5, column=2, columnspan=2, padx=5, pady=2, sticky="w"
+        )
+        self.worktree_info_var = tk.StringVar(value="")
+        ttk.Label(frame, textvariable=self.worktree_info_var).grid(row=5, column=4, sticky="w", padx=5)
     
     def _build_main_frame(self):
         """构建主框架（状态和操作区域）"""
@@ -145,14 +278,19 @@ class SimpleGitApp:
         
         unstaged_frame = ttk.Frame(status_frame)
         unstaged_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(0, 5))
-        unstaged_frame.rowconfigure(0, weight=1)
+        unstaged_frame.rowconfigure(1, weight=1)
         unstaged_frame.columnconfigure(0, weight=1)
         
         self.unstaged_list = tk.Listbox(unstaged_frame, selectmode=tk.EXTENDED, height=8)
-        self.unstaged_list.grid(row=0, column=0, sticky="nsew")
+        self._filter_bars[self.unstaged_list] = FilterBar(
+            unstaged_frame, lambda: self._schedule_filter(self.unstaged_list)
+        )
+        self.unstaged_list.grid(row=1, column=0, sticky="nsew")
+        self.unstaged_list.bind('<<ListboxSelect>>', lambda e: self._on_file_selected(self.unstaged_list))
         unstaged_scroll = ttk.Scrollbar(unstaged_frame, orient=tk.VERTICAL, command=self.unstaged_list.yview)
-        unstaged_scroll.grid(row=0, column=1, sticky="ns")
+        unstaged_scroll.grid(row=1, column=1, sticky="ns")
         self.unstaged_list['yscrollcommand'] = unstaged_scroll.set
+        self._build_file_tree(unstaged_frame, self.unstaged_list, unstaged_scroll)
         
         # 未暂存操作按钮
         unstaged_buttons = ttk.Frame(status_frame)
@@ -163,6 +301,9 @@ class SimpleGitApp:
         ttk.Button(unstaged_buttons, text="暂存所有更改", command=self.stage_all).pack(
             side=tk.LEFT, expand=True, fill=tk.X, padx=2
         )
+        ttk.Button(unstaged_buttons, text="暂存筛选结果", command=self.stage_filtered).pack(
+            side=tk.LEFT, expand=True, fill=tk.X, padx=2
+        )
         ttk.Button(unstaged_buttons, text="排除选中项", command=self.exclude_selected_from_unstaged).pack(
             side=tk.LEFT, expand=True, fill=tk.X, padx=2
         )
@@ -174,14 +315,19 @@ class SimpleGitApp:
         
         staged_frame = ttk.Frame(status_frame)
         staged_frame.grid(row=4, column=0, columnspan=2, sticky="nsew", pady=(0, 5))
-        staged_frame.rowconfigure(0, weight=1)
+        staged_frame.rowconfigure(1, weight=1)
         staged_frame.columnconfigure(0, weight=1)
         
         self.staged_list = tk.Listbox(staged_frame, selectmode=tk.EXTENDED, height=8)
-        self.staged_list.grid(row=0, column=0, sticky="nsew")
+        self._filter_bars[self.staged_list] = FilterBar(
+            staged_frame, lambda: self._schedule_filter(self.staged_list)
+        )
+        self.staged_list.grid(row=1, column=0, sticky="nsew")
+        self.staged_list.bind('<<ListboxSelect>>', lambda e: self._on_file_selected(self.staged_list))
         staged_scroll = ttk.Scrollbar(staged_frame, orient=tk.VERTICAL, command=self.staged_list.yview)
-        staged_scroll.grid(row=0, column=1, sticky="ns")
+        staged_scroll.grid(row=1, column=1, sticky="ns")
         self.staged_list['yscrollcommand'] = staged_scroll.set
+        self._build_file_tree(staged_frame, self.staged_list, staged_scroll)
         
         # 已暂存操作按钮
         staged_buttons = ttk.Frame(status_frame)
@@ -193,10 +339,24 @@ class SimpleGitApp:
             side=tk.LEFT, expand=True, fill=tk.X, padx=2
         )
         
-        # 刷新按钮
-        ttk.Button(status_frame, text="刷新状态", command=self.refresh_status).grid(
-            row=6, column=0, columnspan=2, sticky="ew", pady=(15, 0)
+        # 刷新按钮和视图切换
+        refresh_frame = ttk.Frame(status_frame)
+        refresh_frame.grid(row=6, column=0, columnspan=2, sticky="ew", pady=(15, 0))
+        ttk.Button(refresh_frame, text="刷新状态", command=self.refresh_status).pack(
+            side=tk.LEFT, expand=True, fill=tk.X
+        )
+        self.tree_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            refresh_frame, text="按目录分组", variable=self.tree_mode_var,
+            command=self.toggle_tree_mode
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(refresh_frame, text="子模块:").pack(side=tk.LEFT, padx=(10, 2))
+        policy_combobox = ttk.Combobox(
+            refresh_frame, textvariable=self.submodule_policy_var,
+            values=IGNORE_POLICIES, state="readonly", width=9
         )
+        policy_combobox.pack(side=tk.LEFT)
+        policy_combobox.bind('<<ComboboxSelected>>', lambda e: self.change_submodule_policy())
         
         ttk.Label(status_frame, text="已排除的路径:").grid(
             row=7, column=0, columnspan=2, sticky="w", pady=(15, 2)
@@ -215,6 +375,22 @@ class SimpleGitApp:
         ttk.Button(excluded_buttons, text="移除选中排除", command=self.remove_selected_exclusions).pack(
             side=tk.LEFT, expand=True, fill=tk.X, padx=2
         )
+        ttk.Button(excluded_buttons, text="从 .gitignore 导入", command=self.import_exclusions).pack(
+            side=tk.LEFT, expand=True, fill=tk.X, padx=2
+        )
+    
+    def _build_file_tree(self, frame, listbox, list_scroll):
+        """为文件列表创建对应的目录树视图（初始隐藏）"""
+        tree = ttk.Treeview(frame, show='tree', selectmode='extended', height=8)
+        tree.grid(row=1, column=0, sticky="nsew")
+        tree_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree_scroll.grid(row=1, column=1, sticky="ns")
+        tree['yscrollcommand'] = tree_scroll.set
+        tree.bind('<<TreeviewOpen>>', lambda e: self._on_tree_open(listbox))
+        tree.bind('<<TreeviewSelect>>', lambda e: self._on_file_selected(listbox))
+        tree.grid_remove()
+        tree_scroll.grid_remove()
+        self._trees[listbox] = (tree, tree_scroll, list_scroll)
     
     def _build_operation_frame(self, parent):
         """构建操作区域"""
@@ -229,7 +405,17 @@ class SimpleGitApp:
         
         # 基本操作按钮
         ttk.Button(commit_frame, text="提交 (Commit)", command=self.commit).pack(fill=tk.X, pady=5)
+        ttk.Checkbutton(
+            commit_frame, text="本次跳过钩子 (--no-verify)", variable=self.commit_no_verify_var
+        ).pack(anchor=tk.W)
         ttk.Button(commit_frame, text="拉取 (Pull)", command=self.pull).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="撤销暂存操作 (Undo)", command=self.undo_last_operation).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="差异 / 部分暂存", command=self.open_diff).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="追溯 (Blame)", command=self.open_blame).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="搜索内容 (Grep)", command=self.open_search).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="储藏管理 (Stash)", command=self.open_stash).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="引用日志 (Reflog)", command=self.open_reflog).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="解决冲突", command=self.open_conflicts).pack(fill=tk.X, pady=5)
         
         # 远程仓库管理
         remote_frame = ttk.LabelFrame(commit_frame, text="远程仓库管理")
@@ -263,27 +449,44 @@ class SimpleGitApp:
         ttk.Button(push_buttons, text="推送到所有", command=self.push_to_all).pack(
             side=tk.LEFT, fill=tk.X, expand=True, padx=2
         )
+        
+        # 性能统计
+        ttk.Button(commit_frame, text="性能统计", command=self.show_instrumentation).pack(fill=tk.X, pady=5)
+        ttk.Button(commit_frame, text="仓库体检与维护", command=self.open_maintenance).pack(fill=tk.X, pady=5)
     
     def _start_result_processor(self):
-        """启动异步结果处理（仅使用定时器，避免线程竞态）"""
-        self._check_results()
+        """启动异步结果处理（由帧调度器在主线程中定时执行，避免线程竞态）"""
+        self.frame_scheduler.add_pump(self._pump_results)
+        self.frame_scheduler.add_pump(self._pump_background)
+        self.frame_scheduler.add_pump(self._pump_filters)
+        self.frame_scheduler.add_pump(self._pump_reflog)
+        self.frame_scheduler.start()
     
-    def _check_results(self):
-        """定期检查异步结果"""
-        try:
-            while not self.git.result_queue.empty():
-                result = self.git.result_queue.get_nowait()
-                if result is not None:
-                    self._handle_result(result)
-                else:
-                    # 收到退出信号
-                    return
-        except Exception as e:
-            # 避免队列处理崩溃导致程序卡死
-            print(f"结果处理错误: {e}")
-        
-        # 继续定时检查
-        self.root.after(100, self._check_results)
+    def _pump_results(self, deadline: float) -> bool:
+        """在帧预算内处理异步结果，返回是否还有未处理的结果"""
+        result_queue = self.git.result_queue
+        while time.perf_counter() < deadline:
+            try:
+                result = result_queue.get_nowait()
+            except queue.Empty:
+                return False
+            if result is None:
+                # 收到退出信号
+                self.frame_scheduler.stop()
+                return False
+            try:
+                self._handle_result(result)
+            except Exception as e:
+                # 避免单个结果出错导致其余结果无法处理
+                print(f"结果处理错误: {e}")
+        return not result_queue.empty()
+    
+    def _pump_background(self, deadline: float) -> bool:
+        """每帧更新命令状态并取出追溯 / 搜索事件（各自有每帧上限）"""
+        self._update_command_status()
+        self._drain_blame_events()
+        self._drain_search_events()
+        return False
     
     def _handle_result(self, result):
         """处理命令执行结果"""
@@ -303,8 +506,52 @@ class SimpleGitApp:
                 self.output_panel.display(f"回调错误: {e}")
         
         if self.pending_refresh:
+            paths = self.pending_refresh_paths
             self.pending_refresh = False
-            self.root.after(Config.REFRESH_DELAY_MS, self.refresh_status)
+            self.pending_refresh_paths = None
+            self._schedule_refresh(paths)
+    
+    def _schedule_refresh(self, paths: list = None):
+        """
+        登记一次延迟刷新
+        
+        执行前的多次请求合并为一次：局部刷新的路径取并集，任一请求为完整刷新则完整刷新。
+        """
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self._scheduled_refresh_paths = set(paths) if paths else None
+        elif self._scheduled_refresh_paths is not None:
+            if paths:
+                self._scheduled_refresh_paths.update(paths)
+            else:
+                self._scheduled_refresh_paths = None
+        self.frame_scheduler.schedule('refresh_status', self._run_scheduled_refresh, Config.REFRESH_DELAY_MS)
+    
+    def _run_scheduled_refresh(self):
+        """执行合并后的刷新"""
+        paths = self._scheduled_refresh_paths
+        self._refresh_scheduled = False
+        self._scheduled_refresh_paths = None
+        self.refresh_status(sorted(paths) if paths else None)
+    
+    def _request_refresh(self, paths: list = None):
+        """请求在命令完成后刷新状态（paths 非空时仅刷新这些路径）"""
+        self.pending_refresh = True
+        self.pending_refresh_paths = list(paths) if paths else None
+    
+    def _update_command_status(self):
+        """在状态栏显示正在执行的命令（仅在内容变化时更新控件）"""
+        descriptions = tuple(handle.describe() for handle in self.git.active_commands())
+        if descriptions != self._status_commands:
+            self._status_commands = descriptions
+            self.status_bar.show_commands(list(descriptions))
+    
+    def cancel_running_commands(self):
+        """取消所有正在执行的命令"""
+        cancelled = self.git.cancel_all()
+        if cancelled:
+            self.output_panel.display(f"已取消 {cancelled} 个正在执行的命令。")
+        self._update_command_status()
     
     def _initialize(self):
         """初始化应用"""
@@ -315,26 +562,48 @@ class SimpleGitApp:
         
         self.update_repository_display()
         self.refresh_remotes()
+        
+        if Config.AUTO_FETCH_ENABLED:
+            self.fetch_scheduler.start()
 
     def _should_hide_unstaged_file(self, filepath: str) -> bool:
-        """判断路径是否需要在未暂存列表中隐藏"""
-        patterns = getattr(Config, 'STATUS_EXCLUDE_PATTERNS', None)
-        if not patterns or not filepath:
-            return False
-        normalized = filepath.replace('\\', '/').lstrip('./')
-        for pattern in patterns:
-            if not pattern:
-                continue
-            normalized_pattern = pattern.replace('\\', '/').lstrip('./')
-            if not normalized_pattern:
-                continue
-            if normalized_pattern.endswith('/'):
-                directory = normalized_pattern.rstrip('/')
-                if normalized.startswith(directory):
-                    return True
-            if fnmatch.fnmatch(normalized, normalized_pattern):
-                return True
-        return False
+        """判断路径是否需要在未暂存列表中隐藏（默认规则 + 当前仓库的排除配置）"""
+        return self._default_exclusions.matches(filepath) or self._current_exclusions().matches(filepath)
+    
+    def _current_exclusions(self):
+        """当前仓库的排除配置（仓库变化时从磁盘加载）"""
+        profile = self._exclusion_profile
+        if profile is None or profile.repo_path != self.git.repo_path:
+            profile = self.exclusion_store.load(self.git.repo_path)
+            self._exclusion_profile = profile
+        return profile
+    
+    def _save_exclusions(self):
+        """保存当前仓库的排除配置"""
+        try:
+            self.exclusion_store.save(self._current_exclusions())
+        except OSError as e:
+            self.output_panel.display(f"保存排除配置失败: {e}", clear_previous=False)
+    
+    def show_instrumentation(self):
+        """在输出面板显示性能统计信息"""
+        lines = ["性能统计:"]
+        lines.extend(f"  {line}" for line in self.git.get_cache_stats())
+        lines.extend(f"  {line}" for line in self.fetch_scheduler.format_stats())
+        lines.append(f"  {self.blame_service.cache.format_stats()}")
+        lines.append(f"  {self.git.ssh_mux.format_stats()}")
+        lines.append(f"  {self.submodule_scanner.format_stats()}")
+        lines.append(f"  {self.frame_scheduler.format_stats()}")
+        lines.append(f"  {self.git.get_backend().format_stats()}")
+        lines.append(f"  {self.conflict_store.format_stats()}")
+        lines.append(f"  {self.conflict_store.cache.format_stats()}")
+        if self._reflog_tail is not None:
+            lines.append(f"  {self._reflog_tail.format_stats()}")
+        usage = self.status_snapshot.memory_usage()
+        lines.append(
+            f"  状态快照: {len(self.status_snapshot)} 项, {usage / 1024:.1f} KB"
+        )
+        self.output_panel.display("\n".join(lines) + "\n")
     
     # ==================== 仓库操作 ====================
     
@@ -347,13 +616,27 @@ class SimpleGitApp:
         
         if new_path and os.path.normpath(new_path) != os.path.normpath(self.git.repo_path):
             if self.git.is_git_repo(new_path):
+                old_path = self.git.repo_path
                 self.git.repo_path = os.path.normpath(new_path)
-                self.git.clear_cache()
+                self.git.invalidate_repository(old_path)
+                self.git.invalidate_repository(self.git.repo_path)
+                self.fetch_scheduler.reset()
+                self._close_repository_panels()
                 self.output_panel.display(f"仓库已切换到: {self.git.repo_path}", clear_previous=True)
                 self.update_repository_display()
             else:
                 messagebox.showerror("错误", f"所选目录 '{new_path}' 不是一个有效的 Git 仓库。")
     
+    def _close_repository_panels(self):
+        """关闭与当前仓库/工作树绑定的面板"""
+        self._close_blame()
+        self._close_search()
+        self._close_stash()
+        self._close_diff()
+        self._close_conflicts()
+        # 子模块扫描结果属于原仓库，新仓库的结果在下次完整刷新时得到
+        self.submodule_scanner.results = {}
+    
     def update_repository_display(self):
         """更新仓库显示"""
         self.repo_path_var.set(f"当前仓库: {self.git.repo_path}")
@@ -361,68 +644,533 @@ class SimpleGitApp:
         if self.git.is_git_repo(self.git.repo_path):
             self.update_branch_info()
             self.refresh_status()
+            self._refresh_worktree_list()
         else:
             self.current_branch_var.set("N/A")
             self.branch_combobox['values'] = []
             self.branch_combobox.set('')
-            self.unstaged_list.delete(0, tk.END)
-            self.staged_list.delete(0, tk.END)
+            self.status_snapshot = StatusSnapshot()
+            self._status_sizes = None
+            self._clear_file_list(self.unstaged_list)
+            self._clear_file_list(self.staged_list)
             self.output_panel.display(
                 f"错误：目录 '{self.git.repo_path}' 不是有效的 Git 仓库。",
                 clear_previous=True
             )
     
+    # ==================== 工作树 ====================
+    
+    def _refresh_worktree_list(self):
+        """重新枚举工作树并更新下拉框"""
+        worktrees = self.worktree_manager.refresh_list()
+        self._worktree_paths = [wt.path for wt in worktrees]
+        self.worktree_combobox['values'] = [wt.label() for wt in worktrees]
+        current = os.path.normpath(self.git.repo_path)
+        if current in self._worktree_paths:
+            self.worktree_combobox.current(self._worktree_paths.index(current))
+        else:
+            self.worktree_combobox.set('')
+        self.worktree_info_var.set(f"共 {len(worktrees)} 个" if len(worktrees) > 1 else "")
+    
+    def switch_worktree(self):
+        """切换到下拉框中选中的工作树（有缓存快照时立即显示，再在后台刷新）"""
+        index = self.worktree_combobox.current()
+        if index < 0 or index >= len(self._worktree_paths):
+            return
+        path = self._worktree_paths[index]
+        if path == os.path.normpath(self.git.repo_path):
+            return
+        if self.git.is_busy:
+            messagebox.showwarning("警告", "有命令正在执行，请稍后再切换工作树。")
+            self._refresh_worktree_list()
+            return
+        
+        self.git.repo_path = path
+        self._close_repository_panels()
+        self.fetch_scheduler.reset()
+        self.repo_path_var.set(f"当前仓库: {path}")
+        self.update_branch_info()
+        
+        cached = self.worktree_manager.cached_snapshot(path)
+        if cached is None:
+            self.refresh_status()
+            return
+        
+        snapshot, refreshed_at = cached
+        self._show_snapshot(
+            snapshot, f"已切换到工作树 {path}（显示 {int(time.time() - refreshed_at)} 秒前的状态，正在后台刷新）"
+        )
+        
+        def refresh():
+            core = self.worktree_manager.core_for(path)
+            fresh = core.get_status_snapshot(optional_locks=False)
+            sizes = core.file_classifier.snapshot_sizes(fresh)
+            
+            def show(*_):
+                if os.path.normpath(self.git.repo_path) == path:
+                    self._show_snapshot(fresh, "状态已刷新。", sizes)
+            
+            self.git.result_queue.put(("刷新工作树状态", True, "", "", show))
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def refresh_all_worktrees(self):
+        """在后台并发刷新所有工作树的状态"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            return
+        self.worktree_info_var.set("正在刷新...")
+        
+        current_path = os.path.normpath(self.git.repo_path)
+        
+        def work():
+            started = time.perf_counter()
+            self.worktree_manager.refresh_list()
+            results = self.worktree_manager.refresh_all()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            current = results.get(current_path)
+            sizes = None
+            if current is not None and current[0] is not None:
+                sizes = self.worktree_manager.core_for(current_path).file_classifier.snapshot_sizes(current[0])
+            
+            def show(*_):
+                self._refresh_worktree_list()
+                lines = [f"已刷新 {len(results)} 个工作树（总耗时 {elapsed_ms:.0f} ms）:"]
+                for path, (snapshot, ms) in results.items():
+                    if snapshot is None:
+                        lines.append(f"  {path}: 目录不存在")
+                    else:
+                        lines.append(
+                            f"  {path}: 未暂存 {len(snapshot.unstaged)}，已暂存 {len(snapshot.staged)}（{ms:.0f} ms）"
+                        )
+                self.output_panel.display("\n".join(lines))
+                if (os.path.normpath(self.git.repo_path) == current_path and current is not None
+                        and current[0] is not None and not self.git.is_busy):
+                    self._show_snapshot(current[0], "状态已刷新。", sizes)
+            
+            self.git.result_queue.put(("刷新所有工作树", True, "", "", show))
+        
+        threading.Thread(target=work, daemon=True).start()
+    
     # ==================== 状态操作 ====================
     
-    def refresh_status(self):
-        """刷新状态列表"""
+    def refresh_status(self, paths: list = None):
+        """
+        刷新状态列表
+        
+        Args:
+            paths: 受影响的路径；给出时仅对这些路径运行 git status 并合并到当前快照
+        
+        完整刷新（含子模块扫描）在后台线程中执行；后台刷新进行中时当前快照已过期，
+        局部刷新也改为重新发起完整刷新。
+        """
+        self._status_generation += 1
         if not self.git.is_git_repo(self.git.repo_path):
-            self.unstaged_list.delete(0, tk.END)
-            self.staged_list.delete(0, tk.END)
+            self._status_refreshing = False
+            self.status_snapshot = StatusSnapshot()
+            self._status_sizes = None
+            self._clear_file_list(self.unstaged_list)
+            self._clear_file_list(self.staged_list)
             self._refresh_excluded_list()
             return
         
-        self.unstaged_list.delete(0, tk.END)
-        self.staged_list.delete(0, tk.END)
+        if paths and not self._status_refreshing:
+            snapshot = self.git.refresh_status_paths(self.status_snapshot, paths)
+            if snapshot is not None:
+                sizes = None
+                if self._status_sizes is not None:
+                    # 只 stat 受影响的路径，其余条目沿用上一快照的大小
+                    sizes = self.git.file_classifier.snapshot_sizes(
+                        snapshot, (self.status_snapshot, self._status_sizes), paths
+                    )
+                self._show_snapshot(snapshot, f"状态已局部刷新（{len(paths)} 个路径）。", sizes)
+                return
         
-        unstaged, staged = self.git.get_status()
+        generation = self._status_generation
+        repo_path = self.git.repo_path
+        self._status_refreshing = True
+        self.submodule_policy_var.set(self.submodule_scanner.policy())
         
-        displayed_unstaged = 0
-        excluded_count = 0
-        for status_code, filepath in unstaged:
-            if self._should_hide_unstaged_file(filepath):
-                excluded_count += 1
+        def work():
+            try:
+                (snapshot, submodules), error = self._full_status_snapshot(), ""
+                sizes = self.git.file_classifier.snapshot_sizes(snapshot)
+            except Exception as e:
+                snapshot, submodules, sizes, error = None, {}, None, str(e)
+            
+            def show(*_):
+                if generation != self._status_generation:
+                    return
+                self._status_refreshing = False
+                if self.git.repo_path != repo_path:
+                    return
+                if snapshot is None:
+                    self.output_panel.display(f"刷新状态失败: {error}")
+                    return
+                self.submodule_scanner.results = submodules
+                self._show_snapshot(snapshot, "状态已刷新。", sizes)
+            
+            self.git.result_queue.put(("刷新状态", True, "", "", show))
+        
+        threading.Thread(target=work, daemon=True).start()
+    
+    def _full_status_snapshot(self) -> tuple:
+        """
+        完整刷新状态（在后台线程中执行，不修改共享状态）
+        
+        有子模块时父仓库只比较子模块提交，子模块内部由扫描器并发扫描后合并为未暂存标记。
+        
+        Returns:
+            (快照, 子模块扫描结果)；结果由调用方在主线程确认刷新仍有效后再保存到扫描器
+        """
+        scanner = self.submodule_scanner
+        snapshot = self.git.get_status_snapshot(ignore_submodules=scanner.parent_ignore_option())
+        results = {}
+        if scanner.is_active():
+            results = scanner.scan()
+            scanner.merge_into(snapshot, results)
+        return snapshot, results
+    
+    def change_submodule_policy(self):
+        """保存当前仓库的子模块忽略策略并刷新"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            return
+        policy = self.submodule_policy_var.get()
+        success, error = self.submodule_scanner.set_policy(policy)
+        if not success:
+            messagebox.showerror("错误", f"保存子模块策略失败: {error}")
+            return
+        self.output_panel.display(f"子模块策略已设为 --ignore-submodules={policy}", clear_previous=False)
+        self.refresh_status()
+    
+    def _show_snapshot(self, snapshot: StatusSnapshot, message: str, sizes: array = None):
+        """
+        显示状态快照，并缓存为当前工作树的快照
+        
+        Args:
+            sizes: 后台统计的文件大小（FileClassifier.snapshot_sizes），None 时不显示大小
+        """
+        self.status_snapshot = snapshot
+        self._status_sizes = sizes
+        self.worktree_manager.store_snapshot(self.git.repo_path, snapshot)
+        
+        visible_unstaged = array('I')
+        hidden_unstaged = array('I')
+        for index in snapshot.unstaged:
+            if self._should_hide_unstaged_file(snapshot.path(index)):
+                hidden_unstaged.append(index)
                 continue
-            self.unstaged_list.insert(tk.END, f"{status_code} {filepath}")
-            displayed_unstaged += 1
+            visible_unstaged.append(index)
+        excluded_count = len(hidden_unstaged)
+        self._hidden_unstaged = hidden_unstaged
+        
+        self._populate_file_list(self.unstaged_list, snapshot, visible_unstaged)
+        self._populate_file_list(self.staged_list, snapshot, snapshot.staged)
         
-        for status_code, filepath in staged:
-            self.staged_list.insert(tk.END, f"{status_code} {filepath}")
+        usage = snapshot.memory_usage()
+        if usage > Config.STATUS_MEMORY_BUDGET_MB * 1024 * 1024:
+            self.output_panel.display(
+                f"状态快照占用 {usage / (1024 * 1024):.1f} MB，"
+                f"超出预算 {Config.STATUS_MEMORY_BUDGET_MB} MB（共 {len(snapshot)} 项）。"
+            )
         
-        if displayed_unstaged == 0 and not staged:
+        if not visible_unstaged and not snapshot.staged:
             if excluded_count > 0:
                 self.output_panel.display(
-                    f"未暂存更改均已根据 STATUS_EXCLUDE_PATTERNS 隐藏（共 {excluded_count} 项）。",
+                    f"未暂存更改均已根据排除规则隐藏（共 {excluded_count} 项）。",
                     clear_previous=True
                 )
             else:
                 self.output_panel.display("工作区干净，没有变更。", clear_previous=True)
             return
 
-        message = "状态已刷新。"
         if excluded_count > 0:
             message += f"（已隐藏 {excluded_count} 项未暂存更改）"
         self.output_panel.display(message, clear_previous=True)
         self._refresh_excluded_list()
     
-    def _get_selected_files(self, listbox) -> list:
-        """获取选中的文件"""
+    def _clear_file_list(self, listbox):
+        """清空文件列表及其行映射"""
+        listbox.delete(0, tk.END)
+        self._list_rows[listbox] = array('I')
+        self._filter_indexes.pop(listbox, None)
+        self._filter_searches.pop(listbox, None)
+        self._tree_models.pop(listbox, None)
+        if listbox in self._trees:
+            tree = self._trees[listbox][0]
+            tree.delete(*tree.get_children())
+    
+    def _populate_file_list(self, listbox, snapshot: StatusSnapshot, rows: array):
+        """按快照索引视图填充文件列表，同时建立筛选索引并应用当前筛选条件"""
+        index = FilterIndex(snapshot, rows)
+        self._filter_indexes[listbox] = index
+        filter_bar = self._filter_bars.get(listbox)
+        if filter_bar is not None and filter_bar.is_active():
+            self._apply_filter(listbox)
+        else:
+            self._filter_searches.pop(listbox, None)
+            self._show_rows(listbox, snapshot, rows)
+    
+    def _show_rows(self, listbox, snapshot: StatusSnapshot, rows: array, complete: bool = True):
+        """
+        显示指定的快照索引视图（列表模式分块批量插入，目录树模式构建目录树）
+        
+        Args:
+            complete: rows 是否为未经筛选的完整视图；筛选结果在列表模式下最多显示 FILTER_DISPLAY_MAX_ROWS 行
+        """
+        listbox.delete(0, tk.END)
+        self._list_rows[listbox] = rows
+        if self.tree_mode_var.get():
+            self._populate_tree(listbox, snapshot, rows, complete)
+            return
+        self._tree_models.pop(listbox, None)
+        self._insert_rows(listbox, snapshot, rows if complete else rows[:Config.FILTER_DISPLAY_MAX_ROWS])
+    
+    def _insert_rows(self, listbox, snapshot: StatusSnapshot, rows: array):
+        """在列表框末尾分块批量插入快照索引视图"""
+        chunk = Config.LISTBOX_INSERT_CHUNK
+        with_suffix = self._status_sizes is not None or bool(self.submodule_scanner.results)
+        for start in range(0, len(rows), chunk):
+            block = rows[start:start + chunk]
+            if with_suffix:
+                labels = [snapshot.label(i) + self._row_suffix(snapshot, i) for i in block]
+            else:
+                labels = [snapshot.label(i) for i in block]
+            listbox.insert(tk.END, *labels)
+    
+    def _row_suffix(self, snapshot: StatusSnapshot, index: int) -> str:
+        """列表行后缀：子模块显示扫描摘要，其他文件显示大小"""
+        result = self.submodule_scanner.results.get(snapshot.path(index))
+        if result is not None:
+            return f"  [{result.summary()}]"
+        return self._size_suffix(snapshot, index)
+    
+    def _size_suffix(self, snapshot: StatusSnapshot, index: int) -> str:
+        """文件大小后缀（只查刷新时统计的大小数组；目录、已删除文件和未统计时不显示）"""
+        sizes = self._status_sizes
+        if sizes is None or snapshot is not self.status_snapshot or sizes[index] == NO_SIZE:
+            return ""
+        return f"  ({format_size(sizes[index])})"
+    
+    def _schedule_filter(self, listbox):
+        """合并连续按键：停止输入 FILTER_DEBOUNCE_MS 后执行一次筛选"""
+        job = self._filter_jobs.pop(listbox, None)
+        if job is not None:
+            self.root.after_cancel(job)
+        self._filter_jobs[listbox] = self.root.after(
+            Config.FILTER_DEBOUNCE_MS, lambda: self._apply_filter(listbox)
+        )
+    
+    def _apply_filter(self, listbox):
+        """
+        按筛选栏条件开始筛选（仅使用筛选索引，不调用 git）
+        
+        筛选分块执行：本次先处理一帧预算内的部分，其余由 _pump_filters 每帧推进；
+        列表模式下找到的行逐步追加显示（最多 FILTER_DISPLAY_MAX_ROWS 行），目录树模式在完成后构建。
+        """
+        job = self._filter_jobs.pop(listbox, None)
+        if job is not None:
+            self.root.after_cancel(job)
+        self._filter_searches.pop(listbox, None)
+        index = self._filter_indexes.get(listbox)
+        filter_bar = self._filter_bars.get(listbox)
+        if index is None or filter_bar is None:
+            return
+        query, mode = filter_bar.get()
+        search = index.start(query, mode)
+        if search is None:
+            self._show_rows(listbox, self.status_snapshot, index.rows)
+            filter_bar.set_info("")
+            return
+        
+        if not self.tree_mode_var.get():
+            listbox.delete(0, tk.END)
+            self._list_rows[listbox] = array('I')
+            self._tree_models.pop(listbox, None)
+        self._filter_searches[listbox] = (search, 0)
+        self._step_filter(listbox, time.perf_counter() + Config.UI_FRAME_BUDGET_MS / 1000)
+    
+    def _pump_filters(self, deadline: float) -> bool:
+        """每帧在预算内推进进行中的筛选，返回是否还有未完成的筛选"""
+        for listbox, (search, _) in list(self._filter_searches.items()):
+            if time.perf_counter() >= deadline:
+                return True
+            if self._filter_indexes.get(listbox) is not search.index:
+                # 快照已更新，旧索引上的筛选作废
+                self._filter_searches.pop(listbox, None)
+                continue
+            self._step_filter(listbox, deadline)
+        return bool(self._filter_searches)
+    
+    def _step_filter(self, listbox, deadline: float):
+        """推进一次筛选，追加显示新找到的行；完成时登记完整结果并显示统计"""
+        search, shown = self._filter_searches[listbox]
+        done = search.step(deadline)
+        snapshot = self.status_snapshot
+        if not self.tree_mode_var.get():
+            limit = min(len(search.rows), Config.FILTER_DISPLAY_MAX_ROWS)
+            if limit > shown:
+                new_rows = search.rows[shown:limit]
+                self._insert_rows(listbox, snapshot, new_rows)
+                self._list_rows[listbox].extend(new_rows)
+                shown = limit
+        
+        filter_bar = self._filter_bars[listbox]
+        if not done:
+            self._filter_searches[listbox] = (search, shown)
+            filter_bar.set_info(f"筛选中... {len(search.rows)} 项")
+            return
+        
+        del self._filter_searches[listbox]
+        result = search.result()
+        if self.tree_mode_var.get():
+            self._show_rows(listbox, snapshot, result, complete=False)
+        else:
+            self._list_rows[listbox] = result
+        info = f"{len(result)}/{len(search.index)} ({search.busy_ms:.1f} ms)"
+        if not self.tree_mode_var.get() and len(result) > shown:
+            info += f"，显示前 {shown} 项"
+        filter_bar.set_info(info)
+    
+    # ==================== 目录树视图 ====================
+    
+    def toggle_tree_mode(self):
+        """在平铺列表和目录树视图之间切换"""
+        tree_mode = self.tree_mode_var.get()
+        for listbox, (tree, tree_scroll, list_scroll) in self._trees.items():
+            if tree_mode:
+                listbox.grid_remove()
+                list_scroll.grid_remove()
+                tree.grid()
+                tree_scroll.grid()
+            else:
+                tree.grid_remove()
+                tree_scroll.grid_remove()
+                tree.delete(*tree.get_children())
+                listbox.grid()
+                list_scroll.grid()
+            
+            if listbox in self._filter_searches:
+                # 筛选尚未完成：按新的视图模式重新开始
+                self._apply_filter(listbox)
+                continue
+            filter_bar = self._filter_bars.get(listbox)
+            complete = filter_bar is None or not filter_bar.is_active()
+            self._show_rows(
+                listbox, self.status_snapshot,
+                self._list_rows.get(listbox, array('I')), complete
+            )
+    
+    def _populate_tree(self, listbox, snapshot: StatusSnapshot, rows: array, complete: bool):
+        """由索引视图构建目录树，仅插入顶层节点，其余在展开时按需创建"""
+        tree = self._trees[listbox][0]
+        model = StatusTree(snapshot, rows, complete)
+        self._tree_models[listbox] = model
+        tree.delete(*tree.get_children())
+        self._insert_tree_entries(tree, model, model.root, '', 0)
+    
+    def _insert_tree_entries(self, tree, model: StatusTree, node, parent_iid: str, offset: int):
+        """插入节点的一段子项，超出分块大小时追加“加载更多”节点"""
+        entries = model.entries(node)
+        end = min(len(entries), offset + Config.TREE_EXPAND_CHUNK)
+        for kind, key in entries[offset:end]:
+            if kind == 'd':
+                child = model.node(key)
+                iid = tree.insert(parent_iid, tk.END, iid=f"d{key}", text=model.dir_label(child))
+                # 占位子项，使目录可展开
+                tree.insert(iid, tk.END, iid=f"p{key}", text="")
+            else:
+                path = model.snapshot.path(key)
+                tree.insert(
+                    parent_iid, tk.END, iid=f"f{key}", text=model.file_label(key) + self._row_suffix(model.snapshot, key)
+                )
+                submodule = self.submodule_scanner.results.get(path)
+                if submodule is not None and submodule.dirty:
+                    # 占位子项，使子模块可展开查看内部更改
+                    tree.insert(f"f{key}", tk.END, iid=f"q{key}", text="")
+        if end < len(entries):
+            more_iid = tree.insert(
+                parent_iid, tk.END, iid=f"m{node.id}:{end}",
+                text=f"... 还有 {len(entries) - end} 项（展开以加载）"
+            )
+            tree.insert(more_iid, tk.END, iid=f"p{node.id}:{end}", text="")
+    
+    def _on_tree_open(self, listbox):
+        """展开目录或“加载更多”节点时按需创建子项"""
+        tree = self._trees[listbox][0]
+        model = self._tree_models.get(listbox)
+        iid = tree.focus()
+        if model is None or not iid:
+            return
+        if iid.startswith('d'):
+            placeholder = f"p{iid[1:]}"
+            if tree.exists(placeholder):
+                tree.delete(placeholder)
+                node = model.node(int(iid[1:]))
+                if node is not None:
+                    self._insert_tree_entries(tree, model, node, iid, 0)
+        elif iid.startswith('f'):
+            placeholder = f"q{iid[1:]}"
+            if tree.exists(placeholder):
+                tree.delete(placeholder)
+                self._insert_submodule_entries(tree, iid, model.snapshot.path(int(iid[1:])))
+        elif iid.startswith('m'):
+            node_id, offset = iid[1:].split(':')
+            node = model.node(int(node_id))
+            parent_iid = tree.parent(iid)
+            tree.delete(iid)
+            if node is not None:
+                self._insert_tree_entries(tree, model, node, parent_iid, int(offset))
+    
+    def _insert_submodule_entries(self, tree, parent_iid: str, path: str):
+        """在子模块节点下插入其内部更改（只读，超出分块大小的部分只显示数量）"""
+        result = self.submodule_scanner.results.get(path)
+        if result is None:
+            return
+        entries = result.entries()
+        limit = Config.TREE_EXPAND_CHUNK
+        for number, text in enumerate(entries[:limit]):
+            tree.insert(parent_iid, tk.END, iid=f"s{parent_iid[1:]}:{number}", text=text)
+        if len(entries) > limit:
+            tree.insert(parent_iid, tk.END, iid=f"s{parent_iid[1:]}:more", text=f"... 还有 {len(entries) - limit} 项")
+    
+    def _tree_node_pathspecs(self, listbox, model: StatusTree, node) -> list:
+        """
+        目录节点对应的路径
+        
+        完整视图且目录下没有被排除的条目时，用单个目录路径规范代替其下的所有文件。
+        """
+        snapshot = model.snapshot
+        if model.complete:
+            hidden = self._hidden_unstaged if listbox is self.unstaged_list else ()
+            if not any(snapshot.path(i).startswith(node.path) for i in hidden):
+                return [node.path]
+        return [snapshot.path(i) for i in model.iter_files(node)]
+    
+    def _get_selected_tree_files(self, listbox) -> list:
+        """获取目录树视图中选中的文件和目录"""
+        tree = self._trees[listbox][0]
+        model = self._tree_models.get(listbox)
+        if model is None:
+            return []
         selected = []
-        for i in listbox.curselection():
-            line = listbox.get(i)
-            filepath = self.git.parse_git_path(line[3:].strip())
-            selected.append(filepath)
-        return selected
+        for iid in tree.selection():
+            if iid.startswith('f'):
+                selected.append(model.snapshot.path(int(iid[1:])))
+            elif iid.startswith('d'):
+                node = model.node(int(iid[1:]))
+                if node is not None:
+                    selected.extend(self._tree_node_pathspecs(listbox, model, node))
+        return list(dict.fromkeys(selected))
+    
+    def _get_selected_files(self, listbox) -> list:
+        """获取选中的文件（通过行映射直接取快照路径，无需解析显示文本）"""
+        if self.tree_mode_var.get() and listbox in self._trees:
+            return self._get_selected_tree_files(listbox)
+        rows = self._list_rows.get(listbox)
+        if rows is None:
+            return []
+        snapshot = self.status_snapshot
+        return [snapshot.path(rows[i]) for i in listbox.curselection() if i < len(rows)]
     
     def stage_selected(self):
         """暂存选中文件"""
@@ -434,26 +1182,19 @@ class SimpleGitApp:
             messagebox.showinfo("提示", "请先在\"未暂存的更改\"列表中选择文件。")
             return
         
-        def callback(success, stdout, stderr):
-            if success:
-                self.pending_refresh = True
-        
-        self.git.run_command_async(
-            ['git', 'add', '--'] + files,
-            callback,
-            f"暂存 {len(files)} 个文件"
-        )
+        self._run_index_operation(['git', 'add', '--'] + files, f"暂存 {len(files)} 个文件", files)
     
     def stage_all(self):
         """暂存所有更改"""
         if not self.git.is_git_repo(self.git.repo_path):
             return
         
-        unstaged, _ = self.git.get_status()
+        snapshot = self.git.get_status_snapshot()
         files = []
         skipped = 0
         seen = set()
-        for _, filepath in unstaged:
+        for index in snapshot.unstaged:
+            filepath = snapshot.path(index)
             if self._should_hide_unstaged_file(filepath):
                 skipped += 1
                 continue
@@ -469,15 +1210,56 @@ class SimpleGitApp:
             self.output_panel.display(message, clear_previous=False)
             return
         
-        def callback(success, stdout, stderr):
-            if success:
-                self.pending_refresh = True
-        
-        command = ['git', 'add', '--'] + files
         description = "暂存所有可见更改"
         if skipped:
             description += f"（已跳过 {skipped} 个排除项）"
-        self.git.run_command_async(command, callback, description)
+        self._stage_paths(files, description)
+    
+    def stage_filtered(self):
+        """暂存未暂存列表中当前筛选出的所有文件"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            return
+        
+        if self.unstaged_list in self._filter_searches or self.unstaged_list in self._filter_jobs:
+            messagebox.showinfo("提示", "筛选尚未完成，请稍候。")
+            return
+        rows = self._list_rows.get(self.unstaged_list)
+        if not rows:
+            messagebox.showinfo("提示", "当前筛选结果为空。")
+            return
+        
+        snapshot = self.status_snapshot
+        files = list(dict.fromkeys(snapshot.path(i) for i in rows))
+        self._stage_paths(files, f"暂存筛选出的 {len(files)} 个文件")
+    
+    def _stage_paths(self, files: list, description: str):
+        """批量暂存路径，完成后局部刷新"""
+        self._run_index_operation(['git', 'add', '--'] + files, description, files)
+    
+    def _run_index_operation(self, command: list, description: str, paths: list = None):
+        """
+        先记录索引快照再执行修改索引的命令（可通过“撤销”一次恢复）
+        
+        Args:
+            paths: 受影响的路径，完成后仅局部刷新这些路径；None 表示完整刷新
+        """
+        entries = []
+        
+        def task(handle):
+            entry = self.undo_journal.record_index(description, paths, handle)
+            stdout, stderr, returncode = self.git.run_command_sync(command, handle)
+            if returncode != 0 and entry is not None:
+                self.undo_journal.discard(entry)
+            entries.append(entry)
+            return returncode == 0, stdout, stderr
+        
+        def callback(success, stdout, stderr):
+            if success:
+                if entries and entries[0] is None:
+                    self.output_panel.display("提示: 索引中有未合并的条目，此操作无法撤销。", clear_previous=False)
+                self._request_refresh(paths)
+        
+        self.git.run_task_async(task, callback, description)
     
     def exclude_selected_from_unstaged(self):
         """将选中项加入排除列表"""
@@ -494,8 +1276,9 @@ class SimpleGitApp:
             "是否按所在文件夹进行排除？\n选择“是”会排除整个文件夹，选择“否”仅排除这些文件。",
             icon=messagebox.QUESTION
         )
-        added_patterns = []
-        skipped = 0
+        profile = self._current_exclusions()
+        previous = list(profile.patterns)
+        candidates = []
         for path in files:
             normalized = path.replace('\\', '/').lstrip('./')
             if not normalized:
@@ -505,11 +1288,9 @@ class SimpleGitApp:
                 folder = os.path.dirname(normalized)
                 if folder and folder not in ('.', ''):
                     pattern = folder.rstrip('/') + '/'
-            if pattern in Config.STATUS_EXCLUDE_PATTERNS:
-                skipped += 1
-                continue
-            Config.STATUS_EXCLUDE_PATTERNS.append(pattern)
-            added_patterns.append(pattern)
+            candidates.append(pattern)
+        added_patterns = profile.add(candidates)
+        skipped = len(set(candidates)) - len(added_patterns)
         
         if not added_patterns:
             message = "未添加新的排除规则。"
@@ -518,41 +1299,74 @@ class SimpleGitApp:
             self.output_panel.display(message)
             return
         
+        self.undo_journal.record_exclusions(f"排除 {len(added_patterns)} 条规则", previous)
+        self._save_exclusions()
         summary = "\n".join(f"- {pattern}" for pattern in added_patterns)
         self.output_panel.display(
-            "已将以下模式加入 STATUS_EXCLUDE_PATTERNS：\n" + summary,
+            "已将以下模式加入当前仓库的排除配置：\n" + summary,
             clear_previous=False
         )
         self.refresh_status()
 
     def _refresh_excluded_list(self):
-        """刷新已排除列表显示"""
+        """刷新已排除列表显示（默认规则带 [默认] 前缀，不可移除）"""
         if not hasattr(self, 'excluded_list'):
             return
         self.excluded_list.delete(0, tk.END)
-        if not Config.STATUS_EXCLUDE_PATTERNS:
-            return
-        for pattern in Config.STATUS_EXCLUDE_PATTERNS:
-            self.excluded_list.insert(tk.END, pattern)
+        labels = [f"{DEFAULT_EXCLUSION_PREFIX}{p}" for p in Config.STATUS_EXCLUDE_PATTERNS]
+        labels.extend(self._current_exclusions().patterns)
+        if labels:
+            self.excluded_list.insert(tk.END, *labels)
     
     def remove_selected_exclusions(self):
-        """从排除列表中移除选中项"""
+        """从当前仓库的排除配置中移除选中项"""
         if not hasattr(self, 'excluded_list'):
             return
         selections = self.excluded_list.curselection()
         if not selections:
             messagebox.showinfo("提示", "请选择需要移除的排除规则。")
             return
-        removed = 0
+        profile = self._current_exclusions()
+        previous = list(profile.patterns)
         values = [self.excluded_list.get(i) for i in selections]
-        for value in values:
-            if value in Config.STATUS_EXCLUDE_PATTERNS:
-                Config.STATUS_EXCLUDE_PATTERNS.remove(value)
-                removed += 1
+        removed = profile.remove(v for v in values if not v.startswith(DEFAULT_EXCLUSION_PREFIX))
         if removed:
+            self.undo_journal.record_exclusions(f"移除 {removed} 条排除规则", previous)
+            self._save_exclusions()
             self.output_panel.display(f"已移除 {removed} 条排除规则。", clear_previous=False)
         else:
-            self.output_panel.display("未能移除选中的排除规则。", clear_previous=False)
+            self.output_panel.display("未能移除选中的排除规则（默认规则需在 Config 中修改）。", clear_previous=False)
+        self._refresh_excluded_list()
+        self.refresh_status()
+    
+    def import_exclusions(self):
+        """从 .gitignore 格式的文件导入排除规则"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            return
+        
+        filename = filedialog.askopenfilename(
+            title="选择 .gitignore 格式的规则文件",
+            initialdir=self.git.repo_path
+        )
+        if not filename:
+            return
+        try:
+            patterns, negated = parse_ignore_file(filename)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法读取规则文件: {e}")
+            return
+        
+        profile = self._current_exclusions()
+        previous = list(profile.patterns)
+        added = profile.add(patterns)
+        message = f"从 {os.path.basename(filename)} 导入 {len(added)} 条排除规则"
+        if negated:
+            message += f"（跳过 {negated} 条 ! 否定规则）"
+        self.output_panel.display(message + "。", clear_previous=False)
+        if not added:
+            return
+        self.undo_journal.record_exclusions(f"导入 {len(added)} 条排除规则", previous)
+        self._save_exclusions()
         self._refresh_excluded_list()
         self.refresh_status()
 
@@ -566,27 +1380,65 @@ class SimpleGitApp:
             messagebox.showinfo("提示", "请先在\"已暂存的更改\"列表中选择文件。")
             return
         
-        def callback(success, stdout, stderr):
-            if success:
-                self.pending_refresh = True
-        
-        self.git.run_command_async(
-            ['git', 'reset', 'HEAD', '--'] + files,
-            callback,
-            f"取消暂存 {len(files)} 个文件"
-        )
+        self._run_index_operation(['git', 'reset', 'HEAD', '--'] + files, f"取消暂存 {len(files)} 个文件", files)
     
     def unstage_all(self):
         """取消所有已暂存的更改"""
         if not self.git.is_git_repo(self.git.repo_path):
             return
         
+        self._run_index_operation(['git', 'reset', 'HEAD', '--', '.'], "取消所有暂存的更改")
+    
+    def _discard_index_snapshots(self):
+        """HEAD 移动后（提交、拉取、切换、重置）丢弃当前仓库的暂存快照，它们已不能安全恢复"""
+        self.undo_journal.clear_index()
+    
+    def undo_last_operation(self):
+        """撤销当前仓库最近一次暂存 / 取消暂存 / 排除操作"""
+        entry = self.undo_journal.last()
+        if entry is None:
+            messagebox.showinfo("提示", "没有可撤销的操作。")
+            return
+        
+        if entry.kind == KIND_EXCLUDE:
+            self._current_exclusions().replace(entry.patterns)
+            self.undo_journal.truncate(entry)
+            self._save_exclusions()
+            self.output_panel.display(f"已撤销: {entry.description}", clear_previous=False)
+            self._refresh_excluded_list()
+            self.refresh_status()
+            return
+        
+        if self.undo_journal.is_stale(entry, self.git.get_head_oid()):
+            removed = self.undo_journal.clear_index()
+            self.output_panel.display(
+                f"HEAD 已在“{entry.description}”之后移动（提交、拉取、切换或重置），"
+                f"已丢弃 {removed} 条失效的暂存快照。",
+                clear_previous=False
+            )
+            messagebox.showwarning(
+                "无法撤销",
+                "记录该操作后 HEAD 已经移动，恢复旧的暂存区会把新提交的反向修改暂存起来，因此已取消撤销。"
+            )
+            return
+        
+        if not messagebox.askyesno(
+            "撤销",
+            f"将索引恢复到以下操作之前的状态：\n{entry.label()}\n\n"
+            "之后在其他工具中对暂存区的修改也会被撤销，工作区文件不受影响。是否继续？"
+        ):
+            return
+        
         def callback(success, stdout, stderr):
             if success:
-                self.pending_refresh = True
+                self.output_panel.display(f"已撤销: {entry.description}", clear_previous=False)
+                self._request_refresh()
         
-        description = "取消所有暂存的更改"
-        self.git.run_command_async(['git', 'reset', 'HEAD', '--', '.'], callback, description)
+        self.git.run_task_async(
+            lambda handle: self.undo_journal.undo_index(entry, handle),
+            callback,
+            f"撤销 {entry.description}"
+        )
     
     # ==================== 提交和推送 ====================
     
@@ -606,12 +1458,51 @@ class SimpleGitApp:
             self.refresh_status()
             return
         
-        def callback(success, stdout, stderr):
-            if success:
-                self.root.after(0, lambda: self.commit_message.delete("1.0", tk.END))
-                self.pending_refresh = True
+        no_verify = self.commit_no_verify_var.get()
+        reports = []
         
-        self.git.run_command_async(['git', 'commit', '-m', message], callback, "提交更改")
+        def on_event(kind, text):
+            # 后台线程：经结果队列在主线程中显示
+            self.git.result_queue.put(
+                ("提交进度", True, "", "", lambda *_: self._show_commit_progress(kind, text))
+            )
+        
+        def task(handle):
+            report = self.commit_pipeline.run(message, no_verify, handle, on_event)
+            reports.append(report)
+            return report.success, "", report.error
+        
+        def callback(success, stdout, stderr):
+            report = reports[0] if reports else None
+            if report is not None:
+                self.output_panel.display(report.format_timings())
+            if success and report is not None and report.commit_oid:
+                # 确认生成新提交后才清空提交信息（提交期间被修改过则保留）
+                if self.commit_message.get("1.0", tk.END).strip() == message:
+                    self.commit_message.delete("1.0", tk.END)
+                self.commit_no_verify_var.set(False)
+                self.status_bar.set_text(f"已提交 {report.commit_oid[:8]}（{report.total_ms / 1000:.2f} 秒）")
+                self._discard_index_snapshots()
+                self._request_refresh()
+            elif report is not None and report.failed_in_hook and not no_verify:
+                if messagebox.askyesno(
+                    "钩子未通过",
+                    f"{report.failed_phase} 未通过，钩子共耗时 {report.hook_ms / 1000:.2f} 秒。\n"
+                    "提交信息已保留。\n\n是否跳过钩子 (--no-verify) 重新提交？"
+                ):
+                    self.commit_no_verify_var.set(True)
+                    self.frame_scheduler.schedule('commit', self.commit)
+        
+        desc = "提交更改（跳过钩子）" if no_verify else "提交更改"
+        self.git.run_task_async(task, callback, desc)
+    
+    def _show_commit_progress(self, kind: str, text: str):
+        """显示提交阶段变化和钩子输出"""
+        if kind == 'phase':
+            self.output_panel.display(f"[提交] {text}...")
+            self.status_bar.set_text(f"提交: {text}...")
+        else:
+            self.output_panel.display(f"  {text}")
     
     def push(self, remote: str = None):
         """推送到远程仓库"""
@@ -662,12 +1553,785 @@ class SimpleGitApp:
             return
         
         def callback(success, stdout, stderr):
+            # 失败时也可能已经合并了一部分（冲突），HEAD 或索引都可能变化
+            self._discard_index_snapshots()
             if success:
-                self.pending_refresh = True
-                self.root.after(Config.BRANCH_UPDATE_DELAY_MS, self.update_branch_info)
+                self._request_refresh()
+                self.frame_scheduler.schedule('branch_info', self.update_branch_info, Config.BRANCH_UPDATE_DELAY_MS)
+            else:
+                self._offer_conflicts()
         
         self.git.run_command_async(['git', 'pull'], callback, "拉取更改")
     
+    # ==================== 差异 / 部分暂存 ====================
+    
+    def _selected_diff_target(self, listbox=None):
+        """获取要查看差异的 (路径, 是否已暂存)，目录条目除外"""
+        listboxes = [listbox] if listbox is not None else [self.unstaged_list, self.staged_list]
+        for lb in listboxes:
+            for path in self._get_selected_files(lb):
+                if not path.endswith('/'):
+                    return path, lb is self.staged_list
+        return None
+    
+    def open_diff(self):
+        """打开差异面板并显示第一个选中文件"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        target = self._selected_diff_target()
+        if target is None:
+            messagebox.showinfo("提示", "请先在列表中选择一个文件。")
+            return
+        if self.diff_panel is None or not self.diff_panel.exists():
+            self.diff_panel = DiffPanel(self.root, self._apply_diff_selection, on_close=self._close_diff)
+        self.diff_panel.window.lift()
+        self._diff_target = target
+        self._load_diff()
+    
+    def _retarget_diff(self, listbox):
+        """差异面板打开时切换显示的文件"""
+        if self.diff_panel is None or not self.diff_panel.exists():
+            return
+        target = self._selected_diff_target(listbox)
+        if target is not None and target != self._diff_target:
+            self._diff_target = target
+            self._load_diff()
+    
+    def _close_diff(self):
+        """关闭差异面板"""
+        if self.diff_panel is not None and self.diff_panel.exists():
+            self.diff_panel.window.destroy()
+        self.diff_panel = None
+        self._diff_target = None
+        self._file_diff = None
+    
+    def _load_diff(self):
+        """在后台加载当前文件的差异（使用缓存），完成时目标未变才显示"""
+        path, staged = self._diff_target
+        # 同一文件应用补丁后会重新加载，用加载序号丢弃较早发起的结果
+        self._diff_generation += 1
+        generation = self._diff_generation
+        panel = self.diff_panel
+        panel.set_mode(staged)
+        panel.window.title(f"差异 / 部分暂存 - {path}")
+        # 加载期间不允许按旧差异构建补丁
+        self._file_diff = None
+        panel.set_status(f"{path}: 正在加载差异...")
+        
+        def show(success, text):
+            if self.diff_panel is not None and self.diff_panel.exists() and self._diff_generation == generation:
+                self._show_diff(path, staged, success, text)
+        
+        def load():
+            success, text = self.git.get_file_diff(path, staged)
+            self.git.result_queue.put(("读取差异", True, "", "", lambda *_: show(success, text)))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def _show_diff(self, path: str, staged: bool, success: bool, text: str):
+        """显示加载完成的差异"""
+        panel = self.diff_panel
+        if not success:
+            self._file_diff = None
+            panel.show_lines([])
+            panel.set_status(f"读取差异失败: {text}")
+            return
+        
+        diff = FileDiff(text)
+        self._file_diff = diff
+        # 差异逐字节保留，显示前去掉 \r 并替换无法解码的字节
+        panel.show_lines([
+            line.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace').rstrip('\r')
+            for line in diff.lines
+        ])
+        side = "已暂存" if staged else "未暂存"
+        if not diff.lines:
+            panel.set_status(f"{path}（{side}）: 没有差异（未跟踪文件请整体暂存）")
+        elif diff.is_whole_file_only:
+            panel.set_status(f"{path}（{side}）: 新建/删除/二进制文件只能整体暂存")
+        else:
+            panel.set_status(f"{path}（{side}）: {len(diff.hunks)} 个区块，选中行后点击按钮")
+    
+    def _apply_diff_selection(self, whole_hunks: bool):
+        """把选中的行或区块构建为一个补丁，一次 git apply --cached 应用"""
+        diff = self._file_diff
+        if diff is None or self._diff_target is None:
+            return
+        path, staged = self._diff_target
+        if diff.is_whole_file_only:
+            messagebox.showinfo("提示", "该文件只能整体暂存或取消暂存。", parent=self.diff_panel.window)
+            return
+        
+        first, last = self.diff_panel.selected_line_range()
+        selection = diff.selection_for_lines(first, last, whole_hunks)
+        patch = build_patch(diff, selection, reverse=staged)
+        if not patch:
+            messagebox.showwarning("警告", "选中范围内没有可应用的更改行。", parent=self.diff_panel.window)
+            return
+        
+        def callback(success, stdout, stderr):
+            self.git.invalidate_diffs([path])
+            if success:
+                self.refresh_status([path])
+            if self.diff_panel is not None and self.diff_panel.exists() and self._diff_target == (path, staged):
+                self._load_diff()
+        
+        action = "取消暂存" if staged else "暂存"
+        description = f"部分{action} {path}（{len(selection)} 个区块）"
+        
+        def task(handle):
+            entry = self.undo_journal.record_index(description, [path], handle)
+            success, stdout, stderr = self.git.apply_patch(patch, reverse=staged, handle=handle)
+            if not success and entry is not None:
+                self.undo_journal.discard(entry)
+            return success, stdout, stderr
+        
+        self.git.run_task_async(task, callback, description)
+    
+    # ==================== 追溯 (Blame) ====================
+    
+    def _selected_blame_path(self, listbox=None):
+        """获取要追溯的文件（目录条目除外）"""
+        listboxes = [listbox] if listbox is not None else [self.unstaged_list, self.staged_list]
+        for lb in listboxes:
+            for path in self._get_selected_files(lb):
+                if not path.endswith('/'):
+                    return path
+        return None
+    
+    def open_blame(self):
+        """打开追溯面板并显示第一个选中文件"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        
+        path = self._selected_blame_path()
+        if not path:
+            messagebox.showinfo("提示", "请先在列表中选择一个文件。")
+            return
+        
+        self._show_blame(path)
+    
+    def _show_blame(self, path: str):
+        """显示追溯面板（不存在时创建）并追溯指定文件"""
+        if self.blame_panel is None or not self.blame_panel.exists():
+            self.blame_panel = BlamePanel(self.root, BLAME_GUTTER_WIDTH, on_close=self._close_blame)
+        self.blame_panel.window.lift()
+        self._start_blame(path)
+    
+    def _on_file_selected(self, listbox):
+        """选中文件变化时，已打开的追溯/差异面板切换到新文件"""
+        self._retarget_blame(listbox)
+        self._retarget_diff(listbox)
+    
+    def _retarget_blame(self, listbox):
+        """追溯面板打开时切换追溯目标（取消上一次计算）"""
+        if self.blame_panel is None or not self.blame_panel.exists():
+            return
+        path = self._selected_blame_path(listbox)
+        if path and (self._blame_session is None or self._blame_session.path != path):
+            self._start_blame(path)
+    
+    def _start_blame(self, path: str):
+        """启动追溯计算"""
+        self._blame_session = self.blame_service.start(path)
+        self.blame_panel.window.title(f"追溯 (Blame) - {path}")
+        self.blame_panel.set_status(f"正在读取 {path} ...")
+        self.blame_panel.set_content([])
+    
+    def _close_blame(self):
+        """关闭面板时取消计算"""
+        self.blame_service.cancel()
+        self._blame_session = None
+        if self.blame_panel is not None and self.blame_panel.exists():
+            self.blame_panel.window.destroy()
+        self.blame_panel = None
+    
+    def _drain_blame_events(self):
+        """取出追溯事件并批量更新面板（每次有上限，保持界面响应）"""
+        session = self._blame_session
+        if session is None or self.blame_panel is None:
+            return
+        if not self.blame_panel.exists():
+            self._close_blame()
+            return
+        
+        chunks = []
+        try:
+            for _ in range(Config.BLAME_EVENTS_PER_TICK):
+                event = session.events.get_nowait()
+                kind = event[0]
+                if kind == 'chunk':
+                    chunks.append((event[1], event[2], event[3].label()))
+                    continue
+                self.blame_panel.apply_chunks(chunks)
+                chunks = []
+                if kind == 'content':
+                    self.blame_panel.set_content(event[2])
+                    self.blame_panel.set_status(f"{event[1]}: {len(event[2])} 行，正在计算追溯信息...")
+                elif kind == 'done':
+                    source = "缓存" if event[3] else "git blame"
+                    self.blame_panel.set_status(f"{event[1]}: 完成（{source}，{event[2]:.0f} ms）")
+                    self._blame_session = None
+                    break
+                elif kind == 'error':
+                    self.blame_panel.set_status(f"{event[1]}: {event[2]}")
+                    self._blame_session = None
+                    break
+        except queue.Empty:
+            pass
+        self.blame_panel.apply_chunks(chunks)
+    
+    # ==================== 内容搜索 ====================
+    
+    def open_search(self):
+        """打开内容搜索面板"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        if self.search_panel is None or not self.search_panel.exists():
+            self.search_panel = SearchPanel(self.root, self._schedule_search, on_close=self._close_search)
+            self.search_panel.results.bind('<Double-Button-1>', lambda e: self._on_search_result_open())
+        self.search_panel.window.lift()
+    
+    def _schedule_search(self):
+        """输入变化后延迟启动搜索，并立即取消正在进行的旧搜索"""
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self.search_service.cancel()
+        self._search_session = None
+        self._search_job = self.root.after(Config.SEARCH_DEBOUNCE_MS, self._start_search)
+    
+    def _start_search(self):
+        """按面板中的条件启动搜索"""
+        self._search_job = None
+        panel = self.search_panel
+        if panel is None or not panel.exists():
+            return
+        query, scope, ignore_case, regex = panel.get()
+        panel.clear()
+        self._search_matches = []
+        if len(query) < Config.SEARCH_MIN_QUERY:
+            panel.set_status(f"请输入至少 {Config.SEARCH_MIN_QUERY} 个字符。" if query else "")
+            return
+        
+        ref = None
+        if scope == SCOPE_REF:
+            ref = self.branch_combobox.get() or 'HEAD'
+        self._search_session = self.search_service.start(query, scope, ref, ignore_case, regex)
+        panel.set_status(f"正在搜索{'（' + ref + '）' if ref else ''} ...")
+    
+    def _close_search(self):
+        """关闭面板时取消搜索"""
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+        self.search_service.cancel()
+        self._search_session = None
+        if self.search_panel is not None and self.search_panel.exists():
+            self.search_panel.window.destroy()
+        self.search_panel = None
+    
+    def _drain_search_events(self):
+        """取出搜索结果并批量追加到面板"""
+        session = self._search_session
+        if session is None or self.search_panel is None:
+            return
+        if not self.search_panel.exists():
+            self._close_search()
+            return
+        
+        items = []
+        try:
+            for _ in range(Config.SEARCH_RESULTS_PER_TICK):
+                event = session.events.get_nowait()
+                kind = event[0]
+                if kind == 'match':
+                    _, path, number, text = event
+                    self._search_matches.append((path, number))
+                    items.append(f"{path}:{number}: {text.strip()}")
+                    continue
+                if kind == 'done':
+                    _, count, elapsed_ms, truncated = event
+                    more = f"（已达上限 {Config.SEARCH_MAX_RESULTS}，结果已截断）" if truncated else ""
+                    self.search_panel.set_status(f"找到 {count} 处匹配，用时 {elapsed_ms:.0f} ms{more}")
+                else:
+                    self.search_panel.set_status(f"搜索失败: {event[1]}")
+                self._search_session = None
+                break
+        except queue.Empty:
+            pass
+        self.search_panel.append(items)
+        if items and self._search_session is not None:
+            self.search_panel.set_status(f"正在搜索 ... 已找到 {len(self._search_matches)} 处")
+    
+    def _on_search_result_open(self):
+        """双击搜索结果：追溯该文件"""
+        selection = self.search_panel.results.curselection()
+        if not selection or selection[0] >= len(self._search_matches):
+            return
+        path, number = self._search_matches[selection[0]]
+        self.output_panel.display(f"搜索结果: {path} 第 {number} 行")
+        self._show_blame(path)
+    
+    # ==================== 储藏 (Stash) ====================
+    
+    def open_stash(self):
+        """打开储藏管理面板"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        if self.stash_panel is None or not self.stash_panel.exists():
+            self.stash_panel = StashPanel(
+                self.root,
+                {
+                    "新建储藏": self.stash_save,
+                    "应用": lambda: self._stash_action('apply'),
+                    "弹出": lambda: self._stash_action('pop'),
+                    "删除": lambda: self._stash_action('drop'),
+                    "刷新": self.refresh_stashes,
+                },
+                on_select=self._on_stash_selected,
+                on_close=self._close_stash
+            )
+        self.stash_panel.window.lift()
+        self.refresh_stashes()
+    
+    def _close_stash(self):
+        """关闭储藏面板"""
+        if self.stash_panel is not None and self.stash_panel.exists():
+            self.stash_panel.window.destroy()
+        self.stash_panel = None
+        self._stashes = []
+    
+    def refresh_stashes(self):
+        """刷新储藏列表（面板未打开时不执行）"""
+        if self.stash_panel is None or not self.stash_panel.exists():
+            return
+        self._stashes = self.git.list_stashes()
+        self.stash_panel.set_items([
+            f"{ref}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))}  {subject}"
+            for ref, _, timestamp, subject in self._stashes
+        ])
+        self.stash_panel.show_text("" if self._stashes else "没有储藏。")
+    
+    def _selected_stash(self):
+        """获取选中的储藏 (ref, oid, 时间戳, 说明)"""
+        if self.stash_panel is None:
+            return None
+        index = self.stash_panel.selected_index()
+        if index is None or index >= len(self._stashes):
+            return None
+        return self._stashes[index]
+    
+    def _on_stash_selected(self):
+        """选中储藏时在后台加载其内容（按 oid 缓存）"""
+        stash = self._selected_stash()
+        if stash is None:
+            return
+        oid = stash[1]
+        self.stash_panel.show_text("正在加载...")
+        
+        def show(success, diff):
+            stash = self._selected_stash()
+            if stash is not None and stash[1] == oid:
+                self.stash_panel.show_text(diff if success else f"读取失败: {diff}")
+        
+        def load():
+            success, diff = self.git.get_stash_diff(oid)
+            self.git.result_queue.put(("读取储藏", True, "", "", lambda *_: show(success, diff)))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def stash_save(self):
+        """储藏当前所有更改（含未跟踪文件）"""
+        message = simpledialog.askstring("新建储藏", "储藏说明（可留空）:", parent=self.stash_panel.window)
+        if message is None:
+            return
+        
+        command = ['git', 'stash', 'push', '--include-untracked']
+        if message.strip():
+            command.extend(['-m', message.strip()])
+        
+        def callback(success, stdout, stderr):
+            self.refresh_stashes()
+            self.refresh_status()
+        
+        self.git.run_command_async(command, callback, "新建储藏")
+    
+    def _stash_action(self, action: str):
+        """对选中的储藏执行 apply / pop / drop"""
+        stash = self._selected_stash()
+        if stash is None:
+            messagebox.showwarning("警告", "请先选择一个储藏。", parent=self.stash_panel.window)
+            return
+        ref = stash[0]
+        if action == 'drop' and not messagebox.askyesno(
+            "确认", f"确定要删除储藏 {ref} 吗？", parent=self.stash_panel.window
+        ):
+            return
+        
+        command = ['git', 'stash', action] + (['--index'] if action != 'drop' else []) + [ref]
+        
+        def callback(success, stdout, stderr):
+            self.refresh_stashes()
+            if action != 'drop':
+                self.refresh_status()
+                if not success:
+                    self._offer_conflicts()
+        
+        self.git.run_command_async(command, callback, f"储藏 {action} {ref}")
+    
+    # ==================== 合并冲突 ====================
+    
+    def open_conflicts(self):
+        """打开冲突解决面板"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        if self.conflict_panel is None or not self.conflict_panel.exists():
+            self.conflict_panel = ConflictPanel(
+                self.root,
+                STAGE_NAMES,
+                {
+                    "采用我方 (ours)": lambda: self.resolve_selected_conflicts('ours'),
+                    "采用对方 (theirs)": lambda: self.resolve_selected_conflicts('theirs'),
+                    "刷新": self.refresh_conflicts,
+                },
+                on_select=self._on_conflict_selected,
+                on_close=self._close_conflicts
+            )
+        self.conflict_panel.window.lift()
+        self.refresh_conflicts()
+    
+    def _close_conflicts(self):
+        """关闭冲突面板并结束内容读取进程（已读取的内容保留在缓存中）"""
+        if self.conflict_panel is not None and self.conflict_panel.exists():
+            self.conflict_panel.window.destroy()
+        self.conflict_panel = None
+        self._conflicts = []
+        self.conflict_store.close()
+    
+    def _offer_conflicts(self):
+        """命令失败后检查是否留下了冲突，有则提示并打开冲突面板"""
+        conflicts = self.git.list_conflicts()
+        if not conflicts:
+            return
+        self.output_panel.display(f"有 {len(conflicts)} 个路径存在冲突，可在“解决冲突”面板中处理。")
+        self.open_conflicts()
+    
+    def refresh_conflicts(self):
+        """刷新冲突列表（面板未打开时不执行）"""
+        if self.conflict_panel is None or not self.conflict_panel.exists():
+            return
+        self._conflicts = self.git.list_conflicts()
+        self.conflict_panel.set_items([entry.label() for entry in self._conflicts])
+        self.conflict_panel.show_stages({})
+        if self._conflicts:
+            self.conflict_panel.set_status(f"共 {len(self._conflicts)} 个冲突路径（可多选后整体解决）")
+        else:
+            self.conflict_panel.set_status("没有冲突。")
+    
+    def _selected_conflicts(self) -> list:
+        """获取选中的未合并条目"""
+        if self.conflict_panel is None:
+            return []
+        return [self._conflicts[i] for i in self.conflict_panel.selected_indices() if i < len(self._conflicts)]
+    
+    def _on_conflict_selected(self):
+        """在后台加载第一个选中路径的各阶段内容（经同一个 cat-file 进程读取，按 oid 缓存）"""
+        selected = self._selected_conflicts()
+        if not selected:
+            return
+        entry = selected[0]
+        self.conflict_panel.show_stages({}, "正在加载...")
+        
+        def show(texts):
+            current = self._selected_conflicts()
+            if current and current[0] is entry:
+                self.conflict_panel.show_stages(texts, "（此方没有该文件）")
+        
+        def load():
+            texts = self.conflict_store.load(entry)
+            self.git.result_queue.put(("读取冲突内容", True, "", "", lambda *_: show(texts)))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def resolve_selected_conflicts(self, side: str):
+        """把选中的冲突路径整体解决为我方或对方的版本"""
+        entries = self._selected_conflicts()
+        if not entries:
+            messagebox.showwarning("警告", "请先选择冲突路径。", parent=self.conflict_panel.window)
+            return
+        name = "我方 (ours)" if side == 'ours' else "对方 (theirs)"
+        if not messagebox.askyesno(
+            "确认", f"确定要将选中的 {len(entries)} 个路径解决为{name}的版本吗？\n\n另一方的修改将被丢弃。",
+            parent=self.conflict_panel.window
+        ):
+            return
+        paths = [entry.path for entry in entries]
+        
+        def callback(success, stdout, stderr):
+            self.refresh_conflicts()
+            self._request_refresh(paths)
+        
+        self.git.run_task_async(
+            lambda handle: self.git.resolve_conflicts(entries, side, handle),
+            callback,
+            f"解决冲突（{name}，{len(entries)} 个路径）"
+        )
+    
+    # ==================== 引用日志 (Reflog) ====================
+    
+    def open_reflog(self):
+        """打开引用日志面板"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        if self.reflog_panel is None or not self.reflog_panel.exists():
+            self.reflog_panel = ReflogPanel(
+                self.root,
+                {
+                    "软重置到此处 (soft)": lambda: self._reset_to_reflog('soft'),
+                    "混合重置到此处 (mixed)": lambda: self._reset_to_reflog('mixed'),
+                    "硬重置到此处 (hard)": lambda: self._reset_to_reflog('hard'),
+                },
+                on_select=self._on_reflog_selected,
+                on_close=self._close_reflog
+            )
+        self.reflog_panel.window.lift()
+        if self._reflog_repo != self.git.repo_path:
+            self._load_reflog()
+        else:
+            self._redraw_reflog()
+    
+    def _close_reflog(self):
+        """关闭引用日志面板（保留读取器，再次打开时只读取新增的行）"""
+        if self.reflog_panel is not None and self.reflog_panel.exists():
+            self.reflog_panel.window.destroy()
+        self.reflog_panel = None
+    
+    def _load_reflog(self):
+        """为当前仓库创建读取器，并在后台完成首次读取"""
+        repo = self.git.repo_path
+        git_dir = self.git.get_git_dir()
+        if git_dir is None:
+            return
+        tail = ReflogTail(os.path.join(git_dir, 'logs', 'HEAD'))
+        self._reflog_tail = tail
+        self._reflog_repo = repo
+        self._reflog_loading = True
+        if self.reflog_panel is not None:
+            self.reflog_panel.set_items([])
+            self.reflog_panel.set_status("正在读取引用日志...")
+        
+        def show(*_):
+            if self._reflog_tail is tail:
+                self._reflog_loading = False
+                self._reflog_polled_at = time.monotonic()
+                self._redraw_reflog()
+        
+        def load():
+            tail.poll()
+            self.git.result_queue.put(("读取引用日志", True, "", "", show))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def _redraw_reflog(self):
+        """按读取器中的条目整体重绘面板"""
+        tail = self._reflog_tail
+        if self.reflog_panel is None or tail is None or self._reflog_loading:
+            return
+        self.reflog_panel.set_items([entry.label() for entry in reversed(tail.entries)])
+        self.reflog_panel.show_detail("")
+        self._update_reflog_status()
+    
+    def _update_reflog_status(self):
+        """显示条目数"""
+        tail = self._reflog_tail
+        if not tail.total:
+            self.reflog_panel.set_status("没有引用日志。")
+        elif tail.total > len(tail.entries):
+            self.reflog_panel.set_status(f"共 {tail.total} 条，显示最近 {len(tail.entries)} 条")
+        else:
+            self.reflog_panel.set_status(f"共 {tail.total} 条")
+    
+    def _pump_reflog(self, deadline: float) -> bool:
+        """面板打开时定期检查引用日志，只把新增的条目插入到顶部"""
+        panel = self.reflog_panel
+        if panel is None or self._reflog_loading or self._reflog_tail is None:
+            return False
+        now = time.monotonic()
+        if (now - self._reflog_polled_at) * 1000 < Config.REFLOG_POLL_MS:
+            return False
+        self._reflog_polled_at = now
+        if not panel.exists():
+            self._close_reflog()
+            return False
+        if self._reflog_repo != self.git.repo_path:
+            self._load_reflog()
+            return False
+        
+        tail = self._reflog_tail
+        entries, reset = tail.poll()
+        if reset:
+            self._redraw_reflog()
+        elif entries:
+            panel.prepend([entry.label() for entry in reversed(entries)], tail.window)
+            self._update_reflog_status()
+        return False
+    
+    def _selected_reflog_entry(self):
+        """获取选中的条目（列表第 i 行对应从最新往前第 i 条）"""
+        tail = self._reflog_tail
+        if self.reflog_panel is None or tail is None:
+            return None
+        index = self.reflog_panel.selected_index()
+        if index is None or index >= len(tail.entries):
+            return None
+        return tail.entries[-1 - index]
+    
+    def _on_reflog_selected(self):
+        """显示选中条目的详细信息"""
+        entry = self._selected_reflog_entry()
+        if entry is not None:
+            self.reflog_panel.show_detail(entry.describe(self._reflog_tail.total))
+    
+    def _reset_to_reflog(self, mode: str):
+        """在后台把当前分支重置到选中条目的提交"""
+        entry = self._selected_reflog_entry()
+        if entry is None:
+            messagebox.showwarning("警告", "请先选择一条记录。", parent=self.reflog_panel.window)
+            return
+        target = f"{entry.selector(self._reflog_tail.total)} ({entry.new_oid[:8]})"
+        prompt = f"确定要将当前分支重置 (--{mode}) 到 {target} 吗？"
+        if mode == 'hard':
+            prompt += "\n\n工作区和暂存区中未提交的更改将全部丢失！"
+        if not messagebox.askyesno("确认", prompt, parent=self.reflog_panel.window):
+            return
+        
+        def callback(success, stdout, stderr):
+            if success:
+                self._discard_index_snapshots()
+                self._request_refresh()
+                self.frame_scheduler.schedule('branch_info', self.update_branch_info)
+        
+        # 按 oid 重置：面板打开期间有新条目追加时 HEAD@{n} 的编号会变化
+        self.git.run_command_async(['git', 'reset', f'--{mode}', entry.new_oid], callback, f"重置到 {target}")
+    
+    # ==================== 仓库体检与维护 ====================
+    
+    def open_maintenance(self):
+        """打开仓库体检面板并开始体检"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            messagebox.showerror("错误", "不是有效的 Git 仓库。")
+            return
+        if self.maintenance_panel is None or not self.maintenance_panel.exists():
+            self.maintenance_panel = MaintenancePanel(
+                self.root,
+                {
+                    "重新体检": self.probe_repository,
+                    "执行所选维护": self.run_selected_maintenance,
+                },
+                on_close=self._close_maintenance
+            )
+        self.maintenance_panel.window.lift()
+        self.probe_repository()
+    
+    def _close_maintenance(self):
+        """关闭仓库体检面板"""
+        if self.maintenance_panel is not None and self.maintenance_panel.exists():
+            self.maintenance_panel.window.destroy()
+        self.maintenance_panel = None
+        self._maintenance_tasks = []
+    
+    def probe_repository(self):
+        """在后台体检当前仓库（计时查询会执行 status，因此占用忙碌状态）"""
+        panel = self.maintenance_panel
+        if panel is None:
+            return
+        results = []
+        
+        def task(handle):
+            health = self.git.probe_health(handle)
+            results.append(health)
+            return health is not None, "", "" if health is not None else "无法读取仓库信息"
+        
+        def callback(success, stdout, stderr):
+            if self.maintenance_panel is not panel or not panel.exists():
+                return
+            health = results[0] if results else None
+            if health is None:
+                panel.set_status("体检失败。")
+                return
+            self._maintenance_tasks = recommend(health)
+            panel.show_text("\n".join(health.describe()))
+            panel.set_items([task.label() for task in self._maintenance_tasks])
+            if self._maintenance_tasks:
+                panel.set_status(f"发现 {len(self._maintenance_tasks)} 项维护建议")
+            else:
+                panel.set_status("未发现需要维护的项目")
+        
+        if self.git.run_task_async(task, callback, "仓库体检") is None:
+            messagebox.showwarning("警告", "有命令正在执行，请稍后再试。", parent=panel.window)
+            return
+        panel.set_status("正在体检...")
+        panel.set_items([])
+    
+    def run_selected_maintenance(self):
+        """在后台执行选中的维护任务，完成后显示前后耗时对比（可再次体检查看新的状态）"""
+        panel = self.maintenance_panel
+        if panel is None:
+            return
+        tasks = [
+            self._maintenance_tasks[i] for i in panel.selected_indices() if i < len(self._maintenance_tasks)
+        ]
+        if not tasks:
+            messagebox.showwarning("警告", "请先选择要执行的维护任务。", parent=panel.window)
+            return
+        if not messagebox.askyesno(
+            "确认", "将依次执行:\n" + "\n".join(f"  {task.title}" for task in tasks)
+            + "\n\n大型仓库可能需要数分钟，期间可在状态栏取消。是否继续？",
+            parent=panel.window
+        ):
+            return
+        outputs = []
+        
+        def on_line(line):
+            # 后台线程：经结果队列在主线程中显示
+            self.git.result_queue.put(
+                ("维护进度", True, "", "", lambda *_: self._show_maintenance_line(panel, line))
+            )
+        
+        def task(handle):
+            success, stdout, stderr = self.git.run_maintenance(tasks, handle, on_line)
+            outputs.append(stdout)
+            return success, "", stderr
+        
+        def callback(success, stdout, stderr):
+            report = outputs[0] if outputs else ""
+            comparison = report.partition("耗时对比")[2]
+            if comparison:
+                self.output_panel.display("维护完成，耗时对比" + comparison)
+            if self.maintenance_panel is panel and panel.exists():
+                if comparison:
+                    panel.append_text("耗时对比" + comparison)
+                panel.set_status("维护完成" if success else "部分维护任务失败")
+                self._maintenance_tasks = []
+                panel.set_items([])
+        
+        if self.git.run_task_async(task, callback, "仓库维护") is None:
+            messagebox.showwarning("警告", "有命令正在执行，请稍后再试。", parent=panel.window)
+            return
+        panel.show_text("")
+        panel.set_status("正在执行维护...")
+    
+    def _show_maintenance_line(self, panel, line: str):
+        """在体检面板中追加一行维护输出"""
+        if self.maintenance_panel is panel and panel.exists():
+            panel.append_text(line)
+    
     # ==================== 分支操作 ====================
     
     def update_branch_info(self):
@@ -681,6 +2345,10 @@ class SimpleGitApp:
         current, local_branches, remote_branches = self.git.get_all_branches()
         self.current_branch_var.set(current)
         
+        # 引用可能已变化：丢弃不是基于当前 HEAD 的追溯结果
+        if len(self.blame_service.cache):
+            self.blame_service.invalidate(self.git.get_head_oid())
+        
         # 合并并排序分支列表
         all_branches = sorted(
             set(local_branches + remote_branches),
@@ -701,12 +2369,12 @@ class SimpleGitApp:
         
         def callback(success, stdout, stderr):
             if success:
-                self.root.after(0, self.update_branch_info)
+                self.frame_scheduler.schedule('branch_info', self.update_branch_info)
         
         self.git.run_command_async(
-            ['git', 'fetch', 'origin', '--prune'],
+            ['git', 'fetch', '--all', '--prune'],
             callback,
-            "抓取远程更新"
+            "抓取所有远程更新"
         )
     
     def switch_branch(self):
@@ -725,19 +2393,56 @@ class SimpleGitApp:
             messagebox.showinfo("提示", f"你当前已经在 '{current}' 分支了。")
             return
         
-        # 检查未提交更改
-        if self.git.has_uncommitted_changes():
-            if not messagebox.askyesno("警告", "检测到未提交的更改。\n是否仍然切换？"):
+        # 在后台检查未提交更改（可能需要比较文件内容），完成后再询问并切换
+        repo_path = self.git.repo_path
+        
+        def check():
+            dirty = self.git.has_uncommitted_changes()
+            
+            def proceed(*_):
+                if self.git.repo_path == repo_path:
+                    self._switch_branch_checked(target, dirty)
+            
+            self.git.result_queue.put(("检查未提交更改", True, "", "", proceed))
+        
+        self.output_panel.display(f"正在检查未提交的更改（切换到 {target}）...")
+        threading.Thread(target=check, daemon=True).start()
+    
+    def _switch_branch_checked(self, target: str, dirty: bool):
+        """检查完未提交更改后切换分支（有更改时可选择自动储藏、切换并恢复）"""
+        auto_stash = False
+        if dirty:
+            answer = messagebox.askyesnocancel(
+                "警告",
+                "检测到未提交的更改（大文件、LFS 文件只比较了 stat 信息，可能并未修改）。\n\n"
+                "是：储藏更改，切换后自动恢复\n"
+                "否：直接切换\n"
+                "取消：放弃切换"
+            )
+            if answer is None:
                 return
+            auto_stash = answer
         
         # 提取实际分支名
         actual_name = target.split('/')[-1] if '/' in target else target
         
         def callback(success, stdout, stderr):
+            # 自动储藏时即使切换失败，索引也经过了储藏和恢复
+            self._discard_index_snapshots()
             self.update_branch_info()
             self.refresh_status()
-        
-        self.git.run_command_async(['git', 'checkout', actual_name], callback, f"切换到 {actual_name}")
+            self.refresh_stashes()
+            if not success:
+                self._offer_conflicts()
+        
+        if auto_stash:
+            self.git.run_task_async(
+                lambda handle: self.git.stash_switch_pop(actual_name, handle),
+                callback,
+                f"储藏并切换到 {actual_name}"
+            )
+        else:
+            self.git.run_command_async(['git', 'checkout', actual_name], callback, f"切换到 {actual_name}")
     
     def create_and_switch_branch(self):
         """创建并切换到新分支"""
@@ -872,7 +2577,14 @@ class SimpleGitApp:
     def cleanup(self):
         """清理资源"""
         try:
+            self.fetch_scheduler.stop()
+            self.blame_service.cancel()
+            self.search_service.cancel()
+            self.conflict_store.close()
+            self.git.cancel_all(force=True)
+            self.git.ssh_mux.shutdown()
             self.git.result_queue.put(None)
+            self.frame_scheduler.stop()
             self.git.clear_cache()
         except Exception as e:
             print(f"清理时出错: {e}")
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+只读查询后端模块
+GitCore 的只读查询（HEAD、分支、远程、储藏等）经由后端执行：
+子进程后端调用 git 命令，进程内后端直接读取 Git 目录，路由器优先使用能回答的后端
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class BackendUnsupported(Exception):
+    """后端无法保证与 git 命令结果一致，应交给下一个后端"""
+
+
+# 经由后端执行的只读查询（也是基准测试的项目）
+READ_OPERATIONS = (
+    'head_oid', 'current_branch', 'branches', 'ref_digest', 'remotes', 'stashes',
+)
+
+
+class GitBackend:
+    """
+    只读查询后端接口
+
+    无法回答时抛出 BackendUnsupported；返回值格式与 GitCore 对应方法相同。
+    """
+
+    name = "base"
+
+    def head_oid(self) -> Optional[str]:
+        """HEAD 指向的提交 oid（无提交时返回 None）"""
+        raise BackendUnsupported()
+
+    def current_branch(self) -> str:
+        """当前分支名（分离 HEAD 时为 "HEAD"，失败时为 "未知"）"""
+        raise BackendUnsupported()
+
+    def branches(self) -> Tuple[str, List[str], List[str]]:
+        """(当前分支, 本地分支, 远程跟踪分支)"""
+        raise BackendUnsupported()
+
+    def ref_digest(self) -> str:
+        """所有引用 (oid, refname) 的摘要"""
+        raise BackendUnsupported()
+
+    def remotes(self) -> List[str]:
+        """远程仓库名称"""
+        raise BackendUnsupported()
+
+    def remote_url(self, name: str) -> Optional[str]:
+        """远程仓库 URL"""
+        raise BackendUnsupported()
+
+    def stashes(self) -> List[Tuple[str, str, int, str]]:
+        """[(stash@{n}, 提交 oid, 提交时间戳, 说明), ...]"""
+        raise BackendUnsupported()
+
+    def read_object(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        """读取对象 (类型, 内容)，不存在时返回 None"""
+        raise BackendUnsupported()
+
+    def close(self):
+        """释放资源"""
+
+
+def digest_refs(listing: str) -> str:
+    """for-each-ref 输出（每行 "<oid> <refname>"）的摘要，两个后端共用"""
+    return hashlib.sha1(listing.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+class SubprocessBackend(GitBackend):
+    """通过 git 命令回答查询（原有行为，可回答所有查询）"""
+
+    name = "git 子进程"
+
+    def __init__(self, git):
+        self.git = git
+
+    def head_oid(self) -> Optional[str]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'rev-parse', '--verify', '--quiet', 'HEAD'])
+        if returncode == 0 and stdout.strip():
+            return stdout.strip()
+        return None
+
+    def current_branch(self) -> str:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'rev-parse', '--abbrev-ref', 'HEAD'])
+        if returncode == 0 and stdout:
+            return stdout.strip()
+        return "未知"
+
+    def branches(self) -> Tuple[str, List[str], List[str]]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'branch', '-a', '--no-color'])
+        if returncode != 0:
+            return "未知", [], []
+
+        current_branch = None
+        local_branches = []
+        remote_branches = []
+
+        for line in stdout.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+
+            is_current = line.startswith('*')
+            # "+" 标记在其他工作树中检出的分支
+            branch_name = line[1:].strip() if line[0] in '*+' else line
+
+            # 跳过特殊引用
+            if 'HEAD detached' in branch_name or ' -> ' in branch_name:
+                if is_current:
+                    current_branch = branch_name
+                continue
+
+            if branch_name.startswith('remotes/'):
+                parts = branch_name.split('/', 2)
+                if len(parts) == 3:
+                    display_name = f"{parts[1]}/{parts[2]}"
+                    remote_branches.append(display_name)
+            else:
+                local_branches.append(branch_name)
+                if is_current:
+                    current_branch = branch_name
+
+        if current_branch is None and local_branches:
+            current_branch = local_branches[0]
+
+        return current_branch or "未知", local_branches, remote_branches
+
+    def ref_digest(self) -> str:
+        stdout, _, returncode = self.git.run_command_sync(
+            ['git', 'for-each-ref', '--format=%(objectname) %(refname)']
+        )
+        if returncode != 0:
+            return ""
+        return digest_refs(stdout)
+
+    def remotes(self) -> List[str]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'remote'])
+        if returncode != 0 or not stdout:
+            return []
+        return [r.strip() for r in stdout.split('\n') if r.strip()]
+
+    def remote_url(self, name: str) -> Optional[str]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'remote', 'get-url', name])
+        if returncode == 0 and stdout:
+            return stdout.strip()
+        return None
+
+    def stashes(self) -> List[Tuple[str, str, int, str]]:
+        stdout, _, returncode = self.git.run_command_sync(
+            ['git', 'stash', 'list', '-z', '--format=%gd%x1f%H%x1f%ct%x1f%gs']
+        )
+        if returncode != 0:
+            return []
+
+        stashes = []
+        for record in stdout.split('\0'):
+            fields = record.strip('\n').split('\x1f')
+            if len(fields) != 4:
+                continue
+            ref, oid, timestamp, subject = fields
+            stashes.append((ref, oid, int(timestamp) if timestamp.isdigit() else 0, subject))
+        return stashes
+
+    def read_object(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'cat-file', '-t', oid])
+        if returncode != 0:
+            return None
+        kind = stdout.strip()
+        content, _, returncode = self.git.run_command_sync(['git', 'cat-file', kind, oid], exact=True)
+        if returncode != 0:
+            return None
+        return kind, content.encode('utf-8', 'surrogateescape')
+
+
+class BackendRouter(GitBackend):
+    """
+    后端路由
+
+    按顺序尝试各后端，第一个不抛出 BackendUnsupported 的结果即为答案；
+    分别统计每个后端回答的次数和回退次数。
+    """
+
+    name = "路由"
+
+    def __init__(self, repo_path: str, backends: Sequence[GitBackend]):
+        self.repo_path = repo_path
+        self.backends = list(backends)
+        self._answered: Dict[str, int] = {backend.name: 0 for backend in self.backends}
+        self._fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _route(self, operation: str, *args):
+        for position, backend in enumerate(self.backends):
+            try:
+                result = getattr(backend, operation)(*args)
+            except BackendUnsupported:
+                continue
+            with self._lock:
+                self._answered[backend.name] += 1
+                if position:
+                    self._fallbacks += 1
+            return result
+        raise BackendUnsupported(operation)
+
+    def head_oid(self):
+        return self._route('head_oid')
+
+    def current_branch(self):
+        return self._route('current_branch')
+
+    def branches(self):
+        return self._route('branches')
+
+    def ref_digest(self):
+        return self._route('ref_digest')
+
+    def remotes(self):
+        return self._route('remotes')
+
+    def remote_url(self, name: str):
+        return self._route('remote_url', name)
+
+    def stashes(self):
+        return self._route('stashes')
+
+    def read_object(self, oid: str):
+        return self._route('read_object', oid)
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        with self._lock:
+            answered = "，".join(f"{name} {count} 次" for name, count in self._answered.items())
+            return f"只读查询后端: {answered}（回退 {self._fallbacks} 次）"
+
+
+def measure_backends(
+    backends: Sequence[GitBackend], iterations: int = 20, operations: Sequence[str] = READ_OPERATIONS
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    对比各后端每次查询的平均耗时（毫秒），并检查结果是否与第一个后端一致
+
+    Returns:
+        查询名 -> {后端名: 平均毫秒（不支持时为 None）, ..., 'match': 结果是否一致}
+    """
+    report: Dict[str, Dict[str, Optional[float]]] = {}
+    for operation in operations:
+        row: Dict[str, Optional[float]] = {}
+        results = []
+        for backend in backends:
+            call: Callable = getattr(backend, operation)
+            try:
+                result = call()  # 预热（打开文件、建立映射）并记录结果
+            except BackendUnsupported:
+                row[backend.name] = None
+                continue
+            results.append(result)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            row[backend.name] = (time.perf_counter() - started) * 1000 / iterations
+        row['match'] = all(result == results[0] for result in results)
+        report[operation] = row
+    return report
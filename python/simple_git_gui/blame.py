@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Blame 模块
+流式解析 git blame --incremental 输出，按 (blob oid, HEAD oid) 缓存结果
+"""
+
+import queue
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .cache import LRUCache
+from .config import Config
+
+
+# 行首区域宽度（字符）
+BLAME_GUTTER_WIDTH = 34
+
+
+class BlameCommit:
+    """Blame 中的提交信息（同一提交只保存一份）"""
+
+    __slots__ = ('sha', 'author', 'author_time', 'summary', '_label')
+
+    def __init__(self, sha: str):
+        self.sha = sha
+        self.author = ""
+        self.author_time = 0
+        self.summary = ""
+        self._label: Optional[str] = None
+
+    @property
+    def uncommitted(self) -> bool:
+        return not self.sha.strip('0')
+
+    def label(self) -> str:
+        """行首显示文本：短 sha、作者、日期（固定宽度）"""
+        if self._label is None:
+            if self.uncommitted:
+                text = "未提交"
+            else:
+                date = time.strftime('%Y-%m-%d', time.localtime(self.author_time)) if self.author_time else ""
+                text = f"{self.sha[:8]} {self.author[:12]:<12} {date}"
+            self._label = f"{text:<{BLAME_GUTTER_WIDTH}}"[:BLAME_GUTTER_WIDTH]
+        return self._label
+
+
+class IncrementalBlameParser:
+    """
+    git blame --incremental 输出解析器
+
+    每组以 "<sha> <原行号> <最终行号> <行数>" 开头，以 "filename <路径>" 结束；
+    提交首次出现时其间包含 author、author-time、summary 等字段。
+    """
+
+    def __init__(self):
+        self.commits: Dict[str, BlameCommit] = {}
+        self._current: Optional[Tuple[BlameCommit, int, int]] = None
+
+    def feed(self, line: str) -> Optional[Tuple[int, int, BlameCommit]]:
+        """
+        输入一行输出
+
+        Returns:
+            一组完成时返回 (起始行号(1 起), 行数, 提交)，否则返回 None
+        """
+        if self._current is None:
+            parts = line.split(' ')
+            if len(parts) >= 4 and len(parts[0]) >= 40:
+                sha = parts[0]
+                commit = self.commits.get(sha)
+                if commit is None:
+                    commit = BlameCommit(sha)
+                    self.commits[sha] = commit
+                try:
+                    self._current = (commit, int(parts[2]), int(parts[3]))
+                except ValueError:
+                    self._current = None
+            return None
+
+        commit, final_line, num_lines = self._current
+        key, _, value = line.partition(' ')
+        if key == 'filename':
+            self._current = None
+            return final_line, num_lines, commit
+        if key == 'author':
+            commit.author = value
+        elif key == 'author-time':
+            try:
+                commit.author_time = int(value)
+            except ValueError:
+                pass
+        elif key == 'summary':
+            commit.summary = value
+        return None
+
+
+class BlameResult:
+    """完整的 Blame 结果：提交表 + 每行对应的提交编号"""
+
+    __slots__ = ('commits', 'line_commits', '_numbers')
+
+    def __init__(self, line_count: int):
+        self.commits: List[BlameCommit] = []
+        self.line_commits = array('I', [0]) * line_count  # 0 表示未知，其余为 commits 下标 + 1
+        self._numbers: Dict[str, int] = {}
+
+    def assign(self, start: int, count: int, commit: BlameCommit):
+        """记录 start 起（1 起）count 行属于 commit"""
+        number = self._numbers.get(commit.sha)
+        if number is None:
+            self.commits.append(commit)
+            number = len(self.commits)
+            self._numbers[commit.sha] = number
+        end = min(start - 1 + count, len(self.line_commits))
+        for i in range(start - 1, end):
+            self.line_commits[i] = number
+
+    def groups(self):
+        """按连续区间迭代 (起始行号, 行数, 提交)"""
+        lines = self.line_commits
+        i = 0
+        while i < len(lines):
+            number = lines[i]
+            j = i + 1
+            while j < len(lines) and lines[j] == number:
+                j += 1
+            if number:
+                yield i + 1, j - i, self.commits[number - 1]
+            i = j
+
+
+class BlameSession:
+    """
+    一次 Blame 计算
+
+    后台线程把事件放入 events 队列，由 UI 定时取出：
+        ('content', path, lines)       文件内容（先显示，行首稍后填充）
+        ('chunk', start, count, commit) 一组行的 Blame 信息
+        ('done', path, elapsed_ms, from_cache)
+        ('error', path, message)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events: "queue.Queue" = queue.Queue()
+        self.cancelled = False
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """取消计算（切换到其他文件时调用）"""
+        with self._lock:
+            self.cancelled = True
+            stream = self._stream
+        if stream is not None:
+            stream.cancel()
+
+    def _attach(self, stream) -> bool:
+        """关联命令流；已取消时立即取消该流并返回 False"""
+        with self._lock:
+            self._stream = stream
+            cancelled = self.cancelled
+        if cancelled:
+            stream.cancel()
+        return not cancelled
+
+
+class BlameService:
+    """Blame 计算服务：管理当前会话、缓存和失效"""
+
+    def __init__(self, git):
+        self.git = git
+        self.cache = LRUCache("Blame 缓存", Config.BLAME_CACHE_SIZE)
+        self._session: Optional[BlameSession] = None
+
+    def start(self, path: str) -> BlameSession:
+        """为文件启动 Blame 计算，自动取消上一次未完成的计算"""
+        self.cancel()
+        session = BlameSession(path)
+        self._session = session
+        threading.Thread(target=self._run, args=(session,), daemon=True).start()
+        return session
+
+    def cancel(self):
+        """取消当前会话"""
+        if self._session is not None:
+            self._session.cancel()
+            self._session = None
+
+    def invalidate(self, head_oid: Optional[str] = None):
+        """引用变化后使缓存失效：仅保留基于当前 HEAD 的条目"""
+        if head_oid is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate_where(lambda key: key[2] != head_oid)
+
+    def _rev_parse(self, rev: str) -> Optional[str]:
+        stdout, _, returncode = self.git.run_command_sync(['git', 'rev-parse', '--verify', '--quiet', rev])
+        return stdout.strip() if returncode == 0 and stdout.strip() else None
+
+    def _run(self, session: BlameSession):
+        """后台线程：读取内容、命中缓存或流式计算 Blame"""
+        started = time.perf_counter()
+        path = session.path
+        events = session.events
+
+        head_oid = self._rev_parse('HEAD')
+        blob_oid = self._rev_parse(f"HEAD:{path}") if head_oid else None
+        if not blob_oid:
+            events.put(('error', path, "文件尚未提交，无法追溯。"))
+            return
+
+        stdout, _, returncode = self.git.run_command_sync(['git', 'cat-file', '-s', blob_oid])
+        size = int(stdout.strip()) if returncode == 0 and stdout.strip().isdigit() else 0
+        if size > Config.BLAME_MAX_BYTES:
+            events.put(('error', path, f"文件过大（{size // 1024} KB），已跳过追溯。"))
+            return
+
+        content, _, returncode = self.git.run_command_sync(['git', 'cat-file', 'blob', blob_oid])
+        if returncode != 0 or session.cancelled:
+            return
+        lines = content.split('\n')
+        if lines and lines[-1] == '':
+            lines.pop()
+        events.put(('content', path, lines))
+
+        key = (self.git.repo_path, blob_oid, head_oid)
+        cached = self.cache.get(key)
+        if cached is not None:
+            for start, count, commit in cached.groups():
+                events.put(('chunk', start, count, commit))
+            events.put(('done', path, (time.perf_counter() - started) * 1000, True))
+            return
+
+        result = BlameResult(len(lines))
+        parser = IncrementalBlameParser()
+        stream = self.git.open_stream(
+            ['git', 'blame', '--incremental', head_oid, '--', path],
+            f"追溯 {path}"
+        )
+        if not session._attach(stream):
+            return
+        for line in stream:
+            group = parser.feed(line)
+            if group is not None:
+                start, count, commit = group
+                result.assign(start, count, commit)
+                events.put(('chunk', start, count, commit))
+
+        if stream.cancelled or session.cancelled:
+            return
+        if stream.returncode != 0:
+            events.put(('error', path, stream.error.strip() or "追溯失败。"))
+            return
+        self.cache.put(key, result)
+        events.put(('done', path, (time.perf_counter() - started) * 1000, False))
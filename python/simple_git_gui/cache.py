@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+缓存工具模块
+提供带命中统计的有界 LRU 缓存
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    线程安全的有界 LRU 缓存
+
+    超出容量时只淘汰最久未使用的条目，而不是整体清空；
+    同时记录命中、未命中和淘汰次数，供性能统计显示。
+    """
+
+    _MISSING = object()
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，命中时将其移到最近使用位置"""
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """写入缓存值，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """获取缓存值，未命中时调用 factory 计算并写入"""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """使单个条目失效"""
+        with self._lock:
+            return self._data.pop(key, self._MISSING) is not self._MISSING
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """使满足条件的所有条目失效，返回失效数量"""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """清空缓存（保留统计数据）"""
+        with self._lock:
+            self._data.clear()
+
+    def resize(self, maxsize: int):
+        """调整容量"""
+        with self._lock:
+            self.maxsize = max(1, int(maxsize))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率（0.0 ~ 1.0）"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def format_stats(self) -> str:
+        """格式化统计信息为单行文本"""
+        return (
+            f"{self.name}: {len(self._data)}/{self.maxsize} 项, "
+            f"命中 {self.hits}, 未命中 {self.misses}, 淘汰 {self.evictions}, "
+            f"命中率 {self.hit_rate:.1%}"
+        )
+
+
+def normalize_repo_key(path: Optional[str]) -> str:
+    """规范化仓库路径，作为按仓库划分缓存的键"""
+    if not path:
+        return ''
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
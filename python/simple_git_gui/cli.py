@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+命令行模块
+无界面执行 GitCore 操作，支持 JSON 输出和跨多个仓库的并行批量计划
+
+用法:
+    python -m simple_git_gui.cli -C <仓库> status --json
+    python -m simple_git_gui.cli batch plan.json --jobs 8
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import Config
+from .exclusions import ExclusionProfileStore, get_matcher
+from .git_core import GitCore
+from .maintenance import recommend, select_tasks
+from .ssh_mux import get_multiplexer
+
+
+# ==================== 操作实现 ====================
+# 每个操作签名为 op(git, params, excludes) -> 结果字典，结果字典必含 'ok' 键
+
+def _result(ok: bool, message: str = "", **data) -> Dict[str, Any]:
+    """构建操作结果"""
+    result = {'ok': ok, 'message': (message or "").strip()}
+    result.update(data)
+    return result
+
+
+def _path_list(params: Dict[str, Any], key: str = 'paths') -> Optional[List[str]]:
+    """读取路径列表参数（单个字符串视为一个路径）；不是字符串或字符串列表时返回 None"""
+    value = params.get(key)
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return list(value)
+    return None
+
+
+def _visible_unstaged(git: GitCore, excludes: List[str], include_excluded: bool = False):
+    """获取未被排除规则隐藏的未暂存路径，返回 (paths, excluded_count)"""
+    snapshot = git.get_status_snapshot()
+    matcher = get_matcher(excludes)
+    files = []
+    seen = set()
+    excluded = 0
+    for index in snapshot.unstaged:
+        path = snapshot.path(index)
+        if not include_excluded and matcher.matches(path):
+            excluded += 1
+            continue
+        if path not in seen:
+            seen.add(path)
+            files.append(path)
+    return files, excluded
+
+
+def op_status(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """查询状态"""
+    snapshot = git.get_status_snapshot()
+    include_excluded = bool(params.get('all'))
+    matcher = get_matcher(excludes)
+    unstaged = []
+    excluded = 0
+    for index in snapshot.unstaged:
+        path = snapshot.path(index)
+        if not include_excluded and matcher.matches(path):
+            excluded += 1
+            continue
+        unstaged.append({'status': snapshot.code(index), 'path': path})
+    staged = [{'status': snapshot.code(i), 'path': snapshot.path(i)} for i in snapshot.staged]
+    return _result(
+        True,
+        branch=git.get_current_branch(),
+        unstaged=unstaged,
+        staged=staged,
+        excluded=excluded
+    )
+
+
+def op_stage(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """暂存指定路径，或所有可见更改"""
+    if params.get('all'):
+        files, excluded = _visible_unstaged(git, excludes)
+    else:
+        files, excluded = _path_list(params), 0
+        if files is None:
+            return _result(False, "paths 应为路径字符串或字符串列表。")
+        if not files:
+            return _result(False, "未指定要暂存的路径（或使用 --all）。")
+    if not files:
+        return _result(True, "没有可暂存的更改。", paths=[], excluded=excluded)
+    ok, message = git.stage_files(files)
+    return _result(ok, message, paths=files, excluded=excluded)
+
+
+def op_unstage(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """取消暂存指定路径，或全部"""
+    files = ['.'] if params.get('all') else _path_list(params)
+    if files is None:
+        return _result(False, "paths 应为路径字符串或字符串列表。")
+    if not files:
+        return _result(False, "未指定要取消暂存的路径。")
+    ok, message = git.unstage_files(files)
+    return _result(ok, message, paths=files)
+
+
+def op_commit(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """提交已暂存的更改"""
+    message = (params.get('message') or "").strip()
+    if not message:
+        return _result(False, "提交信息不能为空！")
+    if not git.has_staged_changes():
+        return _result(not params.get('require_changes'), "没有已暂存的更改可供提交。", committed=False)
+    ok, output = git.commit(message)
+    return _result(ok, output, committed=ok)
+
+
+def op_push(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """推送（remote 为 '*' 时推送到所有远程）"""
+    remote = params.get('remote')
+    if remote == '*':
+        results = {}
+        for name in git.get_remotes():
+            ok, message = git.push(name)
+            results[name] = _result(ok, message)
+        return _result(all(r['ok'] for r in results.values()), remotes=results)
+    ok, message = git.push(remote)
+    return _result(ok, message)
+
+
+def op_pull(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """拉取"""
+    ok, message = git.pull()
+    return _result(ok, message)
+
+
+def op_fetch(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """抓取（未指定 remote 时抓取所有远程）"""
+    ok, message = git.fetch(params.get('remote'))
+    return _result(ok, message)
+
+
+def op_branches(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """列出分支"""
+    current, local_branches, remote_branches = git.get_all_branches()
+    return _result(True, current=current, local=local_branches, remote=remote_branches)
+
+
+def op_switch(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """切换分支"""
+    name = (params.get('name') or "").strip()
+    if not name:
+        return _result(False, "未指定目标分支。")
+    if not params.get('force') and git.has_uncommitted_changes():
+        return _result(False, "检测到未提交的更改，已取消切换（可使用 force 强制切换）。")
+    ok, message = git.switch_branch(name)
+    return _result(ok, message, branch=name)
+
+
+def op_create_branch(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """创建并切换到新分支"""
+    name = (params.get('name') or "").strip()
+    if not name:
+        return _result(False, "新分支名称不能为空！")
+    if re.search(Config.INVALID_BRANCH_CHARS, name) or name.startswith('/') or name.endswith('/'):
+        return _result(False, "分支名称包含无效字符。")
+    ok, message = git.create_branch(name)
+    return _result(ok, message, branch=name)
+
+
+def op_spawn_bench(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """测量命令启动开销（旧方式与启动上下文对比）"""
+    iterations = max(1, int(params.get('iterations') or 50))
+    timings = git.measure_spawn_overhead(iterations)
+    legacy, context = timings['legacy_ms'], timings['context_ms']
+    message = (
+        f"平均每次启动: 旧方式 {legacy:.3f} ms, 启动上下文 {context:.3f} ms"
+        f"（节省 {(1 - context / legacy) * 100 if legacy else 0:.1f}%，{iterations} 次）"
+    )
+    return _result(True, message, iterations=iterations, **{k: round(v, 4) for k, v in timings.items()})
+
+
+def op_backend_bench(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """对比进程内后端与 git 子进程的只读查询耗时"""
+    iterations = max(1, int(params.get('iterations') or 20))
+    report = git.measure_backends(iterations)
+    lines = []
+    for operation, row in report.items():
+        timings = [
+            f"{name} {'不支持' if ms is None else f'{ms:.3f} ms'}"
+            for name, ms in row.items() if name != 'match'
+        ]
+        flag = "" if row['match'] else "（结果不一致）"
+        lines.append(f"{operation}: {', '.join(timings)}{flag}")
+    ok = all(row['match'] for row in report.values())
+    message = "\n".join(lines) + f"\n（每项 {iterations} 次）"
+    return _result(ok, message, iterations=iterations, operations={
+        operation: {name: (round(ms, 4) if isinstance(ms, float) else ms) for name, ms in row.items()}
+        for operation, row in report.items()
+    })
+
+
+def op_conflicts(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """列出冲突路径；指定 resolve 时把冲突（可用 paths 限定）整体解决为 ours 或 theirs"""
+    conflicts = git.list_conflicts()
+    side = params.get('resolve')
+    if not side:
+        lines = [entry.label() for entry in conflicts] or ["没有冲突。"]
+        return _result(True, "\n".join(lines), conflicts=[
+            {'path': entry.path, 'kind': entry.kind(), 'stages': sorted(entry.stages)} for entry in conflicts
+        ])
+    if side not in ('ours', 'theirs'):
+        return _result(False, f"无效的解决方式: {side}（应为 ours 或 theirs）")
+
+    wanted = _path_list(params)
+    if wanted is None:
+        return _result(False, "paths 应为路径字符串或字符串列表。")
+    if wanted:
+        wanted = set(wanted)
+        conflicts = [entry for entry in conflicts if entry.path in wanted]
+    if not conflicts:
+        return _result(True, "没有需要解决的冲突。", resolved=[])
+    ok, output, error = git.resolve_conflicts(conflicts, side)
+    return _result(ok, error or output, resolved=[entry.path for entry in conflicts] if ok else [])
+
+
+def op_health(git: GitCore, params: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """仓库体检；指定 run 时执行维护建议（可用 tasks 限定）并对比前后耗时"""
+    health = git.probe_health()
+    if health is None:
+        return _result(False, "无法读取仓库信息")
+    tasks = recommend(health)
+    lines = health.describe()
+    lines.append("维护建议:" if tasks else "未发现需要维护的项目")
+    lines.extend(f"  [{task.key}] {task.label()}" for task in tasks)
+    data = {
+        'timings': {name: round(ms, 2) for name, ms in health.timings.items()},
+        'recommendations': [task.key for task in tasks],
+    }
+    if not params.get('run'):
+        return _result(True, "\n".join(lines), **data)
+
+    keys = None
+    if params.get('tasks') is not None:
+        # 与路径参数相同：单个字符串视为一个任务名
+        keys = _path_list(params, 'tasks')
+        if keys is None:
+            return _result(False, "tasks 应为任务名字符串或字符串列表。", **data)
+    selected = select_tasks(tasks, keys)
+    if not selected:
+        return _result(True, "\n".join(lines + ["没有需要执行的维护任务"]), ran=[], **data)
+    ok, output, error = git.run_maintenance(selected)
+    lines.append(output)
+    if error:
+        lines.append(error)
+    return _result(ok, "\n".join(lines), ran=[task.key for task in selected], **data)
+
+
+OPERATIONS: Dict[str, Callable[[GitCore, Dict[str, Any], List[str]], Dict[str, Any]]] = {
+    'status': op_status,
+    'stage': op_stage,
+    'unstage': op_unstage,
+    'commit': op_commit,
+    'push': op_push,
+    'pull': op_pull,
+    'fetch': op_fetch,
+    'branches': op_branches,
+    'switch': op_switch,
+    'create-branch': op_create_branch,
+    'spawn-bench': op_spawn_bench,
+    'backend-bench': op_backend_bench,
+    'health': op_health,
+    'conflicts': op_conflicts,
+}
+
+
+def run_operation(
+    repo_path: str,
+    op_name: str,
+    params: Dict[str, Any],
+    excludes: List[str],
+    git: Optional[GitCore] = None
+) -> Dict[str, Any]:
+    """在指定仓库执行单个操作，结果附带操作名和耗时"""
+    git = git or GitCore(repo_path)
+    started = time.perf_counter()
+    operation = OPERATIONS.get(op_name)
+    if operation is None:
+        result = _result(False, f"未知操作: {op_name}")
+    elif not git.is_git_repo(git.repo_path):
+        result = _result(False, f"目录 '{git.repo_path}' 不是有效的 Git 仓库。")
+    else:
+        # 合并该仓库保存的排除配置（与图形界面共用）
+        excludes = list(excludes) + ExclusionProfileStore().load(git.repo_path).patterns
+        try:
+            result = operation(git, params, excludes)
+        except Exception as e:
+            result = _result(False, f"执行操作时发生错误: {e}")
+    result['op'] = op_name
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+# ==================== 批量计划 ====================
+
+def load_plan(plan_path: str) -> Dict[str, Any]:
+    """
+    读取批量计划文件（JSON）
+
+    格式:
+        {
+            "repos": ["repo-a", "/abs/repo-b"],   # 相对路径基于计划文件所在目录
+            "steps": [{"op": "stage", "all": true}, {"op": "commit", "message": "..."}],
+            "exclude": ["build/"],                # 可选，附加排除规则
+            "stop_on_error": true                 # 可选，默认 true
+        }
+    """
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or not plan.get('repos') or not plan.get('steps'):
+        raise ValueError("计划文件必须包含非空的 repos 和 steps 列表")
+    repos = _path_list(plan, 'repos')
+    if repos is None:
+        raise ValueError("repos 应为仓库路径字符串或字符串列表")
+    if not isinstance(plan['steps'], list):
+        raise ValueError("steps 应为步骤列表")
+    base_dir = os.path.dirname(os.path.abspath(plan_path))
+    plan['repos'] = [
+        os.path.normpath(os.path.join(base_dir, os.path.expanduser(repo)))
+        for repo in repos
+    ]
+    for step in plan['steps']:
+        if not isinstance(step, dict) or step.get('op') not in OPERATIONS:
+            raise ValueError(f"无效的步骤: {step!r}")
+    return plan
+
+
+def run_plan_for_repo(repo_path: str, plan: Dict[str, Any], excludes: List[str]) -> Dict[str, Any]:
+    """在单个仓库中依次执行计划的所有步骤"""
+    git = GitCore(repo_path)
+    stop_on_error = plan.get('stop_on_error', True)
+    steps = []
+    for step in plan['steps']:
+        params = {k: v for k, v in step.items() if k != 'op'}
+        result = run_operation(repo_path, step['op'], params, excludes, git)
+        steps.append(result)
+        if not result['ok'] and stop_on_error:
+            break
+    return {
+        'repo': repo_path,
+        'ok': all(step['ok'] for step in steps) and len(steps) == len(plan['steps']),
+        'steps': steps,
+    }
+
+
+def run_plan(plan: Dict[str, Any], excludes: List[str], jobs: int) -> List[Dict[str, Any]]:
+    """跨仓库并行执行计划，结果按 repos 顺序返回"""
+    excludes = excludes + list(plan.get('exclude') or [])
+    workers = max(1, min(jobs, len(plan['repos'])))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda repo: run_plan_for_repo(repo, plan, excludes), plan['repos']))
+
+
+# ==================== 输出 ====================
+
+def _format_text(result: Dict[str, Any]) -> str:
+    """将单个操作结果格式化为文本"""
+    lines = []
+    op_name = result.get('op')
+    if op_name == 'status':
+        lines.append(f"当前分支: {result['branch']}")
+        lines.append("已暂存的更改:")
+        lines.extend(f"  {item['status']} {item['path']}" for item in result['staged'])
+        lines.append("未暂存的更改:")
+        lines.extend(f"  {item['status']} {item['path']}" for item in result['unstaged'])
+        if result['excluded']:
+            lines.append(f"（已隐藏 {result['excluded']} 项排除的更改）")
+    elif op_name == 'branches':
+        lines.extend(
+            f"{'*' if name == result['current'] else ' '} {name}" for name in result['local']
+        )
+        lines.extend(f"  remotes/{name}" for name in result['remote'])
+    elif 'remotes' in result:
+        for name, item in result['remotes'].items():
+            lines.append(f"[{name}] {'成功' if item['ok'] else '失败'}: {item['message']}")
+    if result.get('message'):
+        lines.append(result['message'])
+    if not result['ok'] and not lines:
+        lines.append("操作失败。")
+    return "\n".join(lines)
+
+
+def _emit(data: Any, as_json: bool, text: str):
+    """输出结果"""
+    if as_json:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    elif text:
+        print(text)
+
+
+# ==================== 参数解析 ====================
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="python -m simple_git_gui.cli",
+        description="简易 Git GUI 的无界面命令行模式"
+    )
+    parser.add_argument('-C', '--repo', default=os.getcwd(), help="仓库路径（默认当前目录）")
+    parser.add_argument('--json', action='store_true', help="以 JSON 格式输出")
+    parser.add_argument('--timeout', type=int, help="单个 Git 命令超时时间（秒）")
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help="附加排除规则（可重复）")
+
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('status', help="查询状态")
+    p.add_argument('--all', action='store_true', help="包括被排除的路径")
+
+    p = sub.add_parser('stage', help="暂存文件")
+    p.add_argument('paths', nargs='*')
+    p.add_argument('--all', action='store_true', help="暂存所有可见更改")
+
+    p = sub.add_parser('unstage', help="取消暂存")
+    p.add_argument('paths', nargs='*')
+    p.add_argument('--all', action='store_true', help="取消所有暂存")
+
+    p = sub.add_parser('commit', help="提交")
+    p.add_argument('-m', '--message', required=True)
+    p.add_argument('--require-changes', action='store_true', help="没有已暂存更改时视为失败")
+
+    p = sub.add_parser('push', help="推送")
+    p.add_argument('remote', nargs='?', help="远程名称，'*' 表示所有远程")
+
+    sub.add_parser('pull', help="拉取")
+
+    p = sub.add_parser('fetch', help="抓取")
+    p.add_argument('remote', nargs='?', help="远程名称（默认所有远程）")
+
+    sub.add_parser('branches', help="列出分支")
+
+    p = sub.add_parser('switch', help="切换分支")
+    p.add_argument('name')
+    p.add_argument('--force', action='store_true', help="存在未提交更改时仍然切换")
+
+    p = sub.add_parser('create-branch', help="创建并切换到新分支")
+    p.add_argument('name')
+
+    p = sub.add_parser('spawn-bench', help="测量命令启动开销")
+    p.add_argument('-n', '--iterations', type=int, default=50, help="每种方式的启动次数")
+
+    p = sub.add_parser('backend-bench', help="对比进程内后端与 git 子进程的只读查询耗时")
+    p.add_argument('-n', '--iterations', type=int, default=20, help="每项查询的执行次数")
+
+    p = sub.add_parser('conflicts', help="列出冲突路径，或整体解决为我方 / 对方版本")
+    p.add_argument('--resolve', choices=['ours', 'theirs'], help="解决方式")
+    p.add_argument('paths', nargs='*', help="只解决这些路径（默认全部）")
+
+    p = sub.add_parser('health', help="仓库体检（对象布局、提交图、索引等）并给出维护建议")
+    p.add_argument('--run', action='store_true', help="执行维护建议并对比前后耗时")
+    p.add_argument('--task', dest='tasks', action='append', metavar='KEY',
+                   help="只执行指定的建议（可重复，如 commit-graph、loose-objects）")
+
+    p = sub.add_parser('batch', help="按计划文件在多个仓库中并行执行")
+    p.add_argument('plan', help="JSON 计划文件路径")
+    p.add_argument('-j', '--jobs', type=int, default=Config.CLI_BATCH_JOBS, help="并行仓库数")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口，返回进程退出码"""
+    try:
+        return _main(argv)
+    finally:
+        get_multiplexer().shutdown()
+
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    """解析参数并执行单个操作或批量计划"""
+    args = build_parser().parse_args(argv)
+    if args.timeout:
+        Config.COMMAND_TIMEOUT = args.timeout
+    excludes = list(Config.STATUS_EXCLUDE_PATTERNS) + args.exclude
+
+    if args.command == 'batch':
+        try:
+            plan = load_plan(args.plan)
+        except (OSError, ValueError) as e:
+            _emit({'ok': False, 'message': str(e)}, args.json, f"错误: {e}")
+            return 2
+        results = run_plan(plan, excludes, args.jobs)
+        text = "\n".join(
+            f"[{'成功' if r['ok'] else '失败'}] {r['repo']}"
+            + "".join(f"\n  - {s['op']}: {'成功' if s['ok'] else '失败'} {s['message']}".rstrip()
+                      for s in r['steps'])
+            for r in results
+        )
+        _emit(results, args.json, text)
+        return 0 if all(r['ok'] for r in results) else 1
+
+    params = {k: v for k, v in vars(args).items()
+              if k not in ('repo', 'json', 'timeout', 'exclude', 'command')}
+    result = run_operation(os.path.abspath(args.repo), args.command, params, excludes)
+    _emit(result, args.json, _format_text(result))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+命令句柄模块
+提供可取消的 Git 命令句柄及进程组终止工具
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+from .config import Config
+from .ssh_mux import git_subcommand
+
+
+def process_group_kwargs() -> Dict[str, Any]:
+    """
+    获取创建独立进程组所需的 Popen 参数
+
+    git 会派生 ssh、远程助手等子进程，放入独立进程组后才能一并终止。
+    """
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+# 不会派生长期子进程的只读/底层命令：无需独立进程组，可走 posix_spawn 快速路径
+FAST_SPAWN_COMMANDS = frozenset({
+    'rev-parse', 'status', 'cat-file', 'ls-files', 'ls-tree', 'for-each-ref', 'show-ref',
+    'symbolic-ref', 'branch', 'config', 'blame', 'grep', 'merge-base', 'write-tree',
+})
+
+
+def kill_process_tree(process: subprocess.Popen, force: bool = False):
+    """
+    终止进程及其整个进程组
+
+    Args:
+        process: 要终止的进程（未以独立进程组启动时只终止该进程）
+        force: 为 True 时直接强制结束；否则先请求终止，宽限期后再强制结束
+    """
+    if process.poll() is not None:
+        return
+    
+    if os.name != 'nt':
+        try:
+            own_group = os.getpgid(process.pid) == process.pid
+        except OSError:
+            return
+        if not own_group:
+            if force:
+                process.kill()
+            else:
+                process.terminate()
+            return
+
+    if os.name == 'nt':
+        try:
+            subprocess.run(
+                ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                capture_output=True,
+                check=False,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+        except OSError:
+            process.kill()
+        return
+
+    def send(sig):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+        except OSError:
+            process.kill()
+
+    if force:
+        send(signal.SIGKILL)
+        return
+
+    send(signal.SIGTERM)
+
+    def escalate():
+        if process.poll() is None:
+            send(signal.SIGKILL)
+
+    timer = threading.Timer(Config.CANCEL_GRACE_SECONDS, escalate)
+    timer.daemon = True
+    timer.start()
+
+
+class LaunchContext:
+    """
+    命令启动上下文
+
+    按仓库预先计算一次：git 可执行文件的绝对路径、冻结的环境变量和已验证的工作目录，
+    避免每次启动命令都复制 os.environ、搜索 PATH 和检查仓库路径。
+    """
+
+    __slots__ = ('repo_path', 'cwd', 'valid', 'git_path', 'env', '_use_posix_spawn')
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.cwd = os.path.abspath(repo_path) if repo_path else ""
+        self.valid = bool(self.cwd) and os.path.isdir(self.cwd)
+        self.git_path = shutil.which('git') or 'git'
+        env = os.environ.copy()
+        env['GIT_EDITOR'] = 'true'
+        self.env: Mapping[str, str] = MappingProxyType(env)
+        # subprocess 仅在可执行文件为路径、未设置 cwd、不关闭文件描述符且不新建会话时使用 posix_spawn
+        self._use_posix_spawn = (
+            os.name != 'nt'
+            and hasattr(os, 'posix_spawn')
+            and getattr(subprocess, '_USE_POSIX_SPAWN', False)
+            and os.path.isabs(self.git_path)
+        )
+
+    def argv(self, command_list: List[str]) -> List[str]:
+        """把命令中的 'git' 替换为绝对路径"""
+        if command_list and command_list[0] == 'git':
+            return [self.git_path] + command_list[1:]
+        return list(command_list)
+
+    def popen(
+        self,
+        command_list: List[str],
+        extra_env: Optional[Dict[str, str]] = None,
+        stdin: bool = False,
+        binary: bool = False,
+        merge_stderr: bool = False
+    ) -> subprocess.Popen:
+        """
+        启动命令
+
+        FAST_SPAWN_COMMANDS 中的命令通过 git -C 指定仓库（不设置 cwd），
+        满足 subprocess 使用 posix_spawn 的条件；其他命令在独立进程组中启动，
+        以便取消时连同 ssh、钩子等子进程一并终止。
+
+        Args:
+            stdin: 是否通过管道向命令写入输入
+            binary: 是否以字节方式读写（不转换换行符，用于补丁等需要逐字节保留的内容）
+            merge_stderr: 是否把 stderr 合并到 stdout（按输出顺序逐行读取钩子等输出）
+        """
+        env = self.env if not extra_env else {**self.env, **extra_env}
+        argv = self.argv(command_list)
+        common = dict(
+            stdin=subprocess.PIPE if stdin else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            env=env,
+        )
+        if not binary:
+            common.update(text=True, encoding='utf-8', errors='replace')
+        if self._use_posix_spawn and git_subcommand(argv) in FAST_SPAWN_COMMANDS:
+            return subprocess.Popen(
+                [argv[0], '-C', self.cwd] + argv[1:],
+                close_fds=False,
+                **common
+            )
+        return subprocess.Popen(argv, cwd=self.cwd, **common, **process_group_kwargs())
+
+
+class CommandHandle:
+    """
+    正在执行的 Git 命令句柄
+
+    由 GitCore.run_command_async 返回，可用于查询状态或取消命令。
+    """
+
+    def __init__(
+        self,
+        command_id: int,
+        command_list: List[str],
+        command_type: str,
+        on_finish: Optional[Callable[['CommandHandle'], None]] = None,
+        background: bool = False
+    ):
+        self.id = command_id
+        self.command_list = list(command_list)
+        self.command_type = command_type
+        self.background = background
+        self.started_at = time.monotonic()
+        self.cancelled = False
+        self.finished = False
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._on_finish = on_finish
+
+    @property
+    def elapsed(self) -> float:
+        """已运行时间（秒）"""
+        return time.monotonic() - self.started_at
+
+    def attach(self, process: subprocess.Popen) -> bool:
+        """
+        关联实际进程
+
+        Returns:
+            句柄已被取消时返回 False（进程会被立即终止）
+        """
+        with self._lock:
+            self._process = process
+            cancelled = self.cancelled
+        if cancelled:
+            kill_process_tree(process, force=True)
+            return False
+        return True
+
+    def cancel(self, force: bool = False):
+        """取消命令：终止整个进程组并立即释放忙碌状态"""
+        with self._lock:
+            if self.finished or self.cancelled:
+                return
+            self.cancelled = True
+            process = self._process
+        if process is not None:
+            kill_process_tree(process, force=force)
+        self.finish()
+
+    def terminate(self):
+        """强制结束命令（不等待宽限期）"""
+        self.cancel(force=True)
+
+    def finish(self):
+        """标记结束并通知所有者释放资源（可重复调用，只生效一次）"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self._on_finish:
+            self._on_finish(self)
+
+    def describe(self) -> str:
+        """生成状态栏显示文本"""
+        return f"{self.command_type} ({int(self.elapsed)}s)"
+
+
+class CommandStream:
+    """
+    流式命令输出
+
+    逐行产出 stdout（不等待命令结束），stderr 在后台线程中收集；
+    通过句柄取消时终止进程组并结束迭代。
+    """
+
+    def __init__(self, popen_factory: Callable[[], subprocess.Popen], handle: CommandHandle):
+        self._popen_factory = popen_factory
+        self.handle = handle
+        self.returncode: Optional[int] = None
+        self.error = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self.handle.cancelled
+
+    def cancel(self):
+        """取消命令"""
+        self.handle.cancel(force=True)
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            process = self._popen_factory()
+        except FileNotFoundError:
+            self.error = "错误: 'git' 命令未找到。请确保 Git 已安装并在 PATH 中。"
+            self.returncode = -1
+            self.handle.finish()
+            return
+        except Exception as e:
+            self.error = f"运行命令时发生错误: {e}"
+            self.returncode = -1
+            self.handle.finish()
+            return
+
+        stderr_chunks: List[str] = []
+        drain = threading.Thread(
+            target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+        )
+        drain.start()
+
+        completed = False
+        try:
+            if self.handle.attach(process):
+                for line in process.stdout:
+                    if self.handle.cancelled:
+                        break
+                    yield line.rstrip('\n')
+                else:
+                    completed = True
+        finally:
+            if not completed and process.poll() is None:
+                kill_process_tree(process, force=True)
+            process.stdout.close()
+            process.wait()
+            drain.join(timeout=1)
+            self.error = "命令已取消" if self.handle.cancelled else "".join(stderr_chunks)
+            self.returncode = -1 if self.handle.cancelled else process.returncode
+            self.handle.finish()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+提交流水线模块
+流式执行 git commit，通过 Git 的 trace2 事件识别钩子、写入树、创建提交等阶段并分别计时
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .commands import CommandHandle
+
+
+# 提交阶段
+PHASE_READ_INDEX = "读取索引"
+PHASE_TREE = "写入树"
+PHASE_COMMIT = "创建提交并更新引用"
+HOOK_PHASE_PREFIX = "钩子 "
+
+# trace2 事件文件的轮询间隔（秒）
+TRACE_POLL_SECONDS = 0.1
+
+
+class PhaseTiming:
+    """单个阶段的耗时"""
+
+    __slots__ = ('name', 'elapsed_ms', 'failed')
+
+    def __init__(self, name: str, elapsed_ms: float, failed: bool = False):
+        self.name = name
+        self.elapsed_ms = elapsed_ms
+        self.failed = failed
+
+
+class CommitReport:
+    """一次提交的结果与各阶段耗时"""
+
+    def __init__(self, no_verify: bool):
+        self.no_verify = no_verify
+        self.success = False
+        self.commit_oid: Optional[str] = None  # 新提交（HEAD 确实发生变化时才设置）
+        self.error = ""
+        self.phases: List[PhaseTiming] = []
+        self.total_ms = 0.0
+        self.failed_phase: Optional[str] = None
+
+    @property
+    def hook_ms(self) -> float:
+        """钩子总耗时"""
+        return sum(p.elapsed_ms for p in self.phases if p.name.startswith(HOOK_PHASE_PREFIX))
+
+    @property
+    def failed_in_hook(self) -> bool:
+        return bool(self.failed_phase and self.failed_phase.startswith(HOOK_PHASE_PREFIX))
+
+    def format_timings(self) -> str:
+        """生成阶段耗时文本"""
+        title = "提交完成" if self.success else f"提交失败（{self.failed_phase or '未知阶段'}）"
+        if self.no_verify:
+            title += "，已跳过 pre-commit / commit-msg 钩子"
+        lines = [f"{title}，总耗时 {self.total_ms / 1000:.2f} 秒"]
+        for phase in self.phases:
+            mark = "  ✗" if phase.failed else ""
+            lines.append(f"  {phase.name}: {phase.elapsed_ms:.0f} ms{mark}")
+        return "\n".join(lines)
+
+
+class TraceTail:
+    """增量读取 trace2 事件文件，只返回顶层 git 进程的完整事件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._partial = ""
+        self._root_sid: Optional[str] = None
+
+    def poll(self) -> List[Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                f.seek(self._offset)
+                data = f.read()
+                self._offset = f.tell()
+        except OSError:
+            return []
+        data = self._partial + data
+        lines = data.split('\n')
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if self._root_sid is None:
+                self._root_sid = event.get('sid')
+            # 钩子中运行的 git 子进程也写入同一文件，其 sid 以父进程 sid 加 "/" 开头
+            if event.get('sid') == self._root_sid:
+                events.append(event)
+        return events
+
+
+def _live_phase(event: Dict, no_verify: bool) -> Optional[str]:
+    """根据单个事件推断刚进入的阶段（用于实时显示）"""
+    kind = event.get('event')
+    category = event.get('category')
+    if kind == 'region_enter' and category == 'hook':
+        return HOOK_PHASE_PREFIX + event.get('label', '')
+    if kind == 'region_enter' and category == 'cache_tree' and event.get('label') == 'update':
+        return PHASE_TREE
+    if kind == 'region_leave' and category == 'hook' and event.get('label') == 'commit-msg':
+        return PHASE_COMMIT
+    if no_verify and kind == 'region_leave' and category == 'cache_tree' and event.get('label') == 'update':
+        return PHASE_COMMIT
+    return None
+
+
+def summarize_trace(events: List[Dict], report: CommitReport):
+    """
+    由 trace2 事件汇总各阶段耗时
+
+    钩子耗时取 hook 区域，写入树为 cache_tree 更新和索引写入，
+    其余时间（创建提交对象、更新引用、reflog）计入“创建提交并更新引用”。
+    """
+    read_ms = tree_ms = 0.0
+    hooks: List[PhaseTiming] = []
+    hook_children: Dict[int, str] = {}
+    failed_hooks = set()
+    total_ms = None
+    for event in events:
+        kind = event.get('event')
+        if kind == 'region_leave' and event.get('nesting') == 1:
+            category, label = event.get('category'), event.get('label')
+            elapsed = float(event.get('t_rel', 0)) * 1000
+            if category == 'hook':
+                hooks.append(PhaseTiming(HOOK_PHASE_PREFIX + label, elapsed))
+            elif category == 'cache_tree' and label == 'update':
+                tree_ms += elapsed
+            elif category == 'index' and label == 'do_write_index':
+                tree_ms += elapsed
+            elif category == 'index' and label in ('do_read_index', 'refresh'):
+                read_ms += elapsed
+        elif kind == 'child_start' and event.get('child_class') == 'hook':
+            hook_children[event.get('child_id')] = event.get('hook_name', '')
+        elif kind == 'child_exit' and event.get('child_id') in hook_children and event.get('code'):
+            failed_hooks.add(HOOK_PHASE_PREFIX + hook_children[event.get('child_id')])
+        elif kind == 'exit':
+            total_ms = float(event.get('t_abs', 0)) * 1000
+
+    for hook in hooks:
+        hook.failed = hook.name in failed_hooks
+    phases = [PhaseTiming(PHASE_READ_INDEX, read_ms)] + hooks + [PhaseTiming(PHASE_TREE, tree_ms)]
+    if total_ms is not None and not failed_hooks:
+        rest = max(0.0, total_ms - sum(p.elapsed_ms for p in phases))
+        phases.append(PhaseTiming(PHASE_COMMIT, rest))
+    if total_ms is not None:
+        report.total_ms = total_ms
+    report.phases = phases
+    if failed_hooks:
+        report.failed_phase = next(h.name for h in hooks if h.failed)
+
+
+class CommitPipeline:
+    """
+    提交流水线
+
+    - 提交本身仍由 git commit 完成（钩子顺序、签名、合并状态等行为与命令行一致）
+    - 钩子输出逐行回调，阶段变化通过 trace2 事件文件实时识别
+    - 提交信息通过标准输入传入；只有 HEAD 确实变化才视为提交成功
+    """
+
+    def __init__(self, git):
+        self.git = git
+
+    def run(
+        self,
+        message: str,
+        no_verify: bool = False,
+        handle: Optional[CommandHandle] = None,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ) -> CommitReport:
+        """
+        执行提交
+
+        Args:
+            message: 提交信息
+            no_verify: 跳过 pre-commit 和 commit-msg 钩子
+            handle: 命令句柄（可取消）
+            on_event: 进度回调 on_event(kind, text)，kind 为 'phase' 或 'output'，在后台线程中调用
+
+        Returns:
+            CommitReport
+        """
+        report = CommitReport(no_verify)
+        notify = on_event or (lambda kind, text: None)
+        old_head = self.git.get_head_oid()
+
+        trace_dir = tempfile.mkdtemp(prefix='sgg-commit-')
+        tail = TraceTail(os.path.join(trace_dir, 'trace.json'))
+        events: List[Dict] = []
+        finished = threading.Event()
+        current = [None]
+
+        def follow():
+            """后台轮询 trace2 事件，阶段变化时通知"""
+            while True:
+                done = finished.is_set()
+                for event in tail.poll():
+                    events.append(event)
+                    phase = _live_phase(event, no_verify)
+                    if phase and phase != current[0]:
+                        current[0] = phase
+                        notify('phase', phase)
+                if done:
+                    return
+                finished.wait(TRACE_POLL_SECONDS)
+
+        command = ['git', 'commit', '-F', '-']
+        if no_verify:
+            command.append('--no-verify')
+        follower = threading.Thread(target=follow, daemon=True)
+        follower.start()
+        started = time.perf_counter()
+        try:
+            output, error, returncode = self.git.run_command_streaming(
+                command,
+                lambda line: notify('output', line),
+                handle,
+                extra_env={'GIT_TRACE2_EVENT': tail.path},
+                input_text=message
+            )
+        finally:
+            finished.set()
+            follower.join()
+            shutil.rmtree(trace_dir, ignore_errors=True)
+
+        summarize_trace(events, report)
+        if not report.total_ms:
+            report.total_ms = (time.perf_counter() - started) * 1000
+
+        new_head = self.git.get_head_oid() if returncode == 0 else None
+        if returncode == 0 and new_head and new_head != old_head:
+            report.success = True
+            report.commit_oid = new_head
+        else:
+            # 完整输出已逐行显示，这里只保留最后几行作为错误摘要
+            tail_lines = [line for line in output.split('\n') if line.strip()][-5:]
+            report.error = error or "\n".join(tail_lines) or "提交未生成新的提交。"
+            if report.failed_phase is None:
+                report.failed_phase = current[0]
+        return report
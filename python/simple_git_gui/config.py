@@ -16,14 +16,74 @@ class Config:
     
     # 性能配置
     COMMAND_TIMEOUT = 30  # Git 命令超时时间（秒）
+    CANCEL_GRACE_SECONDS = 2  # 取消命令时从终止到强制结束的宽限期（秒）
     MAX_OUTPUT_LINES = 1000  # 输出区域最大行数
     REFRESH_DELAY_MS = 100  # 刷新延迟（毫秒）
     BRANCH_UPDATE_DELAY_MS = 200  # 分支更新延迟
+    UI_FRAME_INTERVAL_MS = 33  # 有界面更新时的帧间隔（毫秒），即每秒最多约 30 帧
+    UI_IDLE_POLL_MS = 100  # 空闲时检查后台结果的间隔（毫秒）
+    UI_FRAME_BUDGET_MS = 12  # 每帧处理后台结果的时间预算（毫秒），超出的留到下一帧
+    STATUS_MEMORY_BUDGET_MB = 64  # 状态快照内存预算（MB），超出时在输出区提示
+    LISTBOX_INSERT_CHUNK = 2000  # 列表框批量插入的分块大小
+    PARTIAL_REFRESH_MAX_PATHS = 500  # 局部状态刷新的最大路径数，超出则完整刷新
+    FILTER_CHUNK_ROWS = 4096  # 筛选每块判断的行数（每帧在预算内处理若干块）
+    FILTER_SCAN_SPARSE_RATIO = 8  # 子串在块内出现次数少于行数的 1/8 时改用整块文本扫描
+    FILTER_DEBOUNCE_MS = 120  # 筛选框停止输入多久后开始筛选（毫秒）
+    FILTER_DISPLAY_MAX_ROWS = 1000  # 列表模式下筛选结果最多显示的行数（暂存筛选结果仍包含全部）
+    TREE_EXPAND_CHUNK = 500  # 目录树每次展开创建的最大节点数
+    BLAME_CACHE_SIZE = 32  # Blame 结果缓存容量（按 blob oid + HEAD oid）
+    BLAME_MAX_BYTES = 8 * 1024 * 1024  # 超过此大小的文件不做追溯
+    BLAME_EVENTS_PER_TICK = 2000  # 每次界面刷新最多处理的 Blame 事件数
+    SEARCH_MAX_RESULTS = 5000  # 内容搜索最多显示的匹配数
+    SEARCH_MIN_QUERY = 2  # 输入达到此长度才开始搜索
+    SEARCH_DEBOUNCE_MS = 250  # 输入停止多久后开始搜索
+    SEARCH_THREADS = 0  # git grep 线程数，0 表示使用 git 默认值
+    SEARCH_RESULTS_PER_TICK = 1000  # 每次界面刷新最多追加的搜索结果数
+    STASH_DIFF_CACHE_SIZE = 32  # 储藏内容缓存容量（按储藏 oid）
+    DIFF_CACHE_SIZE = 64  # 文件差异缓存容量（按仓库 + 路径 + 是否已暂存）
+    WORKTREE_STATUS_JOBS = 4  # 并发刷新工作树状态的线程数
+    SUBMODULE_PARALLEL_SCAN = True  # 是否自行并发扫描子模块（否则由 git status 串行递归）
+    SUBMODULE_SCAN_JOBS = 8  # 并发扫描子模块的线程数
+    SUBMODULE_MAX_DEPTH = 3  # 嵌套子模块的最大扫描深度
+    SUBMODULE_IGNORE_DEFAULT = "none"  # 仓库未设置时的 --ignore-submodules 策略
+    REFLOG_WINDOW = 2000  # 引用日志面板在内存中保留的最近条目数
+    REFLOG_MMAP_BYTES = 1024 * 1024  # 一次需要读取的新内容超过此大小时使用内存映射
+    REFLOG_POLL_MS = 500  # 引用日志面板打开时检查文件变化的间隔（毫秒）
+    NATIVE_BACKEND = True  # 只读查询优先由进程内后端直接读取 Git 目录（无法确定结果时仍调用 git）
+    NATIVE_OBJECT_CACHE_SIZE = 256  # 进程内后端的对象缓存容量（按 oid）
+    CONFLICT_BLOB_CACHE_SIZE = 64  # 冲突各阶段内容缓存容量（按 blob oid）
+    CONFLICT_MAX_BYTES = 8 * 1024 * 1024  # 超过此大小的冲突阶段内容不加载显示
+    MAINTENANCE_PROBE_RUNS = 3  # 仓库体检时每项查询的执行次数（取最短耗时）
+    MAINTENANCE_LOOSE_OBJECTS = 1000  # 松散对象达到此数量时建议打包
+    MAINTENANCE_PACK_COUNT = 10  # 包文件达到此数量且没有多包索引时建议增量重新打包
+    MAINTENANCE_INDEX_ENTRIES = 10000  # 索引条目达到此数量时建议启用未跟踪文件缓存和 fsmonitor
+    LARGE_FILE_BYTES = 50 * 1024 * 1024  # 超过此大小的文件视为大文件，不生成差异
+    ATTR_CACHE_SIZE = 8192  # 文件属性缓存容量（按仓库 + 路径）
+    SIZE_COLUMN_MAX_ROWS = 20000  # 状态条目数不超过此值时（每次刷新统计一次）显示文件大小
+    UNDO_JOURNAL_SIZE = 50  # 每个仓库保留的可撤销操作数
+    EXCLUDE_MATCHER_CACHE_SIZE = 16  # 排除规则匹配器缓存容量（按规则内容哈希）
+    REPO_CACHE_SIZE = 64  # 仓库检测缓存容量（LRU）
+    PATH_CACHE_SIZE = 4096  # 路径解析缓存容量（LRU）
     
     # Git 配置
     DEFAULT_REMOTE = "origin"
+    SSH_MULTIPLEX_ENABLED = True  # 网络命令是否复用 SSH 连接（ControlMaster）
+    SSH_CONTROL_PERSIST_SECONDS = 120  # SSH 主连接空闲多久后自动退出（秒）
+    
+    # 后台自动抓取配置
+    AUTO_FETCH_ENABLED = True  # 是否启用后台自动抓取
+    AUTO_FETCH_INTERVAL_SECONDS = 300  # 每个远程的抓取间隔（秒）
+    AUTO_FETCH_INITIAL_DELAY_SECONDS = 30  # 启动或切换仓库后的首次抓取延迟（秒）
+    AUTO_FETCH_JITTER = 0.2  # 间隔随机抖动比例（±20%）
+    AUTO_FETCH_RETRY_BASE_SECONDS = 30  # 失败后首次重试延迟（秒），之后指数翻倍
+    AUTO_FETCH_MAX_BACKOFF_SECONDS = 3600  # 最大退避时间（秒）
+    AUTO_FETCH_BUSY_POLL_SECONDS = 1  # 前台命令执行时的轮询间隔（秒）
     PROTECTED_BRANCHES = ['main', 'master', 'dev', 'develop', 'release']
-    STATUS_EXCLUDE_PATTERNS = []  # 在此添加需要从未暂存列表隐藏的相对路径或通配符
+    STATUS_EXCLUDE_PATTERNS = []  # 所有仓库共用的默认排除规则（各仓库的规则保存在排除配置中）
+    SETTINGS_DIR = ""  # 排除配置等设置的保存目录，留空使用系统默认位置
+    
+    # 命令行批量模式
+    CLI_BATCH_JOBS = 8  # 批量计划默认并行仓库数
     
     # 分支名称验证正则
     INVALID_BRANCH_CHARS = r'\s|~|\^|:|\\|\.\.|\*|\?|\[|@\{'
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+合并冲突模块
+解析未合并的索引条目，经常驻的 git cat-file --batch 进程按需批量读取各阶段内容并缓存
+"""
+
+import subprocess
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .cache import LRUCache
+from .config import Config
+
+
+# 索引阶段编号
+STAGE_BASE = 1
+STAGE_OURS = 2
+STAGE_THEIRS = 3
+STAGE_NAMES = {
+    STAGE_BASE: "共同祖先 (base)",
+    STAGE_OURS: "我方 (ours)",
+    STAGE_THEIRS: "对方 (theirs)",
+}
+
+# 按存在的阶段描述冲突类型
+CONFLICT_KINDS = {
+    (1, 2, 3): "双方修改",
+    (2, 3): "双方添加",
+    (1, 2): "对方删除",
+    (1, 3): "我方删除",
+    (2,): "我方添加",
+    (3,): "对方添加",
+    (1,): "双方删除",
+}
+
+# 一次往返写入的最多 oid 数（输入远小于管道缓冲区，避免双方互相等待）
+BATCH_CHUNK = 100
+# 跳过过大内容时每次读取并丢弃的字节数
+SKIP_CHUNK_BYTES = 1024 * 1024
+# 判断二进制内容时检查的前缀长度（与 git 相同）
+BINARY_PROBE_BYTES = 8000
+
+
+class ConflictEntry:
+    """一个未合并路径及其各阶段的 (模式, oid)"""
+
+    __slots__ = ('path', 'stages')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stages: Dict[int, Tuple[str, str]] = {}
+
+    def kind(self) -> str:
+        """冲突类型"""
+        return CONFLICT_KINDS.get(tuple(sorted(self.stages)), "未知")
+
+    def oid(self, stage: int) -> Optional[str]:
+        """指定阶段的 oid（该阶段不存在时返回 None）"""
+        entry = self.stages.get(stage)
+        return entry[1] if entry else None
+
+    def label(self) -> str:
+        """列表显示文本"""
+        return f"[{self.kind()}] {self.path}"
+
+
+def parse_unmerged(output: str) -> List[ConflictEntry]:
+    """
+    解析 git ls-files -u -z 输出
+
+    每条记录为 "<模式> <oid> <阶段>\\t<路径>"，以 NUL 结尾；同一路径的各阶段相邻。
+    """
+    entries: List[ConflictEntry] = []
+    current: Optional[ConflictEntry] = None
+    for record in output.split('\0'):
+        if not record:
+            continue
+        header, _, path = record.partition('\t')
+        parts = header.split(' ')
+        if len(parts) != 3 or not parts[2].isdigit():
+            continue
+        if current is None or current.path != path:
+            current = ConflictEntry(path)
+            entries.append(current)
+        current.stages[int(parts[2])] = (parts[0], parts[1])
+    return entries
+
+
+def describe_blob(size: int, data: Optional[bytes]) -> str:
+    """把阶段内容转换为显示文本（过大或二进制时只给出说明）"""
+    if data is None:
+        return f"（文件过大: {size / 1024:.0f} KB，未加载）"
+    if b'\0' in data[:BINARY_PROBE_BYTES]:
+        return f"（二进制文件，{size} 字节）"
+    return data.decode('utf-8', 'replace')
+
+
+class CatFileBatch:
+    """
+    常驻的 git cat-file --batch 进程
+
+    每次写入一组 oid 后按顺序读回 "<oid> <类型> <大小>" 和内容；
+    进程意外退出时重新启动一次并重试。
+    """
+
+    def __init__(self, git, max_bytes: Optional[int] = None):
+        self.git = git
+        self.repo_path = git.repo_path
+        self.max_bytes = max_bytes or Config.CONFLICT_MAX_BYTES
+        self.started = 0  # 启动进程的次数
+        self.objects = 0  # 读取的对象数
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure(self) -> subprocess.Popen:
+        process = self._process
+        if process is None or process.poll() is not None:
+            process = self.git.get_launch_context().popen(
+                ['git', 'cat-file', '--batch'], stdin=True, binary=True
+            )
+            self._process = process
+            self.started += 1
+        return process
+
+    def read(self, oids: Sequence[str]) -> Dict[str, Tuple[int, Optional[bytes]]]:
+        """
+        批量读取对象
+
+        Returns:
+            oid -> (大小, 内容)；超过 max_bytes 的内容为 None，不存在的对象不出现在结果中
+        """
+        results: Dict[str, Tuple[int, Optional[bytes]]] = {}
+        with self._lock:
+            for start in range(0, len(oids), BATCH_CHUNK):
+                chunk = oids[start:start + BATCH_CHUNK]
+                for _ in range(2):
+                    try:
+                        results.update(self._round_trip(chunk))
+                        break
+                    except (OSError, ValueError):
+                        self._stop()
+        return results
+
+    def _round_trip(self, oids: Sequence[str]) -> Dict[str, Tuple[int, Optional[bytes]]]:
+        process = self._ensure()
+        process.stdin.write("".join(f"{oid}\n" for oid in oids).encode('ascii'))
+        process.stdin.flush()
+
+        results = {}
+        stdout = process.stdout
+        for oid in oids:
+            header = stdout.readline()
+            if not header:
+                raise OSError("cat-file 进程已退出")
+            parts = header.split()
+            if len(parts) != 3:
+                continue  # "<oid> missing" 或 "<oid> ambiguous"
+            size = int(parts[2])
+            if size > self.max_bytes:
+                remaining = size
+                while remaining:
+                    skipped = len(stdout.read(min(remaining, SKIP_CHUNK_BYTES)))
+                    if not skipped:
+                        raise OSError("cat-file 输出不完整")
+                    remaining -= skipped
+                data = None
+            else:
+                data = stdout.read(size)
+                if len(data) != size:
+                    raise OSError("cat-file 输出不完整")
+            stdout.read(1)  # 内容后的换行
+            results[oid] = (size, data)
+            self.objects += 1
+        return results
+
+    def _stop(self):
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=Config.CANCEL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        for stream in (process.stdout, process.stderr):
+            if stream is not None:
+                stream.close()
+
+    def close(self):
+        """结束进程"""
+        with self._lock:
+            self._stop()
+
+
+class ConflictStore:
+    """
+    冲突视图的数据来源
+
+    各阶段内容只在选中路径时加载，同一路径缺失的阶段一次写入读取器；
+    内容按 blob oid 缓存（对象不可变，跨仓库共用同一缓存也不会出错）。
+    """
+
+    def __init__(self, git):
+        self.git = git
+        self.cache = LRUCache("冲突内容缓存", Config.CONFLICT_BLOB_CACHE_SIZE)
+        self._reader: Optional[CatFileBatch] = None
+        self._lock = threading.Lock()
+
+    def _get_reader(self) -> CatFileBatch:
+        """当前仓库的读取器（仓库切换时重建）"""
+        with self._lock:
+            reader = self._reader
+            if reader is None or reader.repo_path != self.git.repo_path:
+                if reader is not None:
+                    reader.close()
+                reader = CatFileBatch(self.git)
+                self._reader = reader
+            return reader
+
+    def load(self, entry: ConflictEntry) -> Dict[int, str]:
+        """
+        读取条目各阶段的显示文本
+
+        Returns:
+            阶段 -> 显示文本（不存在的阶段不出现在结果中）
+        """
+        texts: Dict[int, str] = {}
+        missing: List[str] = []
+        for stage, (_, oid) in entry.stages.items():
+            cached = self.cache.get(oid)
+            if cached is not None:
+                texts[stage] = cached
+            elif oid not in missing:
+                missing.append(oid)
+
+        if missing:
+            blobs = self._get_reader().read(missing)
+            loaded = {oid: describe_blob(*blob) for oid, blob in blobs.items()}
+            for oid, text in loaded.items():
+                self.cache.put(oid, text)
+            for stage, (_, oid) in entry.stages.items():
+                if stage not in texts:
+                    texts[stage] = loaded.get(oid, "（无法读取对象）")
+        return texts
+
+    def close(self):
+        """结束读取器进程（缓存保留）"""
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        reader = self._reader
+        if reader is None:
+            return "冲突内容读取: 未启动"
+        return f"冲突内容读取: cat-file 进程启动 {reader.started} 次，读取 {reader.objects} 个对象"
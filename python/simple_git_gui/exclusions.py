@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+排除规则模块
+判断路径是否匹配排除规则，供 GUI 和命令行共用；按仓库保存排除配置，并持久化预编译的匹配器
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import LRUCache, normalize_repo_key
+from .config import Config
+
+
+# 持久化匹配器的格式版本（匹配规则变化时递增，旧文件会重新编译）
+MATCHER_FORMAT = 1
+
+# 匹配器只用 Python 标准 re 模块执行，与平台相关的大小写规则需要记录
+_FLAGS = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+
+
+def _normalize(path: str) -> str:
+    """统一分隔符并去掉开头的 ./"""
+    return path.replace('\\', '/').lstrip('./')
+
+
+def should_hide_path(filepath: str, patterns: Optional[Iterable[str]] = None) -> bool:
+    """
+    判断路径是否需要在未暂存列表中隐藏
+
+    Args:
+        filepath: 仓库内相对路径
+        patterns: 排除模式列表，默认使用 Config.STATUS_EXCLUDE_PATTERNS
+    """
+    if patterns is None:
+        patterns = getattr(Config, 'STATUS_EXCLUDE_PATTERNS', None)
+    if not patterns or not filepath:
+        return False
+    normalized = _normalize(filepath)
+    for pattern in patterns:
+        if not pattern:
+            continue
+        normalized_pattern = _normalize(pattern)
+        if not normalized_pattern:
+            continue
+        if normalized_pattern.endswith('/'):
+            directory = normalized_pattern.rstrip('/')
+            if normalized.startswith(directory):
+                return True
+        if fnmatch.fnmatch(normalized, normalized_pattern):
+            return True
+    return False
+
+
+def patterns_digest(patterns: Iterable[str]) -> str:
+    """排除规则的内容哈希"""
+    digest = hashlib.sha256()
+    for pattern in patterns:
+        digest.update(pattern.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ExclusionMatcher:
+    """
+    预编译的排除规则匹配器（匹配结果与 should_hide_path 相同）
+
+    - 目录规则（以 / 结尾）合并为一个前缀元组，一次 str.startswith 完成
+    - 通配符规则合并为一个正则表达式，一次 match 完成
+    """
+
+    __slots__ = ('digest', 'count', '_prefixes', '_source', '_regex')
+
+    def __init__(self, digest: str, count: int, prefixes: Tuple[str, ...], source: str):
+        self.digest = digest
+        self.count = count
+        self._prefixes = prefixes
+        self._source = source
+        self._regex = re.compile(source, _FLAGS) if source else None
+
+    @classmethod
+    def compile(cls, patterns: List[str]) -> "ExclusionMatcher":
+        """由排除规则编译匹配器"""
+        prefixes = []
+        alternatives = []
+        for pattern in patterns:
+            normalized = _normalize(pattern) if pattern else ''
+            if not normalized:
+                continue
+            if normalized.endswith('/'):
+                prefixes.append(normalized.rstrip('/'))
+            # fnmatch.fnmatch 会对两侧做 normcase，这里预先处理规则一侧
+            alternatives.append(fnmatch.translate(os.path.normcase(normalized)))
+        return cls(patterns_digest(patterns), len(patterns), tuple(prefixes), '|'.join(alternatives))
+
+    @classmethod
+    def from_dict(cls, digest: str, count: int, data: Dict) -> Optional["ExclusionMatcher"]:
+        """
+        从持久化数据恢复匹配器（跳过逐条转换）
+
+        格式版本、平台大小写规则或内容哈希（digest 为按当前规则计算的哈希）不一致时
+        返回 None，由调用方重新编译。
+        """
+        try:
+            if data.get('format') != MATCHER_FORMAT or data.get('flags') != _FLAGS:
+                return None
+            if data.get('digest') != digest:
+                return None
+            return cls(digest, count, tuple(data['prefixes']), data['source'])
+        except (AttributeError, KeyError, TypeError, re.error):
+            return None
+
+    def to_dict(self) -> Dict:
+        """序列化为可写入 JSON 的数据"""
+        return {
+            'format': MATCHER_FORMAT,
+            'flags': _FLAGS,
+            'digest': self.digest,
+            'prefixes': list(self._prefixes),
+            'source': self._source,
+        }
+
+    def matches(self, filepath: str) -> bool:
+        """判断路径是否被排除"""
+        if not filepath:
+            return False
+        normalized = _normalize(filepath)
+        if self._prefixes and normalized.startswith(self._prefixes):
+            return True
+        return self._regex is not None and self._regex.match(os.path.normcase(normalized)) is not None
+
+
+# 进程内按内容哈希共享匹配器，切换回已加载过的仓库时不再编译
+_matcher_cache = LRUCache("排除规则匹配器缓存", Config.EXCLUDE_MATCHER_CACHE_SIZE)
+
+
+def get_matcher(patterns: List[str]) -> ExclusionMatcher:
+    """获取规则列表对应的匹配器（按内容哈希缓存）"""
+    patterns = list(patterns)
+    digest = patterns_digest(patterns)
+    return _matcher_cache.get_or_compute(digest, lambda: ExclusionMatcher.compile(patterns))
+
+
+def parse_ignore_file(path: str) -> Tuple[List[str], int]:
+    """
+    把 .gitignore 格式的文件转换为排除规则
+
+    - 空行和 # 注释跳过，\\# 和 \\! 转义为普通字符
+    - 开头的 / 表示只匹配仓库根目录，去掉即可
+    - 不含 / 的规则在 .gitignore 中匹配任意层级，额外生成 */ 开头的规则
+    - ! 否定规则无法表达，跳过并计数
+
+    Returns:
+        (规则列表, 跳过的否定规则数)
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = f.read().splitlines()
+
+    patterns: List[str] = []
+    negated = 0
+    for line in lines:
+        if not line.strip() or line.startswith('#'):
+            continue
+        if line.startswith('!'):
+            negated += 1
+            continue
+        if line.startswith(('\\#', '\\!')):
+            line = line[1:]
+        # 去掉未转义的行尾空格
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if line.startswith('**/'):
+            line = line[3:]
+            anchored = False
+        else:
+            anchored = line.startswith('/') or '/' in line.rstrip('/')
+        line = line.lstrip('/')
+        if line.endswith('/**'):
+            line = line[:-2]
+        if not line:
+            continue
+        if line.endswith('/'):
+            # 目录规则：根目录下用前缀匹配，其他层级匹配目录下的所有文件
+            patterns.append(line)
+            if not anchored:
+                patterns.append('*/' + line + '*')
+            continue
+        # 普通规则同时可能匹配目录，目录下的文件也要排除
+        patterns.extend([line, line + '/*'])
+        if not anchored:
+            patterns.extend(['*/' + line, '*/' + line + '/*'])
+    return list(dict.fromkeys(patterns)), negated
+
+
+def default_profile_dir() -> str:
+    """排除配置的默认保存目录"""
+    if Config.SETTINGS_DIR:
+        base = Config.SETTINGS_DIR
+    elif os.name == 'nt':
+        base = os.path.join(os.environ.get('APPDATA') or os.path.expanduser('~'), 'SimpleGitGUI')
+    else:
+        config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        base = os.path.join(config_home, 'simple-git-gui')
+    return os.path.join(base, 'exclusions')
+
+
+class ExclusionProfile:
+    """单个仓库的排除配置"""
+
+    def __init__(self, repo_path: str, patterns: Optional[List[str]] = None, matcher: Optional[ExclusionMatcher] = None):
+        self.repo_path = repo_path
+        self.patterns: List[str] = list(patterns or [])
+        self._matcher = matcher
+
+    @property
+    def matcher(self) -> ExclusionMatcher:
+        """当前规则的匹配器（规则变化后首次使用时重新获取）"""
+        if self._matcher is None:
+            self._matcher = get_matcher(self.patterns)
+        return self._matcher
+
+    def matches(self, filepath: str) -> bool:
+        return self.matcher.matches(filepath)
+
+    def add(self, patterns: Iterable[str]) -> List[str]:
+        """添加规则，返回实际新增的规则"""
+        existing = set(self.patterns)
+        added = []
+        for pattern in patterns:
+            if pattern and pattern not in existing:
+                existing.add(pattern)
+                added.append(pattern)
+        if added:
+            self.patterns.extend(added)
+            self._matcher = None
+        return added
+
+    def remove(self, patterns: Iterable[str]) -> int:
+        """移除规则，返回移除数量"""
+        targets = set(patterns)
+        kept = [p for p in self.patterns if p not in targets]
+        removed = len(self.patterns) - len(kept)
+        if removed:
+            self.patterns = kept
+            self._matcher = None
+        return removed
+
+    def replace(self, patterns: List[str]):
+        """整体替换规则（撤销时使用）"""
+        self.patterns = list(patterns)
+        self._matcher = None
+
+
+class ExclusionProfileStore:
+    """
+    排除配置存储
+
+    每个仓库一个 JSON 文件（文件名为仓库路径的哈希），保存规则、内容哈希和预编译的匹配器数据；
+    加载时哈希一致则直接使用保存的匹配器，写入时先写临时文件再替换。
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = base_dir or default_profile_dir()
+
+    def path_for(self, repo_path: str) -> str:
+        """仓库对应的配置文件路径"""
+        key = normalize_repo_key(repo_path)
+        name = hashlib.sha1(key.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+        return os.path.join(self.base_dir, f"{name}.json")
+
+    def load(self, repo_path: str) -> ExclusionProfile:
+        """加载仓库的排除配置（不存在或损坏时返回空配置）"""
+        try:
+            with open(self.path_for(repo_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            patterns = [p for p in data.get('patterns', []) if isinstance(p, str)]
+        except (OSError, ValueError, AttributeError):
+            return ExclusionProfile(repo_path)
+
+        # 按实际规则计算哈希，文件被手动修改过时不会误用旧的匹配器
+        digest = patterns_digest(patterns)
+        matcher = _matcher_cache.get(digest)
+        if matcher is None:
+            saved = data.get('matcher')
+            matcher = ExclusionMatcher.from_dict(digest, len(patterns), saved if isinstance(saved, dict) else {})
+            if matcher is not None:
+                _matcher_cache.put(digest, matcher)
+        return ExclusionProfile(repo_path, patterns, matcher)
+
+    def save(self, profile: ExclusionProfile):
+        """保存排除配置（含序列化的匹配器）"""
+        data = {
+            'repo': profile.repo_path,
+            'patterns': profile.patterns,
+            'matcher': profile.matcher.to_dict(),
+        }
+        os.makedirs(self.base_dir, exist_ok=True)
+        target = self.path_for(profile.repo_path)
+        fd, temp_path = tempfile.mkstemp(dir=self.base_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, target)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+后台自动抓取模块
+按配置间隔（带随机抖动）抓取每个远程仓库，失败时指数退避
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .config import Config
+
+
+class _RemoteState:
+    """单个远程仓库的调度状态"""
+
+    __slots__ = ('next_due', 'failures', 'last_result', 'last_duration')
+
+    def __init__(self, next_due: float):
+        self.next_due = next_due
+        self.failures = 0
+        self.last_result = "等待中"
+        self.last_duration = 0.0
+
+
+class FetchScheduler:
+    """
+    后台抓取调度器
+
+    - 每个远程仓库独立调度，间隔加入随机抖动，避免多个远程同时抓取
+    - 失败后按指数退避重试，成功后恢复正常间隔
+    - 前台命令占用仓库（GitCore.is_busy）时暂停
+    - 仅当引用 oid 摘要发生变化时才通知刷新分支列表
+    """
+
+    def __init__(self, git, on_refs_changed: Optional[Callable] = None):
+        """
+        Args:
+            git: GitCore 实例
+            on_refs_changed: 引用变化时通过结果队列回调 callback(success, stdout, stderr)
+        """
+        self.git = git
+        self.on_refs_changed = on_refs_changed
+        self._states: Dict[str, _RemoteState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._generation = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _jittered(seconds: float) -> float:
+        """在基准时间上加入 ±AUTO_FETCH_JITTER 比例的随机抖动"""
+        jitter = Config.AUTO_FETCH_JITTER
+        return max(1.0, seconds * random.uniform(1 - jitter, 1 + jitter))
+
+    @staticmethod
+    def _backoff_delay(failures: int) -> float:
+        """计算第 failures 次失败后的退避时间"""
+        delay = Config.AUTO_FETCH_RETRY_BASE_SECONDS * (2 ** (failures - 1))
+        return min(delay, Config.AUTO_FETCH_MAX_BACKOFF_SECONDS)
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程"""
+        self._stop.set()
+        self._wake.set()
+
+    def reset(self):
+        """仓库切换后重置所有远程的调度状态"""
+        with self._lock:
+            self._states.clear()
+            self._generation += 1
+        self._wake.set()
+
+    def _sync_remotes(self, now: float) -> List[str]:
+        """同步远程列表：为新远程安排首次抓取，移除已删除的远程"""
+        if not self.git.is_git_repo(self.git.repo_path):
+            return []
+        remotes = self.git.get_remotes()
+        with self._lock:
+            for remote in remotes:
+                if remote not in self._states:
+                    self._states[remote] = _RemoteState(
+                        now + self._jittered(Config.AUTO_FETCH_INITIAL_DELAY_SECONDS)
+                    )
+            for remote in list(self._states):
+                if remote not in remotes:
+                    del self._states[remote]
+        return remotes
+
+    def _run(self):
+        """调度主循环"""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            remotes = self._sync_remotes(now)
+
+            with self._lock:
+                due = [r for r in remotes if r in self._states and self._states[r].next_due <= now]
+
+            for remote in due:
+                # 前台命令占用仓库时暂停
+                while self.git.is_busy and not self._stop.is_set():
+                    self._stop.wait(Config.AUTO_FETCH_BUSY_POLL_SECONDS)
+                if self._stop.is_set():
+                    return
+                self._fetch(remote)
+
+            with self._lock:
+                next_times = [state.next_due for state in self._states.values()]
+            if next_times:
+                wait_time = min(next_times) - time.monotonic()
+            else:
+                wait_time = Config.AUTO_FETCH_INTERVAL_SECONDS
+            wait_time = min(max(wait_time, 1.0), Config.AUTO_FETCH_INTERVAL_SECONDS)
+
+            self._wake.wait(wait_time)
+            self._wake.clear()
+
+    def _fetch(self, remote: str):
+        """抓取单个远程仓库并更新其调度状态"""
+        with self._lock:
+            generation = self._generation
+
+        before = self.git.get_ref_digest()
+        started = time.monotonic()
+        _, stderr, returncode = self.git.run_command_tracked(
+            ['git', 'fetch', '--prune', remote],
+            f"自动抓取 {remote}",
+            extra_env={'GIT_TERMINAL_PROMPT': '0'}
+        )
+        finished = time.monotonic()
+
+        with self._lock:
+            if generation != self._generation:
+                return  # 抓取期间切换了仓库，结果作废
+            state = self._states.get(remote)
+            if state is None:
+                return
+            state.last_duration = finished - started
+            if returncode == 0:
+                state.failures = 0
+                state.last_result = "成功"
+                state.next_due = finished + self._jittered(Config.AUTO_FETCH_INTERVAL_SECONDS)
+            else:
+                state.failures += 1
+                first_line = (stderr or '').strip().split('\n', 1)[0]
+                state.last_result = f"失败 ({first_line[:80]})"
+                state.next_due = finished + self._jittered(self._backoff_delay(state.failures))
+                return
+
+        after = self.git.get_ref_digest()
+        if after and after != before and self.on_refs_changed:
+            self.git.result_queue.put(
+                (f"自动抓取 {remote}", True, "远程引用已更新。", "", self.on_refs_changed)
+            )
+
+    def format_stats(self) -> List[str]:
+        """格式化各远程的调度状态（用于性能统计显示）"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                f"自动抓取 {remote}: {state.last_result}, 耗时 {state.last_duration:.2f}s, "
+                f"连续失败 {state.failures}, {max(0, int(state.next_due - now))}s 后再次抓取"
+                for remote, state in sorted(self._states.items())
+            ]
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+文件筛选模块
+在状态快照上建立可快速筛选的索引，支持子串、通配符和模糊匹配；
+筛选按块执行，可在界面线程中分帧推进
+"""
+
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, compress, repeat
+from operator import contains
+from typing import Iterable, Optional
+
+from .config import Config
+from .status_model import StatusSnapshot
+
+
+# 筛选模式
+MODE_SUBSTRING = "子串"
+MODE_GLOB = "通配"
+MODE_FUZZY = "模糊"
+FILTER_MODES = (MODE_SUBSTRING, MODE_GLOB, MODE_FUZZY)
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def glob_to_regex(pattern: str) -> str:
+    """将通配符模式转换为正则（配合 fullmatch 使用，* 可匹配 /，与排除规则一致）"""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            parts.append('.*')
+        elif c == '?':
+            parts.append('.')
+        elif c == '[':
+            end = pattern.find(']', i + 1 if i < n and pattern[i] in '!^' else i)
+            if end < 0:
+                parts.append(re.escape(c))
+                continue
+            body = pattern[i:end]
+            i = end + 1
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            body = body.replace('\\', '\\\\')
+            parts.append(f"[^{body}]" if negate else f"[{body}]")
+        else:
+            parts.append(re.escape(c))
+    return ''.join(parts)
+
+
+def fuzzy_to_regex(query: str) -> str:
+    """
+    将模糊查询转换为子序列正则
+
+    形如 a[^b]*b[^c]*c，每段只跳过到下一个字符的首次出现，避免回溯；
+    Python 3.11+ 使用占有量词进一步消除回溯。
+    """
+    chars = [c for c in query if not c.isspace()]
+    if not chars:
+        return ''
+    quantifier = '*+' if sys.version_info >= (3, 11) else '*'
+    parts = [re.escape(chars[0])]
+    for c in chars[1:]:
+        escaped = re.escape(c)
+        parts.append(f"[^{escaped}]{quantifier}{escaped}")
+    return ''.join(parts)
+
+
+class FilterSearch:
+    """
+    一次分块执行的筛选
+
+    候选行按 FILTER_CHUNK_ROWS 分块判断，step 在截止时间前处理尽量多的块后返回
+    （按上一块的耗时估计下一块能否在截止前完成），调用方（界面帧调度）每帧只占用预算内的时间；
+    已找到的匹配行可在完成前先行显示。
+    完成后结果登记到索引，供下一次细化查询在其中继续筛选。
+    """
+
+    __slots__ = (
+        'index', 'query', 'mode', 'lines', 'rows', 'done', 'busy_ms',
+        '_candidates', '_position', '_flags', '_scan'
+    )
+
+    def __init__(self, index: "FilterIndex", query: str, mode: str, base: Optional[array]):
+        self.index = index
+        self.query = query
+        self.mode = mode
+        self.lines = array('I')  # 已找到的匹配行号（索引内的行号，保持原有顺序）
+        self.rows = array('I')  # 对应的快照索引，随分块推进同步映射
+        self.done = False
+        self.busy_ms = 0.0  # 各次 step 实际占用的时间之和
+        self._candidates = base  # None 表示全部行
+        self._position = 0
+        # 全量子串查询可按块在拼接文本上扫描；其余情况逐行判断
+        self._scan = base is None and mode == MODE_SUBSTRING
+        self._flags = self._build_predicate(query, mode)
+
+    @staticmethod
+    def _build_predicate(query: str, mode: str):
+        """构建 flags(strings) -> 逐行真值迭代器（在 C 层逐行判断）；查询无效时返回 None"""
+        if mode == MODE_GLOB:
+            body = query.strip('*')
+            if not any(c in _GLOB_CHARS for c in body):
+                # 纯前缀/后缀/包含形式，走 C 层字符串方法
+                if len(query) > 1 and query.startswith('*') and query.endswith('*'):
+                    return lambda strings: map(contains, strings, repeat(body))
+                if query.startswith('*'):
+                    return lambda strings: map(str.endswith, strings, repeat(body))
+                if query.endswith('*'):
+                    return lambda strings: map(str.startswith, strings, repeat(body))
+                return lambda strings: map(str.__eq__, strings, repeat(body))
+            try:
+                pattern = re.compile(glob_to_regex(query), re.DOTALL)
+            except re.error:
+                return None
+            return lambda strings: map(pattern.fullmatch, strings)
+        if mode == MODE_FUZZY:
+            pattern = re.compile(fuzzy_to_regex(query), re.DOTALL)
+            return lambda strings: map(pattern.search, strings)
+        return lambda strings: map(contains, strings, repeat(query))
+
+    @property
+    def total(self) -> int:
+        """候选行数"""
+        return len(self.index) if self._candidates is None else len(self._candidates)
+
+    def step(self, deadline: float) -> bool:
+        """
+        处理候选行直到完成或超过截止时间（至少处理一块）
+
+        Args:
+            deadline: time.perf_counter() 时刻
+
+        Returns:
+            是否已完成
+        """
+        if self.done:
+            return True
+        started = time.perf_counter()
+        total = self.total
+        chunk = Config.FILTER_CHUNK_ROWS
+        if self._flags is None:
+            self._position = total
+        now = started
+        while self._position < total:
+            start = self._position
+            end = min(total, start + chunk)
+            matched = array('I', self._match_chunk(start, end))
+            self.lines.extend(matched)
+            self.rows.extend(map(self.index.rows.__getitem__, matched))
+            self._position = end
+            # 剩余时间不够再处理一块（按上一块的耗时估计）时留到下次
+            previous, now = now, time.perf_counter()
+            if now + (now - previous) >= deadline:
+                break
+        self.busy_ms += (time.perf_counter() - started) * 1000
+        if self._position >= total:
+            self.done = True
+            self.index._remember(self)
+        return self.done
+
+    def _match_chunk(self, start: int, end: int) -> Iterable[int]:
+        """判断一块候选行，返回匹配的行号"""
+        lower = self.index._lower
+        if self._candidates is not None:
+            candidates = self._candidates[start:end]
+            return compress(candidates, self._flags(map(lower.__getitem__, candidates)))
+        if self._scan:
+            index = self.index
+            starts = index._line_starts
+            count = index._text.count(self.query, starts[start], starts[end])
+            if count == 0:
+                return ()
+            if count * Config.FILTER_SCAN_SPARSE_RATIO < end - start:
+                return index._scan_text(self.query, start, end)
+        return compress(range(start, end), self._flags(lower[start:end]))
+
+    def result(self) -> array:
+        """已找到的匹配条目的快照索引视图"""
+        return self.rows
+
+
+class FilterIndex:
+    """
+    状态列表的筛选索引（在快照生成后建立，筛选时不调用 git）
+
+    - 筛选由 start 返回的 FilterSearch 分块执行，search 一次执行到底
+    - 子串查询先用 str.count 估计每块的匹配密度：稀疏时在拼接后的整块文本上用 str.find 扫描，
+      再二分映射回行；密集时和通配/模糊查询一样通过 map/compress 在 C 层逐行判断
+    - 连续输入时，若新查询是上一次（已完成的）查询的细化，只在上次结果中继续筛选
+    """
+
+    __slots__ = (
+        'rows', '_lower', '_text', '_line_starts',
+        '_last_query', '_last_mode', '_last_lines', 'last_elapsed_ms'
+    )
+
+    def __init__(self, snapshot: StatusSnapshot, rows: array):
+        self.rows = rows
+        source = [snapshot.paths[i] for i in rows]
+        # 已是小写的路径直接复用快照中的字符串，避免重复占用内存
+        self._lower = [lp if lp != p else p for p, lp in zip(source, map(str.lower, source))]
+        self._text = '\n'.join(self._lower)
+        self._line_starts = array('I', accumulate(map(len, self._lower), lambda a, b: a + b + 1, initial=0))
+        self._last_query: Optional[str] = None
+        self._last_mode: Optional[str] = None
+        self._last_lines: Optional[array] = None
+        self.last_elapsed_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _refines_last(self, query: str, mode: str) -> bool:
+        """新查询的结果是否必为上次结果的子集"""
+        last = self._last_query
+        if last is None or mode != self._last_mode:
+            return False
+        if mode == MODE_SUBSTRING:
+            return last in query
+        if mode == MODE_FUZZY:
+            return query.startswith(last)
+        return False
+
+    def _scan_text(self, query: str, start: int, end: int) -> array:
+        """在整块文本的 [start, end) 行范围内查找子串，返回匹配的行号（每行最多一次）"""
+        text = self._text
+        starts = self._line_starts
+        limit = starts[end]
+        lines = array('I')
+        pos = text.find(query, starts[start], limit)
+        while pos >= 0:
+            line = bisect_right(starts, pos) - 1
+            lines.append(line)
+            if line + 1 >= end:
+                break
+            pos = text.find(query, starts[line + 1], limit)
+        return lines
+
+    def _remember(self, search: FilterSearch):
+        """登记已完成的筛选，供后续细化查询使用"""
+        self._last_query, self._last_mode, self._last_lines = search.query, search.mode, search.lines
+        self.last_elapsed_ms = search.busy_ms
+
+    def start(self, query: str, mode: str = MODE_SUBSTRING) -> Optional[FilterSearch]:
+        """
+        开始一次筛选（不区分大小写），由调用方反复调用 step 推进
+
+        Returns:
+            筛选任务；查询为空时返回 None（显示全部）
+        """
+        query = (query or "").lower()
+        if not query.strip():
+            self._last_query = self._last_mode = self._last_lines = None
+            self.last_elapsed_ms = 0.0
+            return None
+        base = self._last_lines if self._refines_last(query, mode) else None
+        return FilterSearch(self, query, mode, base)
+
+    def search(self, query: str, mode: str = MODE_SUBSTRING) -> array:
+        """
+        一次执行完筛选
+
+        Returns:
+            匹配条目的快照索引视图（保持原有顺序）；查询为空时返回全部
+        """
+        search = self.start(query, mode)
+        if search is None:
+            return self.rows
+        search.step(float('inf'))
+        return search.result()
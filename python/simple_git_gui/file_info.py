@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+文件分类模块
+仅根据 stat 数据、索引元数据（cat-file --batch-check）和 .gitattributes 判断文件大小、
+二进制和 LFS 状态，不读取文件内容
+"""
+
+import os
+import stat
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import LRUCache
+from .config import Config
+from .status_model import PathSetMatcher, StatusSnapshot
+
+
+# 文件类别
+KIND_NORMAL = "普通"
+KIND_LARGE = "大文件"
+KIND_BINARY = "二进制"
+KIND_LFS = "LFS"
+
+_ATTRIBUTES = ('filter', 'diff', 'text')
+
+# 大小数组中表示无大小（目录、已删除文件）的值
+NO_SIZE = -1
+
+
+def format_size(size: Optional[int]) -> str:
+    """格式化文件大小（None 表示不存在）"""
+    if size is None:
+        return "-"
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{int(value)} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+class FileInfo:
+    """单个文件的分类信息"""
+
+    __slots__ = ('path', 'worktree_size', 'index_size', 'lfs', 'binary')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.worktree_size: Optional[int] = None  # 工作区文件大小（stat）
+        self.index_size: Optional[int] = None  # 索引中 blob 的大小（batch-check）
+        self.lfs = False  # filter=lfs
+        self.binary = False  # binary / -diff / -text 属性
+
+    @property
+    def size(self) -> Optional[int]:
+        """两侧中较大的大小"""
+        sizes = [s for s in (self.worktree_size, self.index_size) if s is not None]
+        return max(sizes) if sizes else None
+
+    @property
+    def kind(self) -> str:
+        if self.lfs:
+            return KIND_LFS
+        if (self.size or 0) > Config.LARGE_FILE_BYTES:
+            return KIND_LARGE
+        if self.binary:
+            return KIND_BINARY
+        return KIND_NORMAL
+
+    @property
+    def is_heavy(self) -> bool:
+        """
+        差异、预览等操作是否应跳过
+
+        LFS 文件在工作区一侧比较时会运行 clean 过滤器读取整个文件，同样视为重型。
+        """
+        return self.kind in (KIND_LFS, KIND_LARGE)
+
+    def describe(self) -> str:
+        """生成说明文本"""
+        return f"{self.kind}，{format_size(self.size)}"
+
+
+class FileClassifier:
+    """
+    文件分类器
+
+    - 工作区大小：os.stat，不读取内容；状态列表使用的大小按快照统计一次（snapshot_sizes）
+    - 索引大小：一次 git cat-file --batch-check 查询所有路径
+    - 属性：一次 git check-attr --stdin 查询，按 (仓库, 路径) 缓存；.gitattributes 变化时清空
+    """
+
+    def __init__(self, git):
+        self.git = git
+        self._attr_cache = LRUCache("属性缓存", Config.ATTR_CACHE_SIZE)
+
+    def stat_size(self, path: str) -> Optional[int]:
+        """工作区文件大小（不存在或为目录时返回 None）"""
+        try:
+            result = os.stat(os.path.join(self.git.repo_path, path))
+        except OSError:
+            return None
+        return None if stat.S_ISDIR(result.st_mode) else result.st_size
+
+    def snapshot_sizes(
+        self,
+        snapshot: StatusSnapshot,
+        previous: Optional[Tuple[StatusSnapshot, array]] = None,
+        paths: Optional[List[str]] = None
+    ) -> Optional[array]:
+        """
+        统计快照各条目的工作区文件大小（在后台线程中调用）
+
+        Args:
+            previous: 上一快照及其大小数组；与 paths 一起给出时只 stat 受影响路径，其余条目沿用旧值
+            paths: 局部刷新涉及的路径
+
+        Returns:
+            与快照路径表对齐的 array('q')（无大小为 NO_SIZE）；条目数超过 SIZE_COLUMN_MAX_ROWS 时返回 None
+        """
+        if len(snapshot) > Config.SIZE_COLUMN_MAX_ROWS:
+            return None
+        sizes = array('q', [NO_SIZE]) * len(snapshot)
+        matcher = PathSetMatcher(paths) if previous is not None and paths else None
+        for index, path in enumerate(snapshot.paths):
+            if path.endswith('/'):
+                continue
+            if matcher is not None and not matcher.matches(path):
+                old_snapshot, old_sizes = previous
+                old_index = old_snapshot.index_of(path)
+                if old_index >= 0:
+                    sizes[index] = old_sizes[old_index]
+                    continue
+            size = self.stat_size(path)
+            if size is not None:
+                sizes[index] = size
+        return sizes
+
+    def attributes(self, paths: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """批量获取 filter / diff / text 属性（带缓存）"""
+        repo = self.git.repo_path
+        result: Dict[str, Dict[str, str]] = {}
+        missing: List[str] = []
+        for path in paths:
+            cached = self._attr_cache.get((repo, path))
+            if cached is None:
+                missing.append(path)
+            else:
+                result[path] = cached
+        if not missing:
+            return result
+
+        stdout, _, returncode = self.git.run_command_sync(
+            ['git', 'check-attr', '-z', '--stdin'] + list(_ATTRIBUTES),
+            input_text='\0'.join(missing) + '\0'
+        )
+        fetched: Dict[str, Dict[str, str]] = {path: {} for path in missing}
+        if returncode == 0:
+            fields = stdout.split('\0')
+            for i in range(0, len(fields) - 2, 3):
+                path, attr, value = fields[i], fields[i + 1], fields[i + 2]
+                if path in fetched and value != 'unspecified':
+                    fetched[path][attr] = value
+        for path, attrs in fetched.items():
+            self._attr_cache.put((repo, path), attrs)
+        result.update(fetched)
+        return result
+
+    def index_sizes(self, paths: Iterable[str]) -> Dict[str, Optional[int]]:
+        """批量获取索引中 blob 的大小（只读取对象头）"""
+        paths = [p for p in paths if '\n' not in p]
+        if not paths:
+            return {}
+        stdout, _, returncode = self.git.run_command_sync(
+            ['git', 'cat-file', '--batch-check=%(objectsize)'],
+            input_text=''.join(f":{p}\n" for p in paths)
+        )
+        sizes: Dict[str, Optional[int]] = {p: None for p in paths}
+        if returncode == 0:
+            for path, line in zip(paths, stdout.split('\n')):
+                line = line.strip()
+                if line.isdigit():
+                    sizes[path] = int(line)
+        return sizes
+
+    def classify(self, paths: Iterable[str]) -> Dict[str, FileInfo]:
+        """批量分类（两次 git 调用 + 每个路径一次 stat）"""
+        paths = [p for p in dict.fromkeys(paths) if not p.endswith('/')]
+        attributes = self.attributes(paths)
+        index_sizes = self.index_sizes(paths)
+        infos: Dict[str, FileInfo] = {}
+        for path in paths:
+            info = FileInfo(path)
+            info.worktree_size = self.stat_size(path)
+            info.index_size = index_sizes.get(path)
+            attrs = attributes.get(path, {})
+            info.lfs = attrs.get('filter') == 'lfs'
+            info.binary = attrs.get('diff') == 'unset' or attrs.get('text') == 'unset'
+            infos[path] = info
+        return infos
+
+    def invalidate(self, paths: Optional[List[str]] = None):
+        """
+        状态刷新后调用：涉及 .gitattributes 时清空当前仓库的属性缓存
+        """
+        if paths is not None and not any(os.path.basename(p.rstrip('/')) == '.gitattributes' for p in paths):
+            return
+        repo = self.git.repo_path
+        self._attr_cache.invalidate_where(lambda key: key[0] == repo)
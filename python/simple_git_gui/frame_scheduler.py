@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+界面帧调度模块
+收集各子系统的界面更新，按帧在主线程中批量执行，并限制帧率
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+
+from .config import Config
+
+
+class FrameStats:
+    """帧调度统计（只统计有工作的帧）"""
+
+    __slots__ = ('frames', 'total_ms', 'max_ms', 'slow_frames', 'updates', 'merged', 'dropped', 'deferred')
+
+    def __init__(self):
+        self.frames = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_frames = 0  # 超出帧间隔的帧数
+        self.updates = 0  # 实际执行的更新数
+        self.merged = 0  # 被同键的后续更新合并掉的次数
+        self.dropped = 0  # 未显示即被丢弃的输出条目数
+        self.deferred = 0  # 预算用完、剩余工作延后到下一帧的次数
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.frames if self.frames else 0.0
+
+
+class FrameScheduler:
+    """
+    界面帧调度器
+
+    - 更新按键登记，执行前同键的多次登记只保留最后一次（计为合并），
+      带延迟的更新合并时保留最早的到期时间
+    - 每帧先调用各数据源的 pump（如结果队列），再按登记顺序执行到期的更新
+    - pump 应在帧预算用完时停止并返回 True，剩余工作留到下一帧
+    - 有工作时按 UI_FRAME_INTERVAL_MS 调度下一帧，空闲时按 UI_IDLE_POLL_MS 轮询
+    - schedule 可在任意线程调用，更新本身只在主线程执行
+    """
+
+    def __init__(self, root, interval_ms: Optional[int] = None, idle_ms: Optional[int] = None,
+                 budget_ms: Optional[float] = None):
+        self.root = root
+        self.interval_ms = interval_ms or Config.UI_FRAME_INTERVAL_MS
+        self.idle_ms = idle_ms or Config.UI_IDLE_POLL_MS
+        self.budget_ms = budget_ms or Config.UI_FRAME_BUDGET_MS
+        self.stats = FrameStats()
+        self._pending: "OrderedDict[Hashable, Tuple[Callable[[], None], float]]" = OrderedDict()
+        self._pumps: List[Callable[[float], bool]] = []
+        self._lock = threading.Lock()
+        self._anonymous = itertools.count()
+        self._job = None
+        self._stopped = True
+
+    def add_pump(self, pump: Callable[[float], bool]):
+        """
+        登记每帧调用的数据源
+
+        Args:
+            pump: pump(deadline) -> 是否还有剩余工作，deadline 为 time.perf_counter() 时刻
+        """
+        self._pumps.append(pump)
+
+    def schedule(self, key: Optional[Hashable], update: Callable[[], None], delay_ms: float = 0):
+        """
+        登记一次界面更新
+
+        Args:
+            key: 合并键，None 表示不与其他更新合并
+            update: 更新函数（在主线程中无参数调用）
+            delay_ms: 最早在多少毫秒后执行
+        """
+        if key is None:
+            key = ('anonymous', next(self._anonymous))
+        due = time.perf_counter() + delay_ms / 1000
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None:
+                self.stats.merged += 1
+                due = min(due, previous[1])
+            self._pending[key] = (update, due)
+
+    def cancel(self, key: Hashable):
+        """取消尚未执行的更新"""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def note_dropped(self, count: int = 1):
+        """记录被丢弃的更新（由更新的生产者调用）"""
+        with self._lock:
+            self.stats.dropped += count
+
+    def start(self):
+        """开始帧循环"""
+        if not self._stopped:
+            return
+        self._stopped = False
+        self._tick()
+
+    def stop(self):
+        """停止帧循环（未执行的更新被丢弃）"""
+        self._stopped = True
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+        with self._lock:
+            self._pending.clear()
+
+    def _tick(self):
+        """执行一帧"""
+        self._job = None
+        if self._stopped:
+            return
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+
+        backlog = False
+        for pump in self._pumps:
+            try:
+                if pump(deadline):
+                    backlog = True
+            except Exception as e:
+                # 避免单个数据源出错导致帧循环中断
+                print(f"界面帧处理错误: {e}")
+            if self._stopped:
+                return
+
+        now = time.perf_counter()
+        with self._lock:
+            due = [(key, entry[0]) for key, entry in self._pending.items() if entry[1] <= now]
+            for key, _ in due:
+                del self._pending[key]
+            waiting = bool(self._pending)
+
+        for _, update in due:
+            try:
+                update()
+            except Exception as e:
+                print(f"界面更新错误: {e}")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        busy = backlog or bool(due)
+        if busy:
+            stats = self.stats
+            with self._lock:
+                stats.frames += 1
+                stats.total_ms += elapsed_ms
+                stats.max_ms = max(stats.max_ms, elapsed_ms)
+                stats.updates += len(due)
+                if elapsed_ms > self.interval_ms:
+                    stats.slow_frames += 1
+                if backlog:
+                    stats.deferred += 1
+
+        if not self._stopped:
+            delay = self.interval_ms if busy or waiting else self.idle_ms
+            self._job = self.root.after(int(delay), self._tick)
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        stats = self.stats
+        return (
+            f"界面帧: {stats.frames} 帧，平均 {stats.mean_ms:.1f} ms，最长 {stats.max_ms:.1f} ms，"
+            f"超时 {stats.slow_frames} 帧；执行 {stats.updates} 次更新，合并 {stats.merged} 次，"
+            f"丢弃 {stats.dropped} 条，延后 {stats.deferred} 帧"
+        )
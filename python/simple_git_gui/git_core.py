@@ -4,13 +4,28 @@ Git 核心功能模块
 处理所有 Git 命令的执行和解析
 """
 
+import itertools
 import os
 import subprocess
 import threading
+import time
 import queue
-from typing import Optional, Tuple, List, Callable, Any
+from typing import Dict, Optional, Tuple, List, Callable, Any
 
+from .backends import BackendRouter, SubprocessBackend, measure_backends
+from .cache import LRUCache, normalize_repo_key
+from .commands import CommandHandle, CommandStream, LaunchContext, kill_process_tree
 from .config import Config
+from .conflicts import STAGE_OURS, STAGE_THEIRS, ConflictEntry, parse_unmerged
+from .file_info import FileClassifier
+from .maintenance import (
+    PROBE_QUERIES, MaintenanceTask, RepositoryHealth, format_comparison, parse_count_objects,
+    parse_git_version, read_index_header
+)
+from .native_backend import NativeBackend
+from .ssh_mux import get_multiplexer
+from .status_model import StatusSnapshot
+from .worktrees import WorktreeInfo, parse_worktree_list
 
 
 class GitCore:
@@ -24,9 +39,28 @@ class GitCore:
         self._is_busy = False
         self._busy_lock = threading.Lock()  # 修复：使用锁保证线程安全
         
-        # 缓存（修复：使用字典而非 lru_cache）
-        self._repo_cache = {}
-        self._path_cache = {}
+        # 正在执行的命令句柄（id -> handle），忙碌状态归属于某个前台命令
+        self._commands: Dict[int, CommandHandle] = {}
+        self._busy_owner: Optional[int] = None
+        self._command_ids = itertools.count(1)
+        
+        # 有界 LRU 缓存（容量由 Config 配置，带命中统计）
+        self._repo_cache = LRUCache("仓库检测缓存", Config.REPO_CACHE_SIZE)
+        self._path_cache = LRUCache("路径解析缓存", Config.PATH_CACHE_SIZE)
+        self._stash_diff_cache = LRUCache("储藏内容缓存", Config.STASH_DIFF_CACHE_SIZE)
+        self._diff_cache = LRUCache("文件差异缓存", Config.DIFF_CACHE_SIZE)
+        
+        # SSH 连接复用（进程内共享）
+        self.ssh_mux = get_multiplexer()
+        
+        # 命令启动上下文（按仓库构建一次，仓库切换或调用 invalidate_launch_context 时重建）
+        self._launch: Optional[LaunchContext] = None
+        
+        # 文件分类（大小 / LFS / 二进制，只读元数据）
+        self.file_classifier = FileClassifier(self)
+        
+        # 只读查询后端（进程内读取优先，无法回答时调用 git；按仓库构建）
+        self._backend: Optional[BackendRouter] = None
     
     @property
     def is_busy(self) -> bool:
@@ -46,35 +80,127 @@ class GitCore:
             return False
         
         # 规范化路径
-        norm_path = os.path.normpath(path)
+        norm_path = normalize_repo_key(path)
         
         # 检查缓存
-        if norm_path in self._repo_cache:
-            return self._repo_cache[norm_path]
+        cached = self._repo_cache.get(norm_path)
+        if cached is not None:
+            return cached
         
-        # 检查是否存在 .git 目录
+        # 检查是否存在 .git（主工作树为目录，链接工作树为指向公共目录的文件）
         result = os.path.isdir(path) and os.path.exists(os.path.join(path, '.git'))
-        
-        # 缓存结果（限制缓存大小）
-        if len(self._repo_cache) > 32:
-            self._repo_cache.clear()
-        self._repo_cache[norm_path] = result
+        self._repo_cache.put(norm_path, result)
         
         return result
     
     def clear_cache(self):
-        """清理缓存"""
+        """清理所有缓存"""
         self._repo_cache.clear()
         self._path_cache.clear()
     
+    def invalidate_repository(self, repo_path: str) -> int:
+        """
+        仅使与指定仓库相关的缓存条目失效
+        
+        路径解析缓存的键是 Git 输出的原始文本，与仓库无关，因此保留。
+        
+        Returns:
+            失效的条目数量
+        """
+        repo_key = normalize_repo_key(repo_path)
+        if not repo_key:
+            return 0
+        self.ssh_mux.forget_repository(repo_path)
+        self.invalidate_launch_context()
+        prefix = repo_key.rstrip(os.sep) + os.sep
+        return self._repo_cache.invalidate_where(
+            lambda key: key == repo_key or key.startswith(prefix)
+        )
+    
+    def get_launch_context(self) -> LaunchContext:
+        """获取当前仓库的命令启动上下文（仓库路径变化时自动重建）"""
+        context = self._launch
+        if context is None or context.repo_path != self.repo_path:
+            context = LaunchContext(self.repo_path)
+            self._launch = context
+        return context
+    
+    def invalidate_launch_context(self):
+        """环境或仓库配置变化后重建启动上下文"""
+        self._launch = None
+    
+    def get_backend(self) -> BackendRouter:
+        """获取当前仓库的只读查询后端（仓库路径变化时自动重建）"""
+        backend = self._backend
+        if backend is None or backend.repo_path != self.repo_path:
+            backends = [SubprocessBackend(self)]
+            if Config.NATIVE_BACKEND:
+                backends.insert(0, NativeBackend(self.repo_path))
+            backend = BackendRouter(self.repo_path, backends)
+            if self._backend is not None:
+                self._backend.close()
+            self._backend = backend
+        return backend
+    
+    def measure_backends(self, iterations: int = 20) -> Dict[str, Dict[str, Optional[float]]]:
+        """对比进程内后端与 git 子进程回答各只读查询的平均耗时（毫秒），并检查结果是否一致"""
+        native = NativeBackend(self.repo_path)
+        try:
+            return measure_backends([SubprocessBackend(self), native], iterations)
+        finally:
+            native.close()
+    
+    def measure_spawn_overhead(self, iterations: int = 50) -> Dict[str, float]:
+        """
+        测量启动命令的平均耗时（毫秒）：旧方式（每次复制环境、搜索 PATH、检查路径）与启动上下文
+        
+        使用 git rev-parse --git-dir，执行本身很快，耗时主要来自进程启动。
+        """
+        command = ['git', 'rev-parse', '--git-dir']
+        
+        def legacy():
+            if not os.path.exists(self.repo_path):
+                return
+            env = os.environ.copy()
+            env['GIT_EDITOR'] = 'true'
+            process = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                encoding='utf-8', errors='replace', cwd=self.repo_path, env=env,
+                start_new_session=os.name != 'nt'
+            )
+            process.communicate()
+        
+        def current():
+            self.get_launch_context().popen(command).communicate()
+        
+        results = {}
+        for name, spawn in (('legacy_ms', legacy), ('context_ms', current)):
+            spawn()  # 预热
+            started = time.perf_counter()
+            for _ in range(iterations):
+                spawn()
+            results[name] = (time.perf_counter() - started) * 1000 / iterations
+        return results
+    
+    def get_cache_stats(self) -> List[str]:
+        """获取各缓存的统计信息（用于性能统计显示）"""
+        return [
+            cache.format_stats()
+            for cache in (
+                self._repo_cache, self._path_cache, self._stash_diff_cache, self._diff_cache,
+                self.file_classifier._attr_cache
+            )
+        ]
+    
     def parse_git_path(self, filepath: str) -> str:
         """解析 Git 输出的文件路径"""
         if not filepath:
             return filepath
         
         # 检查缓存
-        if filepath in self._path_cache:
-            return self._path_cache[filepath]
+        cached = self._path_cache.get(filepath)
+        if cached is not None:
+            return cached
         
         result = filepath
         
@@ -99,59 +225,169 @@ class GitCore:
                 except (UnicodeDecodeError, UnicodeEncodeError):
                     pass  # 保留原始路径
         
-        # 限制缓存大小
-        if len(self._path_cache) > 128:
-            self._path_cache.clear()
-        self._path_cache[filepath] = result
+        self._path_cache.put(filepath, result)
         
         return result
     
-    def run_command_sync(self, command_list: List[str]) -> Tuple[str, str, int]:
+    def run_command_sync(
+        self,
+        command_list: List[str],
+        handle: Optional[CommandHandle] = None,
+        extra_env: Optional[Dict[str, str]] = None,
+        input_text: Optional[str] = None,
+        exact: bool = False
+    ) -> Tuple[str, str, int]:
         """
         同步执行 Git 命令
         
+        Args:
+            command_list: 命令列表
+            handle: 可选的命令句柄，用于从其他线程取消命令
+            extra_env: 额外的环境变量
+            input_text: 通过标准输入传给命令的文本
+            exact: 逐字节保留输入输出（不转换换行符，非 UTF-8 字节以代理字符往返），用于补丁
+        
         Returns:
             (stdout, stderr, returncode) 元组
         """
-        if not self.repo_path or not os.path.exists(self.repo_path):
-            err_msg = f"错误：仓库路径 '{self.repo_path}' 无效或不存在。"
-            return "", err_msg, -1
+        context = self.get_launch_context()
+        if not context.valid:
+            return "", f"错误：仓库路径 '{self.repo_path}' 无效或不存在。", -1
         
         try:
-            env = os.environ.copy()
-            env['GIT_EDITOR'] = 'true'
+            process = self._popen(command_list, extra_env, stdin=input_text is not None, binary=exact)
             
-            process = subprocess.run(
-                command_list,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                cwd=self.repo_path,
-                check=False,
-                env=env,
-                timeout=Config.COMMAND_TIMEOUT
-            )
+            if handle is not None and not handle.attach(process):
+                process.communicate()
+                return "", "命令已取消", -1
+            
+            data = input_text
+            if exact and data is not None:
+                data = data.encode('utf-8', 'surrogateescape')
+            try:
+                stdout, stderr = process.communicate(input=data, timeout=Config.COMMAND_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                kill_process_tree(process, force=True)
+                process.communicate()
+                return "", f"Git 命令执行超时（{Config.COMMAND_TIMEOUT}秒）", -1
+            
+            if exact:
+                stdout = stdout.decode('utf-8', 'surrogateescape')
+                stderr = stderr.decode('utf-8', 'replace')
             
-            # 清理输出 - 保留空行和状态码格式
-            stdout_clean = process.stdout
-            stderr_clean = process.stderr
+            if handle is not None and handle.cancelled:
+                return stdout, "命令已取消", -1
             
-            return stdout_clean, stderr_clean, process.returncode
+            return stdout, stderr, process.returncode
             
-        except subprocess.TimeoutExpired:
-            return "", f"Git 命令执行超时（{Config.COMMAND_TIMEOUT}秒）", -1
+        except (FileNotFoundError, NotADirectoryError):
+            # 仓库目录可能在上下文建立后被删除
+            if not os.path.isdir(context.cwd):
+                self.invalidate_launch_context()
+                return "", f"错误：仓库路径 '{self.repo_path}' 无效或不存在。", -1
+            return "", "错误: 'git' 命令未找到。请确保 Git 已安装并在 PATH 中。", -1
+        except Exception as e:
+            return "", f"运行命令时发生错误: {e}", -1
+    
+    def _popen(
+        self,
+        command_list: List[str],
+        extra_env: Optional[Dict[str, str]] = None,
+        stdin: bool = False,
+        binary: bool = False,
+        merge_stderr: bool = False
+    ) -> subprocess.Popen:
+        """通过启动上下文启动 Git 进程（网络命令附加 SSH 连接复用环境变量）"""
+        env = self.ssh_mux.environment(command_list, self.repo_path, self.run_command_sync)
+        if extra_env:
+            env.update(extra_env)
+        return self.get_launch_context().popen(command_list, env, stdin, binary, merge_stderr)
+    
+    def run_command_streaming(
+        self,
+        command_list: List[str],
+        on_line: Callable[[str], None],
+        handle: Optional[CommandHandle] = None,
+        extra_env: Optional[Dict[str, str]] = None,
+        input_text: Optional[str] = None
+    ) -> Tuple[str, str, int]:
+        """
+        执行命令并逐行回调输出（stderr 合并到 stdout）
+        
+        用于钩子等耗时较长且需要实时显示输出的命令：不受 COMMAND_TIMEOUT 限制，
+        可通过句柄取消。
+        
+        Returns:
+            (合并后的输出, 错误信息, returncode) 元组
+        """
+        context = self.get_launch_context()
+        if not context.valid:
+            return "", f"错误：仓库路径 '{self.repo_path}' 无效或不存在。", -1
+        
+        try:
+            process = self._popen(command_list, extra_env, stdin=input_text is not None, merge_stderr=True)
         except FileNotFoundError:
             return "", "错误: 'git' 命令未找到。请确保 Git 已安装并在 PATH 中。", -1
         except Exception as e:
             return "", f"运行命令时发生错误: {e}", -1
+        
+        if handle is not None and not handle.attach(process):
+            process.communicate()
+            return "", "命令已取消", -1
+        
+        if input_text is not None:
+            try:
+                process.stdin.write(input_text)
+                process.stdin.close()
+            except OSError:
+                pass  # 命令提前退出
+        
+        lines: List[str] = []
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            lines.append(line)
+            on_line(line)
+        process.stdout.close()
+        process.wait()
+        
+        output = "\n".join(lines)
+        if handle is not None and handle.cancelled:
+            return output, "命令已取消", -1
+        return output, "", process.returncode
+    
+    def open_stream(
+        self,
+        command_list: List[str],
+        command_type: str = "流式命令",
+        extra_env: Optional[Dict[str, str]] = None
+    ) -> CommandStream:
+        """
+        以流式方式执行命令，迭代返回的对象可逐行读取输出
+        
+        命令注册为后台句柄（不占用忙碌状态、不受 COMMAND_TIMEOUT 限制），
+        可通过 stream.cancel() 或状态栏取消。
+        """
+        with self._busy_lock:
+            handle = CommandHandle(
+                next(self._command_ids), command_list, command_type,
+                on_finish=self._release_command, background=True
+            )
+            self._commands[handle.id] = handle
+        repo_path = self.repo_path
+        
+        def popen_factory():
+            if not self.get_launch_context().valid:
+                raise OSError(f"仓库路径 '{repo_path}' 无效或不存在")
+            return self._popen(command_list, extra_env)
+        
+        return CommandStream(popen_factory, handle)
     
     def run_command_async(
         self,
         command_list: List[str],
         callback: Optional[Callable] = None,
         command_type: str = "Git命令"
-    ) -> bool:
+    ) -> Optional[CommandHandle]:
         """
         异步执行 Git 命令
         
@@ -161,45 +397,175 @@ class GitCore:
             command_type: 命令类型描述
             
         Returns:
-            是否成功启动命令
+            成功启动时返回命令句柄（可调用 cancel/terminate），忙碌时返回 None
         """
         # 使用锁确保原子操作
         with self._busy_lock:
             if self._is_busy:
-                return False
+                return None
+            handle = CommandHandle(
+                next(self._command_ids), command_list, command_type,
+                on_finish=self._release_command
+            )
+            self._is_busy = True
+            self._busy_owner = handle.id
+            self._commands[handle.id] = handle
+        
+        def execute():
+            try:
+                stdout, stderr, returncode = self.run_command_sync(command_list, handle)
+                if handle.cancelled:
+                    self.result_queue.put((command_type, False, "", "命令已取消", callback))
+                else:
+                    self.result_queue.put((command_type, returncode == 0, stdout, stderr, callback))
+            except Exception as e:
+                self.result_queue.put((command_type, False, "", str(e), callback))
+            finally:
+                handle.finish()
+        
+        thread = threading.Thread(target=execute, daemon=True)
+        thread.start()
+        return handle
+    
+    def run_task_async(
+        self,
+        task: Callable[[CommandHandle], Tuple[bool, str, str]],
+        callback: Optional[Callable] = None,
+        command_type: str = "Git任务"
+    ) -> Optional[CommandHandle]:
+        """
+        异步执行由多条命令组成的任务（整体占用一次忙碌状态）
+        
+        Args:
+            task: 任务函数 task(handle) -> (success, stdout, stderr)，
+                  其中的命令应通过 run_command_sync(..., handle) 执行以便取消
+            callback: 完成回调函数 callback(success, stdout, stderr)
+            command_type: 任务描述
+            
+        Returns:
+            成功启动时返回命令句柄，忙碌时返回 None
+        """
+        with self._busy_lock:
+            if self._is_busy:
+                return None
+            handle = CommandHandle(
+                next(self._command_ids), [], command_type,
+                on_finish=self._release_command
+            )
             self._is_busy = True
+            self._busy_owner = handle.id
+            self._commands[handle.id] = handle
         
         def execute():
             try:
-                stdout, stderr, returncode = self.run_command_sync(command_list)
-                success = returncode == 0
-                self.result_queue.put((command_type, success, stdout, stderr, callback))
+                success, stdout, stderr = task(handle)
+                if handle.cancelled:
+                    self.result_queue.put((command_type, False, stdout, "命令已取消", callback))
+                else:
+                    self.result_queue.put((command_type, success, stdout, stderr, callback))
             except Exception as e:
                 self.result_queue.put((command_type, False, "", str(e), callback))
             finally:
-                with self._busy_lock:
-                    self._is_busy = False
+                handle.finish()
         
         thread = threading.Thread(target=execute, daemon=True)
         thread.start()
+        return handle
+    
+    def run_command_tracked(
+        self,
+        command_list: List[str],
+        command_type: str,
+        extra_env: Optional[Dict[str, str]] = None
+    ) -> Tuple[str, str, int]:
+        """
+        同步执行后台命令，并注册句柄以便在状态栏显示和取消
+        
+        与 run_command_async 不同，后台命令不占用忙碌状态。
+        
+        Returns:
+            (stdout, stderr, returncode) 元组
+        """
+        with self._busy_lock:
+            handle = CommandHandle(
+                next(self._command_ids), command_list, command_type,
+                on_finish=self._release_command, background=True
+            )
+            self._commands[handle.id] = handle
+        try:
+            return self.run_command_sync(command_list, handle, extra_env)
+        finally:
+            handle.finish()
+    
+    def _release_command(self, handle: CommandHandle):
+        """命令结束或被取消时移除句柄，并释放其持有的忙碌状态"""
+        with self._busy_lock:
+            self._commands.pop(handle.id, None)
+            if self._busy_owner == handle.id:
+                self._busy_owner = None
+                self._is_busy = False
+    
+    def get_command(self, command_id: int) -> Optional[CommandHandle]:
+        """按 id 获取正在执行的命令句柄"""
+        with self._busy_lock:
+            return self._commands.get(command_id)
+    
+    def active_commands(self) -> List[CommandHandle]:
+        """获取所有正在执行的命令句柄（按启动顺序）"""
+        with self._busy_lock:
+            return sorted(self._commands.values(), key=lambda h: h.id)
+    
+    def cancel_command(self, command_id: int, force: bool = False) -> bool:
+        """取消指定 id 的命令"""
+        handle = self.get_command(command_id)
+        if handle is None:
+            return False
+        handle.cancel(force=force)
         return True
     
+    def cancel_all(self, force: bool = False) -> int:
+        """取消所有正在执行的命令，返回取消数量"""
+        handles = self.active_commands()
+        for handle in handles:
+            handle.cancel(force=force)
+        return len(handles)
+    
     # ==================== Git 操作方法 ====================
     
-    def get_status(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    def get_status_snapshot(
+        self,
+        paths: Optional[List[str]] = None,
+        optional_locks: bool = True,
+        ignore_submodules: Optional[str] = None,
+        untracked: bool = True
+    ) -> StatusSnapshot:
         """
-        获取仓库状态
+        获取仓库状态快照
+        
+        Args:
+            paths: 仅查询这些路径（字面路径，不作通配）；None 表示整个工作区
+            optional_locks: 为 False 时不获取可选锁（后台刷新使用，避免与前台命令争用 index.lock）
+            ignore_submodules: 传给 --ignore-submodules 的策略；None 使用 git 默认行为
+            untracked: 是否列出未跟踪文件
         
         Returns:
-            (unstaged_files, staged_files) 元组
-            每个文件是 (status_code, filepath) 元组
+            StatusSnapshot 紧凑状态模型（路径只保存一次，状态码存于数组）
         """
-        unstaged = []
-        staged = []
+        snapshot = StatusSnapshot()
+        self.invalidate_diffs(paths)
+        self.file_classifier.invalidate(paths)
         
-        stdout, _, returncode = self.run_command_sync(['git', 'status', '--porcelain=v1'])
+        command = ['git', 'status', '--porcelain=v1']
+        if ignore_submodules:
+            command.append(f'--ignore-submodules={ignore_submodules}')
+        if not untracked:
+            command.append('--untracked-files=no')
+        if paths is not None:
+            command = command[:1] + ['--literal-pathspecs'] + command[1:] + ['--'] + list(paths)
+        extra_env = None if optional_locks else {'GIT_OPTIONAL_LOCKS': '0'}
+        stdout, _, returncode = self.run_command_sync(command, extra_env=extra_env)
         if returncode != 0 or not stdout:
-            return unstaged, staged
+            return snapshot
         
         for line in stdout.split('\n'):
             if not line:
@@ -207,33 +573,148 @@ class GitCore:
             
             # Git porcelain format: XY filename
             # X = staged status, Y = working tree status
-            status_code = line[:2]
-            filepath = line[3:]  # 不用 strip()，保留原始路径
-            
-            # 解析文件路径（处理转义等）
-            filepath = self.parse_git_path(filepath)
-            
-            staged_char = status_code[0]
-            unstaged_char = status_code[1]
-            
-            # 已暂存（第一个字符不是空格且不是问号）
-            if staged_char != ' ' and staged_char != '?':
-                staged.append((status_code, filepath))
-            
-            # 未暂存（第二个字符不是空格，或者是未跟踪文件）
-            if unstaged_char != ' ' or status_code == '??':
-                unstaged.append((status_code, filepath))
+            # 解析文件路径（处理转义等），不用 strip()，保留原始路径
+            snapshot.add(line[:2], self.parse_git_path(line[3:]))
         
-        return unstaged, staged
+        return snapshot
+    
+    def refresh_status_paths(
+        self,
+        snapshot: StatusSnapshot,
+        paths: List[str]
+    ) -> Optional[StatusSnapshot]:
+        """
+        仅针对受影响路径重新查询状态，并合并到已有快照
+        
+        Returns:
+            合并后的新快照；路径过多或涉及重命名等无法安全局部刷新时返回 None
+        """
+        if not paths or len(paths) > Config.PARTIAL_REFRESH_MAX_PATHS:
+            return None
+        if snapshot.has_rename_or_copy(paths):
+            return None
+        partial = self.get_status_snapshot(paths)
+        if partial.has_rename_or_copy(paths):
+            return None
+        return snapshot.merge(partial, paths)
+    
+    def get_file_diff(self, path: str, staged: bool = False) -> Tuple[bool, str]:
+        """
+        获取单个文件的差异（未暂存：索引→工作区；已暂存：HEAD→索引），按仓库和路径缓存
+        
+        输出逐字节保留（含 \r），以便据此构建的补丁可以原样应用。
+        大文件和 LFS 文件不运行 git diff（避免读取整个文件或运行过滤器），返回只含说明的二进制差异。
+        """
+        key = (self.repo_path, path, staged)
+        cached = self._diff_cache.get(key)
+        if cached is not None:
+            return True, cached
+        
+        info = self.file_classifier.classify([path]).get(path)
+        if info is not None and info.is_heavy:
+            stub = (
+                f"diff --git a/{path} b/{path}\n"
+                f"Binary files a/{path} and b/{path} differ\n"
+                f"# 已跳过差异: {info.describe()}\n"
+            )
+            return True, stub
+        
+        command = ['git', 'diff', '--no-color', '--no-ext-diff']
+        if staged:
+            command.append('--cached')
+        command.extend(['--', path])
+        stdout, stderr, returncode = self.run_command_sync(command, exact=True)
+        if returncode != 0:
+            return False, stderr or stdout
+        self._diff_cache.put(key, stdout)
+        return True, stdout
+    
+    def invalidate_diffs(self, paths: Optional[List[str]] = None):
+        """使文件差异缓存失效（paths 为 None 时清空当前仓库的全部条目）"""
+        repo_path = self.repo_path
+        if paths is None:
+            self._diff_cache.invalidate_where(lambda key: key[0] == repo_path)
+        else:
+            affected = set(paths)
+            self._diff_cache.invalidate_where(lambda key: key[0] == repo_path and key[1] in affected)
+    
+    def apply_patch(
+        self,
+        patch: str,
+        reverse: bool = False,
+        handle: Optional[CommandHandle] = None
+    ) -> Tuple[bool, str, str]:
+        """
+        通过标准输入把补丁应用到索引（不写临时文件）
+        
+        Args:
+            patch: 补丁文本（由 patch.build_patch 生成）
+            reverse: 反向应用，用于取消暂存
+        
+        Returns:
+            (success, stdout, stderr) 元组，可直接作为 run_task_async 的任务结果
+        """
+        command = ['git', 'apply', '--cached', '--recount', '--whitespace=nowarn']
+        if reverse:
+            command.append('--reverse')
+        command.append('-')
+        stdout, stderr, returncode = self.run_command_sync(command, handle, input_text=patch, exact=True)
+        return returncode == 0, stdout, stderr
+    
+    def write_index_tree(self, handle: Optional[CommandHandle] = None) -> Optional[str]:
+        """
+        把当前索引写为树对象（git write-tree）
+        
+        缓存树有效时几乎不需要计算；索引中有未合并条目时返回 None。
+        """
+        stdout, _, returncode = self.run_command_sync(['git', 'write-tree'], handle)
+        tree = stdout.strip()
+        return tree if returncode == 0 and tree else None
+    
+    def restore_index_tree(self, tree: str, handle: Optional[CommandHandle] = None) -> Tuple[bool, str, str]:
+        """
+        用树对象替换整个索引（不改动工作区）
+        
+        --reset 与 -m 相同会保留内容未变条目的 stat 信息（之后的 status 不必重新哈希），
+        但会丢弃未合并条目而不是失败。
+        
+        Returns:
+            (success, stdout, stderr) 元组，可直接作为 run_task_async 的任务结果
+        """
+        stdout, stderr, returncode = self.run_command_sync(['git', 'read-tree', '--reset', tree], handle)
+        return returncode == 0, stdout, stderr
+    
+    def get_status(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        获取仓库状态
+        
+        Returns:
+            (unstaged_files, staged_files) 元组
+            每个文件是 (status_code, filepath) 元组
+        """
+        return self.get_status_snapshot().to_lists()
+    
+    def list_worktrees(self) -> List[WorktreeInfo]:
+        """枚举主工作树及所有链接工作树"""
+        stdout, _, returncode = self.run_command_sync(['git', 'worktree', 'list', '--porcelain', '-z'])
+        if returncode != 0:
+            return []
+        return parse_worktree_list(stdout)
+    
+    def get_head_oid(self) -> Optional[str]:
+        """获取 HEAD 指向的提交 oid（无提交时返回 None）"""
+        return self.get_backend().head_oid()
+    
+    def get_git_dir(self) -> Optional[str]:
+        """获取当前工作树的 Git 目录（绝对路径；链接工作树返回各自的目录）"""
+        stdout, _, returncode = self.run_command_sync(['git', 'rev-parse', '--absolute-git-dir'])
+        if returncode == 0 and stdout.strip():
+            return stdout.strip()
+        return None
     
     def get_current_branch(self) -> str:
         """获取当前分支名"""
-        stdout, _, returncode = self.run_command_sync(
-            ['git', 'rev-parse', '--abbrev-ref', 'HEAD']
-        )
-        if returncode == 0 and stdout:
-            return stdout.strip()
-        return "未知"
+        return self.get_backend().current_branch()
     
     def get_all_branches(self) -> Tuple[str, List[str], List[str]]:
         """
@@ -242,70 +723,32 @@ class GitCore:
         Returns:
             (current_branch, local_branches, remote_branches) 元组
         """
-        stdout, _, returncode = self.run_command_sync(
-            ['git', 'branch', '-a', '--no-color']
-        )
-        
-        if returncode != 0:
-            return "未知", [], []
-        
-        current_branch = None
-        local_branches = []
-        remote_branches = []
-        
-        for line in stdout.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            is_current = line.startswith('*')
-            branch_name = line.replace('*', '').strip()
-            
-            # 跳过特殊引用
-            if 'HEAD detached' in branch_name or ' -> ' in branch_name:
-                if is_current:
-                    current_branch = branch_name
-                continue
-            
-            if branch_name.startswith('remotes/'):
-                parts = branch_name.split('/', 2)
-                if len(parts) == 3:
-                    display_name = f"{parts[1]}/{parts[2]}"
-                    remote_branches.append(display_name)
-            else:
-                local_branches.append(branch_name)
-                if is_current:
-                    current_branch = branch_name
-        
-        if current_branch is None and local_branches:
-            current_branch = local_branches[0]
+        return self.get_backend().branches()
+    
+    def get_ref_digest(self) -> str:
+        """
+        计算所有引用 (refname, oid) 的摘要
         
-        return current_branch or "未知", local_branches, remote_branches
+        用于判断抓取后引用是否真正发生变化，失败时返回空字符串。
+        """
+        return self.get_backend().ref_digest()
     
     def get_remotes(self) -> List[str]:
         """获取所有远程仓库"""
-        stdout, _, returncode = self.run_command_sync(['git', 'remote'])
-        if returncode != 0 or not stdout:
-            return []
-        return [r.strip() for r in stdout.split('\n') if r.strip()]
+        return self.get_backend().remotes()
     
     def get_remote_url(self, remote_name: str) -> Optional[str]:
         """获取远程仓库 URL"""
-        stdout, _, returncode = self.run_command_sync(
-            ['git', 'remote', 'get-url', remote_name]
-        )
-        if returncode == 0 and stdout:
-            return stdout.strip()
-        return None
+        return self.get_backend().remote_url(remote_name)
     
     def stage_files(self, files: List[str]) -> Tuple[bool, str]:
-        """暂存文件"""
+        """暂存文件（受影响路径即 files，可用于 refresh_status_paths）"""
         command = ['git', 'add', '--'] + files
         stdout, stderr, returncode = self.run_command_sync(command)
         return returncode == 0, stderr or stdout
     
     def unstage_files(self, files: List[str]) -> Tuple[bool, str]:
-        """取消暂存文件"""
+        """取消暂存文件（受影响路径即 files，可用于 refresh_status_paths）"""
         command = ['git', 'reset', 'HEAD', '--'] + files
         stdout, stderr, returncode = self.run_command_sync(command)
         return returncode == 0, stderr or stdout
@@ -317,16 +760,312 @@ class GitCore:
         )
         return returncode == 0, stderr or stdout
     
+    def push(self, remote: Optional[str] = None) -> Tuple[bool, str]:
+        """推送到远程仓库（remote 为空时推送到默认远程）"""
+        command = ['git', 'push'] + ([remote] if remote else [])
+        stdout, stderr, returncode = self.run_command_sync(command)
+        return returncode == 0, stderr or stdout
+    
+    def pull(self) -> Tuple[bool, str]:
+        """拉取更改"""
+        stdout, stderr, returncode = self.run_command_sync(['git', 'pull'])
+        return returncode == 0, stderr or stdout
+    
+    def fetch(self, remote: Optional[str] = None) -> Tuple[bool, str]:
+        """抓取远程更新（remote 为空时抓取所有远程）"""
+        command = ['git', 'fetch', '--prune'] + ([remote] if remote else ['--all'])
+        stdout, stderr, returncode = self.run_command_sync(command)
+        return returncode == 0, stderr or stdout
+    
+    def switch_branch(self, name: str) -> Tuple[bool, str]:
+        """切换分支"""
+        stdout, stderr, returncode = self.run_command_sync(['git', 'checkout', name])
+        return returncode == 0, stderr or stdout
+    
+    def create_branch(self, name: str) -> Tuple[bool, str]:
+        """创建并切换到新分支"""
+        stdout, stderr, returncode = self.run_command_sync(['git', 'checkout', '-b', name])
+        return returncode == 0, stderr or stdout
+    
+    # ==================== 储藏 (Stash) ====================
+    
+    def list_stashes(self) -> List[Tuple[str, str, int, str]]:
+        """
+        列出所有储藏
+        
+        Returns:
+            [(引用如 stash@{0}, 提交 oid, 时间戳, 说明), ...]
+        """
+        return self.get_backend().stashes()
+    
+    def read_object(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        """读取对象 (类型, 内容)，不存在时返回 None"""
+        return self.get_backend().read_object(oid)
+    
+    def get_stash_diff(self, oid: str) -> Tuple[bool, str]:
+        """按需读取储藏内容（储藏提交不可变，按 oid 缓存）"""
+        cached = self._stash_diff_cache.get(oid)
+        if cached is not None:
+            return True, cached
+        
+        stdout, stderr, returncode = self.run_command_sync(
+            ['git', 'stash', 'show', '--stat', '-p', oid]
+        )
+        if returncode != 0:
+            return False, stderr or stdout
+        self._stash_diff_cache.put(oid, stdout)
+        return True, stdout
+    
+    def stash_switch_pop(
+        self, name: str, handle: Optional[CommandHandle] = None
+    ) -> Tuple[bool, str, str]:
+        """
+        储藏更改、切换分支、恢复储藏（在同一个后台任务中依次执行）
+        
+        切换失败时恢复储藏并返回；恢复时冲突则保留储藏供手动处理。
+        stash pop --index 无法恢复暂存状态（未产生冲突）时改用不带 --index 的 pop，
+        更改全部恢复为未暂存并在输出中说明。
+        
+        Returns:
+            (success, stdout, stderr) 元组，可直接作为 run_task_async 的任务结果
+        """
+        log: List[str] = []
+        
+        def run(command: List[str]) -> Tuple[bool, str]:
+            stdout, stderr, returncode = self.run_command_sync(command, handle)
+            output = (stdout + stderr).strip()
+            if output:
+                log.append(output)
+            return returncode == 0, output
+        
+        def pop() -> Tuple[bool, str]:
+            ok, output = run(['git', 'stash', 'pop', '--index'])
+            if ok:
+                return True, output
+            unmerged = self.run_command_sync(['git', 'ls-files', '-u'], handle)[0].strip()
+            if unmerged:
+                return False, output
+            # 工作区未被改动：只是暂存状态无法恢复，退回普通 pop
+            ok, output = run(['git', 'stash', 'pop'])
+            if ok:
+                log.append("注意: 无法恢复储藏中的暂存状态（stash pop --index 失败），更改已全部恢复为未暂存。")
+            return ok, output
+        
+        before = self.run_command_sync(['git', 'rev-parse', '-q', '--verify', 'refs/stash'], handle)[0].strip()
+        ok, output = run(['git', 'stash', 'push', '--include-untracked', '-m', f"切换到 {name} 前自动储藏"])
+        if not ok:
+            return False, "", f"储藏失败: {output}"
+        after = self.run_command_sync(['git', 'rev-parse', '-q', '--verify', 'refs/stash'], handle)[0].strip()
+        stashed = bool(after) and after != before
+        
+        ok, output = run(['git', 'checkout', name])
+        if not ok:
+            if stashed and not pop()[0]:
+                return False, "\n".join(log), f"切换失败，恢复储藏时出现冲突，储藏已保留: {output}"
+            return False, "\n".join(log), f"切换失败，已恢复储藏: {output}"
+        
+        if stashed:
+            ok, output = pop()
+            if not ok:
+                return False, "\n".join(log), f"已切换到 {name}，但恢复储藏时出现冲突，储藏已保留: {output}"
+        return True, "\n".join(log), ""
+    
+    # ==================== 合并冲突 ====================
+    
+    def list_conflicts(self) -> List[ConflictEntry]:
+        """列出所有未合并的路径及其各阶段"""
+        stdout, _, returncode = self.run_command_sync(['git', 'ls-files', '-u', '-z'])
+        if returncode != 0:
+            return []
+        return parse_unmerged(stdout)
+    
+    def resolve_conflicts(
+        self, entries: List[ConflictEntry], side: str, handle: Optional[CommandHandle] = None
+    ) -> Tuple[bool, str, str]:
+        """
+        把一批冲突路径整体解决为我方 (ours) 或对方 (theirs) 的版本
+        
+        选中一方存在的路径用一次 checkout --ours/--theirs 和一次 add 处理，
+        该方已删除的路径用一次 rm 处理；路径经标准输入以 NUL 分隔传入，不受命令行长度限制。
+        执行前重新读取未合并条目，只处理仍处于冲突状态的路径：对已解决的路径执行
+        checkout --ours/--theirs 不会报错，而是用索引内容覆盖工作区文件。
+        
+        Returns:
+            (success, stdout, stderr) 元组，可直接作为 run_task_async 的任务结果
+        """
+        stdout, stderr, returncode = self.run_command_sync(['git', 'ls-files', '-u', '-z'], handle)
+        if returncode != 0:
+            return False, "", f"读取冲突列表失败: {stderr}"
+        current = {entry.path: entry for entry in parse_unmerged(stdout)}
+        skipped = [entry.path for entry in entries if entry.path not in current]
+        entries = [current[entry.path] for entry in entries if entry.path in current]
+        if not entries:
+            return False, "", f"所选的 {len(skipped)} 个路径已不再处于冲突状态，未做任何更改，请刷新冲突列表"
+        
+        stage = STAGE_OURS if side == 'ours' else STAGE_THEIRS
+        keep = [entry.path for entry in entries if stage in entry.stages]
+        remove = [entry.path for entry in entries if stage not in entry.stages]
+        pathspec = ['--pathspec-from-file=-', '--pathspec-file-nul']
+        steps = []
+        if keep:
+            steps.append((['git', '--literal-pathspecs', 'checkout', f'--{side}'] + pathspec, keep))
+            steps.append((['git', '--literal-pathspecs', 'add'] + pathspec, keep))
+        if remove:
+            steps.append((['git', '--literal-pathspecs', 'rm', '-q'] + pathspec, remove))
+        
+        log: List[str] = []
+        for command, paths in steps:
+            stdout, stderr, returncode = self.run_command_sync(command, handle, input_text='\0'.join(paths))
+            if stdout.strip():
+                log.append(stdout.strip())
+            if returncode != 0:
+                return False, "\n".join(log), stderr or stdout
+        
+        log.append(f"已将 {len(entries)} 个冲突路径解决为{'我方' if side == 'ours' else '对方'}版本"
+                   + (f"（其中 {len(remove)} 个按删除处理）" if remove else ""))
+        if skipped:
+            log.append(f"已跳过 {len(skipped)} 个不再处于冲突状态的路径: " + ", ".join(skipped))
+        return True, "\n".join(log), ""
+    
+    # ==================== 仓库维护 ====================
+    
+    def time_queries(self, handle: Optional[CommandHandle] = None) -> Dict[str, float]:
+        """
+        测量常用查询的耗时（毫秒）
+        
+        每项执行 MAINTENANCE_PROBE_RUNS 次取最短耗时（首次执行受文件系统缓存影响）；
+        执行失败的查询不计入。
+        """
+        timings: Dict[str, float] = {}
+        for name, command in PROBE_QUERIES:
+            best = None
+            for _ in range(max(1, Config.MAINTENANCE_PROBE_RUNS)):
+                started = time.perf_counter()
+                _, _, returncode = self.run_command_sync(command, handle)
+                elapsed = (time.perf_counter() - started) * 1000
+                if returncode != 0:
+                    best = None
+                    break
+                best = elapsed if best is None else min(best, elapsed)
+            if best is not None:
+                timings[name] = best
+        return timings
+    
+    def probe_health(self, handle: Optional[CommandHandle] = None) -> Optional[RepositoryHealth]:
+        """
+        仓库体检：对象与索引布局、相关配置、常用查询耗时
+        
+        Returns:
+            RepositoryHealth，不是有效仓库时返回 None
+        """
+        stdout, _, returncode = self.run_command_sync(
+            ['git', 'rev-parse', '--absolute-git-dir', '--git-path', 'objects', '--git-path', 'index'], handle
+        )
+        paths = stdout.splitlines()
+        if returncode != 0 or len(paths) != 3:
+            return None
+        git_dir, objects_dir, index_path = (os.path.join(self.repo_path, path) for path in paths)
+        
+        version, _, _ = self.run_command_sync(['git', 'version'], handle)
+        health = RepositoryHealth(git_dir, os.path.normpath(objects_dir), parse_git_version(version))
+        
+        stdout, _, returncode = self.run_command_sync(['git', 'count-objects', '-v'], handle)
+        if returncode == 0:
+            counts = parse_count_objects(stdout)
+            health.loose_objects = counts.get('count', 0)
+            health.loose_kb = counts.get('size', 0)
+            health.packs = counts.get('packs', 0)
+            health.pack_kb = counts.get('size-pack', 0)
+            health.garbage = counts.get('garbage', 0)
+        health.inspect_layout()
+        health.index_version, health.index_entries = read_index_header(index_path)
+        
+        stdout, _, returncode = self.run_command_sync(
+            ['git', 'config', '-z', '--get-regexp', r'^core\.(fsmonitor|untrackedcache|commitgraph)$'], handle
+        )
+        if returncode == 0:
+            for record in stdout.split('\0'):
+                key, _, value = record.partition('\n')
+                if key:
+                    health.config[key.lower()] = value
+        
+        health.has_commits = self.get_head_oid() is not None
+        health.timings = self.time_queries(handle)
+        return health
+    
+    def run_maintenance(
+        self,
+        tasks: List[MaintenanceTask],
+        handle: Optional[CommandHandle] = None,
+        on_line: Optional[Callable[[str], None]] = None
+    ) -> Tuple[bool, str, str]:
+        """
+        依次执行维护任务，并对比执行前后常用查询的耗时
+        
+        维护命令可能耗时较长，以流式方式执行（不受 COMMAND_TIMEOUT 限制，可通过句柄取消）。
+        
+        Returns:
+            (success, stdout, stderr) 元组，可直接作为 run_task_async 的任务结果；
+            stdout 末尾为耗时对比
+        """
+        emit = on_line or (lambda line: None)
+        log: List[str] = []
+        before = self.time_queries(handle)
+        
+        failed = []
+        for task in tasks:
+            log.append(f"== {task.title} ==")
+            emit(log[-1])
+            for command in task.commands:
+                output, error, returncode = self.run_command_streaming(command, emit, handle)
+                if output:
+                    log.append(output)
+                if returncode != 0:
+                    failed.append(f"{task.title}: {error or output or ' '.join(command)}")
+                    break
+            if handle is not None and handle.cancelled:
+                return False, "\n".join(log), "命令已取消"
+        
+        # 配置可能已变化（core.fsmonitor 等）
+        self.invalidate_launch_context()
+        after = self.time_queries(handle)
+        log.append("耗时对比（维护前 -> 维护后）:")
+        log.extend(f"  {line}" for line in format_comparison(before, after))
+        return not failed, "\n".join(log), "\n".join(failed)
+    
     def has_staged_changes(self) -> bool:
         """检查是否有已暂存的更改"""
         _, _, returncode = self.run_command_sync(['git', 'diff', '--cached', '--quiet'])
         return returncode != 0
     
     def has_uncommitted_changes(self) -> bool:
-        """检查是否有未提交的更改"""
-        _, _, wc_dirty = self.run_command_sync(['git', 'diff', '--quiet'])
+        """
+        检查是否有未提交的更改（不读取大文件和 LFS 文件的内容，不写入索引）
+        
+        diff-files 只比较 stat 信息，只被 touch 过、内容未变的文件也会列出；
+        对这些候选路径中的普通文件再用 git diff --quiet 比较内容（只散列 stat 变化的文件），
+        大文件、LFS 文件或候选路径过多时不读取内容，按"可能有更改"处理，由调用方向用户确认。
+        索引一侧只比较对象 ID。
+        """
         _, _, idx_dirty = self.run_command_sync(['git', 'diff', '--cached', '--quiet'])
-        return wc_dirty != 0 or idx_dirty != 0
+        if idx_dirty != 0:
+            return True
+        stdout, _, returncode = self.run_command_sync(['git', 'diff-files', '--name-only', '-z'])
+        if returncode != 0:
+            return True
+        candidates = [path for path in stdout.split('\0') if path]
+        if not candidates:
+            return False
+        if len(candidates) > Config.PARTIAL_REFRESH_MAX_PATHS:
+            return True
+        infos = self.file_classifier.classify(candidates)
+        if any(info.is_heavy for info in infos.values()):
+            return True
+        _, _, wc_dirty = self.run_command_sync(
+            ['git', '--literal-pathspecs', 'diff', '--quiet', '--'] + candidates,
+            extra_env={'GIT_OPTIONAL_LOCKS': '0'}
+        )
+        return wc_dirty != 0
     
     def configure_quotepath(self):
         """配置 Git 正确显示中文文件名"""
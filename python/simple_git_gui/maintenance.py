@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+仓库维护建议模块
+检查仓库布局（松散对象、包文件、提交图、多包索引、索引大小、fsmonitor 等配置），
+给出 git maintenance 维护任务建议，并对比维护前后常用查询的耗时
+"""
+
+import os
+import struct
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import Config
+
+
+# 体检时计时的常用查询（名称, 命令）
+PROBE_QUERIES: Tuple[Tuple[str, List[str]], ...] = (
+    # 工作区扫描：受未跟踪文件缓存、fsmonitor、索引大小影响
+    ('status', ['git', 'status', '--porcelain']),
+    # 拓扑排序需要遍历全部历史：有提交图时可借助世代号提前结束
+    ('log', ['git', 'log', '--topo-order', '--oneline', '-n', '100']),
+)
+
+# git maintenance run --task 的最低版本
+MAINTENANCE_MIN_VERSION = (2, 29)
+# 内置 fsmonitor 守护进程的最低版本（仅 Windows / macOS）
+FSMONITOR_MIN_VERSION = (2, 37)
+
+
+def parse_git_version(output: str) -> Tuple[int, ...]:
+    """解析 git version 输出（如 "git version 2.39.5.windows.1"），失败时返回 (0,)"""
+    numbers = []
+    for part in output.strip().rpartition(' ')[2].split('.'):
+        if not part.isdigit():
+            break
+        numbers.append(int(part))
+    return tuple(numbers) or (0,)
+
+
+def parse_count_objects(output: str) -> Dict[str, int]:
+    """解析 git count-objects -v 输出（"键: 值" 每行一项，大小以 KiB 为单位）"""
+    result = {}
+    for line in output.splitlines():
+        key, _, value = line.partition(':')
+        value = value.strip()
+        if value.isdigit():
+            result[key.strip()] = int(value)
+    return result
+
+
+def read_index_header(path: str) -> Tuple[int, int]:
+    """读取索引文件头 (版本, 条目数)，不读取条目本身；无法读取时返回 (0, 0)"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return 0, 0
+    if len(header) < 12 or header[:4] != b'DIRC':
+        return 0, 0
+    return struct.unpack('>II', header[4:])
+
+
+class RepositoryHealth:
+    """一次体检的结果"""
+
+    __slots__ = (
+        'git_dir', 'objects_dir', 'git_version', 'loose_objects', 'loose_kb', 'packs', 'pack_kb',
+        'garbage', 'commit_graph', 'multi_pack_index', 'index_version', 'index_entries',
+        'config', 'has_commits', 'timings'
+    )
+
+    def __init__(self, git_dir: str, objects_dir: str, git_version: Tuple[int, ...]):
+        self.git_dir = git_dir
+        self.objects_dir = objects_dir
+        self.git_version = git_version
+        self.loose_objects = 0
+        self.loose_kb = 0
+        self.packs = 0
+        self.pack_kb = 0
+        self.garbage = 0  # 对象目录中无法识别的文件数
+        self.commit_graph = False
+        self.multi_pack_index = False
+        self.index_version = 0
+        self.index_entries = 0
+        self.config: Dict[str, str] = {}  # 相关配置（键为小写）
+        self.has_commits = False
+        self.timings: Dict[str, float] = {}  # 查询名 -> 毫秒
+
+    def inspect_layout(self):
+        """检查对象目录中的提交图和多包索引文件"""
+        info = os.path.join(self.objects_dir, 'info')
+        self.commit_graph = (
+            os.path.isfile(os.path.join(info, 'commit-graph'))
+            or os.path.isfile(os.path.join(info, 'commit-graphs', 'commit-graph-chain'))
+        )
+        self.multi_pack_index = os.path.isfile(os.path.join(self.objects_dir, 'pack', 'multi-pack-index'))
+
+    def config_enabled(self, key: str) -> bool:
+        """配置项是否为开启（fsmonitor 也可以是钩子路径）"""
+        value = self.config.get(key)
+        return value is not None and value.lower() not in ('false', 'no', 'off', '0', '')
+
+    def describe(self) -> List[str]:
+        """体检结果文本（每项一行）"""
+        fsmonitor = self.config.get('core.fsmonitor')
+        untracked = self.config.get('core.untrackedcache')
+        lines = [
+            f"Git 版本: {'.'.join(map(str, self.git_version))}",
+            f"松散对象: {self.loose_objects} 个，{self.loose_kb / 1024:.1f} MB",
+            f"包文件: {self.packs} 个，{self.pack_kb / 1024:.1f} MB"
+            + (f"（无法识别的文件 {self.garbage} 个）" if self.garbage else ""),
+            f"提交图 (commit-graph): {'有' if self.commit_graph else '无'}"
+            + ("（core.commitGraph 已关闭）" if self.config.get('core.commitgraph', '').lower() == 'false' else ""),
+            f"多包索引 (multi-pack-index): {'有' if self.multi_pack_index else '无'}",
+            f"索引: {self.index_entries} 个条目（版本 {self.index_version}）",
+            f"core.fsmonitor: {fsmonitor if fsmonitor is not None else '未设置'}",
+            f"core.untrackedCache: {untracked if untracked is not None else '未设置'}",
+        ]
+        lines.extend(f"{name}: {ms:.1f} ms" for name, ms in self.timings.items())
+        return lines
+
+
+class MaintenanceTask:
+    """一项维护建议"""
+
+    __slots__ = ('key', 'title', 'reason', 'commands')
+
+    def __init__(self, key: str, title: str, reason: str, commands: List[List[str]]):
+        self.key = key
+        self.title = title
+        self.reason = reason
+        self.commands = commands
+
+    def label(self) -> str:
+        """列表显示文本"""
+        return f"{self.title} —— {self.reason}"
+
+
+def _maintenance_command(health: RepositoryHealth, task: str, legacy: List[str]) -> List[str]:
+    """git maintenance run --task=<task>；旧版本 git 改用等效的单独命令"""
+    if health.git_version >= MAINTENANCE_MIN_VERSION:
+        return ['git', 'maintenance', 'run', f'--task={task}']
+    return legacy
+
+
+def recommend(health: RepositoryHealth) -> List[MaintenanceTask]:
+    """根据体检结果给出维护建议（按建议执行的顺序排列）"""
+    tasks: List[MaintenanceTask] = []
+
+    if health.loose_objects >= Config.MAINTENANCE_LOOSE_OBJECTS:
+        tasks.append(MaintenanceTask(
+            'loose-objects', "打包松散对象",
+            f"有 {health.loose_objects} 个松散对象，每次读取都要单独打开文件",
+            # 该任务先清理已打包的松散对象再打包，随后执行 prune-packed 使本次打包的对象立即清理
+            [_maintenance_command(health, 'loose-objects', ['git', 'repack', '-d']), ['git', 'prune-packed']]
+        ))
+
+    if health.packs >= Config.MAINTENANCE_PACK_COUNT and not health.multi_pack_index:
+        tasks.append(MaintenanceTask(
+            'incremental-repack', "增量重新打包（多包索引）",
+            f"有 {health.packs} 个包文件且没有多包索引，查找对象要逐个搜索包索引",
+            [_maintenance_command(health, 'incremental-repack', ['git', 'multi-pack-index', 'write'])]
+        ))
+
+    if health.has_commits and not health.commit_graph:
+        tasks.append(MaintenanceTask(
+            'commit-graph', "写入提交图",
+            "没有提交图，log / 合并基准等历史查询需要逐个解析提交对象",
+            [_maintenance_command(health, 'commit-graph', ['git', 'commit-graph', 'write', '--reachable'])]
+        ))
+
+    large_index = health.index_entries >= Config.MAINTENANCE_INDEX_ENTRIES
+    if large_index and not health.config_enabled('core.untrackedcache'):
+        tasks.append(MaintenanceTask(
+            'untracked-cache', "启用未跟踪文件缓存",
+            f"索引有 {health.index_entries} 个条目，status 每次都要重新扫描未跟踪文件",
+            [['git', 'config', 'core.untrackedCache', 'true'], ['git', 'update-index', '--untracked-cache']]
+        ))
+
+    if (large_index and not health.config_enabled('core.fsmonitor')
+            and sys.platform in ('win32', 'darwin') and health.git_version >= FSMONITOR_MIN_VERSION):
+        tasks.append(MaintenanceTask(
+            'fsmonitor', "启用内置文件系统监视 (fsmonitor)",
+            f"索引有 {health.index_entries} 个条目，status 每次都要检查全部文件的修改时间",
+            [['git', 'config', 'core.fsmonitor', 'true']]
+        ))
+
+    return tasks
+
+
+def format_comparison(before: Dict[str, float], after: Dict[str, float]) -> List[str]:
+    """维护前后查询耗时对比（每项一行）"""
+    lines = []
+    for name, old in before.items():
+        new = after.get(name)
+        if new is None:
+            lines.append(f"{name}: {old:.1f} ms -> 失败")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        lines.append(f"{name}: {old:.1f} ms -> {new:.1f} ms（{change:+.1f}%）")
+    return lines
+
+
+def select_tasks(tasks: Sequence[MaintenanceTask], keys: Optional[Sequence[str]]) -> List[MaintenanceTask]:
+    """按键筛选建议（keys 为 None 时全部执行）"""
+    if keys is None:
+        return list(tasks)
+    wanted = set(keys)
+    return [task for task in tasks if task.key in wanted]
@@ -0,0 +1,913 @@
+# -*- coding: utf-8 -*-
+"""
+进程内只读后端
+直接读取 Git 目录中的引用、packed-refs、配置和对象（松散对象，以及通过内存映射的包索引查找的打包对象），
+不启动 git 进程；无法保证与 git 命令结果一致时抛出 BackendUnsupported，由路由器交给子进程后端
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .backends import BackendUnsupported, GitBackend, digest_refs
+from .cache import LRUCache
+from .commands import LaunchContext
+from .config import Config
+from .reflog import parse_reflog_line
+
+
+# 设置后 git 的仓库发现、对象或引用位置与默认不同，进程内后端整体停用
+UNSUPPORTED_ENVIRONMENT = (
+    'GIT_DIR', 'GIT_WORK_TREE', 'GIT_COMMON_DIR', 'GIT_OBJECT_DIRECTORY',
+    'GIT_ALTERNATE_OBJECT_DIRECTORIES', 'GIT_NAMESPACE', 'GIT_REPLACE_REF_BASE', 'GIT_CONFIG',
+)
+
+# 可以处理的仓库扩展（其他扩展可能改变存储格式）
+KNOWN_EXTENSIONS = ('objectformat', 'worktreeconfig', 'partialclone', 'preciousobjects', 'noop', 'refstorage')
+
+# 每个工作树独立的引用（链接工作树中保存在其自身的 Git 目录下）
+PER_WORKTREE_PREFIXES = ('refs/bisect/', 'refs/worktree/', 'refs/rewritten/')
+
+# 打包对象类型
+OBJ_COMMIT, OBJ_TREE, OBJ_BLOB, OBJ_TAG, OBJ_OFS_DELTA, OBJ_REF_DELTA = 1, 2, 3, 4, 6, 7
+TYPE_NAMES = {OBJ_COMMIT: 'commit', OBJ_TREE: 'tree', OBJ_BLOB: 'blob', OBJ_TAG: 'tag'}
+
+# Windows 上被映射的文件无法删除，每次查询后释放映射，避免妨碍 git gc / repack
+KEEP_MAPS = os.name != 'nt'
+
+SYMREF_PREFIX = 'ref: '
+MAX_SYMREF_DEPTH = 5
+
+
+# ==================== 配置文件 ====================
+
+def _skip_line(text: str, pos: int) -> int:
+    end = text.find('\n', pos)
+    return len(text) if end < 0 else end + 1
+
+
+def _parse_section(text: str, pos: int) -> Tuple[str, int]:
+    """解析 [section] / [section "subsection"] / [section.subsection]，返回 (节名, 位置)"""
+    length = len(text)
+    start = pos
+    while pos < length and (text[pos].isalnum() or text[pos] in '-.'):
+        pos += 1
+    name = text[start:pos].lower()
+    if pos < length and text[pos] == ']':
+        # 旧式 [section.subsection] 的子节也不区分大小写
+        return name, pos + 1
+    while pos < length and text[pos] in ' \t':
+        pos += 1
+    if pos >= length or text[pos] != '"':
+        raise ValueError("无法识别的节")
+    pos += 1
+    subsection = []
+    while pos < length and text[pos] != '"':
+        if text[pos] == '\n':
+            raise ValueError("子节未结束")
+        if text[pos] == '\\' and pos + 1 < length:
+            pos += 1
+        subsection.append(text[pos])
+        pos += 1
+    if not text.startswith('"]', pos):
+        raise ValueError("子节未结束")
+    return f"{name}.{''.join(subsection)}", pos + 2
+
+
+def _parse_value(text: str, pos: int) -> Tuple[str, int]:
+    """解析变量值（引号、转义、续行和行尾注释的处理与 git 相同）"""
+    length = len(text)
+    while pos < length and text[pos] in ' \t':
+        pos += 1
+    out = []
+    quoted = False
+    spaces = 0
+    while pos < length:
+        c = text[pos]
+        pos += 1
+        if c == '\n':
+            if quoted:
+                raise ValueError("引号未结束")
+            break
+        if not quoted and c in ';#':
+            pos = _skip_line(text, pos)
+            break
+        if not quoted and c in ' \t\r\f\v':
+            if out:
+                spaces += 1
+            continue
+        if spaces:
+            out.append(' ' * spaces)
+            spaces = 0
+        if c == '\\':
+            if pos >= length:
+                raise ValueError("转义不完整")
+            escaped = text[pos]
+            pos += 1
+            if escaped == '\n':
+                continue
+            if escaped == '\r' and text.startswith('\n', pos):
+                pos += 1
+                continue
+            mapped = {'t': '\t', 'b': '\b', 'n': '\n', '\\': '\\', '"': '"'}.get(escaped)
+            if mapped is None:
+                raise ValueError("无效的转义")
+            out.append(mapped)
+            continue
+        if c == '"':
+            quoted = not quoted
+            continue
+        out.append(c)
+    return ''.join(out), pos
+
+
+def parse_config(text: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    解析 git 配置文件
+
+    Returns:
+        [(键, 值), ...]，键的节名和变量名为小写、子节保持原样，与 git config --list 相同；
+        没有 = 的布尔变量值为 None
+
+    Raises:
+        ValueError: 语法无法识别
+    """
+    entries = []
+    section = None
+    pos, length = 0, len(text)
+    while pos < length:
+        c = text[pos]
+        if c in ' \t\r\n':
+            pos += 1
+            continue
+        if c in '#;':
+            pos = _skip_line(text, pos)
+            continue
+        if c == '[':
+            section, pos = _parse_section(text, pos + 1)
+            continue
+        if section is None or not (c.isascii() and c.isalpha()):
+            raise ValueError("无法识别的变量")
+        start = pos
+        while pos < length and text[pos].isascii() and (text[pos].isalnum() or text[pos] == '-'):
+            pos += 1
+        name = text[start:pos].lower()
+        while pos < length and text[pos] in ' \t':
+            pos += 1
+        if pos < length and text[pos] == '=':
+            value, pos = _parse_value(text, pos + 1)
+        elif pos >= length or text[pos] in '\r\n#;':
+            value = None
+        else:
+            raise ValueError("无法识别的变量")
+        entries.append((f"{section}.{name}", value))
+    return entries
+
+
+def _global_config_stamp() -> Tuple:
+    """常见全局配置文件的 stat 信息（变化时重新读取进程外配置）"""
+    home = os.path.expanduser('~')
+    xdg = os.environ.get('XDG_CONFIG_HOME') or os.path.join(home, '.config')
+    stamp = []
+    for path in (os.path.join(home, '.gitconfig'), os.path.join(xdg, 'git', 'config')):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+_outer_config_lock = threading.Lock()
+_outer_config: Optional[Tuple[Tuple, Optional[List[Tuple[str, Optional[str]]]]]] = None
+
+
+def outer_config() -> Optional[List[Tuple[str, Optional[str]]]]:
+    """
+    仓库之外的配置（系统、全局、命令行环境变量），已展开 include
+
+    系统配置的位置取决于 git 的安装方式，因此由 git 自己列出：在不存在的 GIT_DIR 下执行一次
+    git config --list，结果按全局配置文件的 stat 缓存。失败时返回 None（依赖配置的查询回退）。
+    """
+    global _outer_config
+    stamp = _global_config_stamp()
+    with _outer_config_lock:
+        if _outer_config is not None and _outer_config[0] == stamp:
+            return _outer_config[1]
+        entries: Optional[List[Tuple[str, Optional[str]]]] = None
+        try:
+            context = LaunchContext(tempfile.gettempdir())
+            process = context.popen(
+                ['git', 'config', '--list', '-z'],
+                extra_env={'GIT_DIR': os.path.join(tempfile.gettempdir(), 'simple-git-gui-no-repository')}
+            )
+            stdout, _ = process.communicate(timeout=Config.COMMAND_TIMEOUT)
+            if process.returncode == 0:
+                entries = []
+                for record in stdout.split('\0'):
+                    if record:
+                        key, separator, value = record.partition('\n')
+                        entries.append((key, value if separator else None))
+        except Exception:
+            entries = None
+        _outer_config = (stamp, entries)
+        return entries
+
+
+def _is_true(value: Optional[str]) -> bool:
+    """按 git 的规则解释布尔值（没有值表示 true）"""
+    return value is None or value.lower() in ('true', 'yes', 'on', '1')
+
+
+# ==================== 对象存储 ====================
+
+def _delta_size(delta: bytes, pos: int) -> Tuple[int, int]:
+    size = shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """应用打包增量（复制 / 插入指令）"""
+    source_size, pos = _delta_size(delta, 0)
+    target_size, pos = _delta_size(delta, pos)
+    if source_size != len(base):
+        raise ValueError("增量的基础对象大小不符")
+    out = bytearray()
+    length = len(delta)
+    while pos < length:
+        command = delta[pos]
+        pos += 1
+        if command & 0x80:
+            offset = size = 0
+            for bit, shift in ((0x01, 0), (0x02, 8), (0x04, 16), (0x08, 24)):
+                if command & bit:
+                    offset |= delta[pos] << shift
+                    pos += 1
+            for bit, shift in ((0x10, 0), (0x20, 8), (0x40, 16)):
+                if command & bit:
+                    size |= delta[pos] << shift
+                    pos += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif command:
+            out += delta[pos:pos + command]
+            pos += command
+        else:
+            raise ValueError("无效的增量指令")
+    if len(out) != target_size:
+        raise ValueError("增量结果大小不符")
+    return bytes(out)
+
+
+def _map_file(path: str) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex:
+    """内存映射的包索引（第 2 版）：按扇出表缩小范围后二分查找对象名"""
+
+    def __init__(self, path: str, raw_size: int):
+        self.path = path
+        self.raw_size = raw_size
+        self._map: Optional[mmap.mmap] = None
+        self._fanout: Tuple[int, ...] = ()
+        self.count = 0
+
+    def _ensure(self) -> mmap.mmap:
+        if self._map is None:
+            mapped = _map_file(self.path)
+            if mapped[:8] != b'\xfftOc\x00\x00\x00\x02':
+                mapped.close()
+                raise BackendUnsupported("不支持的包索引版本")
+            self._fanout = struct.unpack_from('>256I', mapped, 8)
+            self.count = self._fanout[255]
+            self._map = mapped
+        return self._map
+
+    def find(self, raw: bytes) -> Optional[int]:
+        """查找对象在包文件中的偏移"""
+        mapped = self._ensure()
+        size = self.raw_size
+        names = 8 + 256 * 4
+        first = raw[0]
+        low = self._fanout[first - 1] if first else 0
+        high = self._fanout[first]
+        while low < high:
+            middle = (low + high) // 2
+            position = names + middle * size
+            name = mapped[position:position + size]
+            if name < raw:
+                low = middle + 1
+            elif name > raw:
+                high = middle
+            else:
+                small = names + self.count * (size + 4)
+                offset = struct.unpack_from('>I', mapped, small + 4 * middle)[0]
+                if offset & 0x80000000:
+                    large = small + self.count * 4
+                    offset = struct.unpack_from('>Q', mapped, large + 8 * (offset & 0x7fffffff))[0]
+                return offset
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class PackFile:
+    """包文件（内存映射），读取对象并解开增量链"""
+
+    def __init__(self, index_path: str, raw_size: int):
+        self.index = PackIndex(index_path, raw_size)
+        self.path = index_path[:-len('.idx')] + '.pack'
+        self.raw_size = raw_size
+        self._map: Optional[mmap.mmap] = None
+
+    def _ensure(self) -> mmap.mmap:
+        if self._map is None:
+            self._map = _map_file(self.path)
+        return self._map
+
+    def _inflate(self, position: int, size: int) -> bytes:
+        mapped = self._ensure()
+        decompressor = zlib.decompressobj()
+        parts = []
+        chunk = max(size + 64, 512)
+        while not decompressor.eof:
+            data = mapped[position:position + chunk]
+            if not data:
+                raise ValueError("包文件被截断")
+            parts.append(decompressor.decompress(data))
+            position += len(data)
+            chunk = 64 * 1024
+        result = b''.join(parts)
+        if len(result) != size:
+            raise ValueError("对象大小不符")
+        return result
+
+    def read_at(self, offset: int, lookup) -> Tuple[str, bytes]:
+        """
+        读取偏移处的对象
+
+        Args:
+            lookup: lookup(oid) -> (类型, 内容) 或 None，用于 REF_DELTA 的基础对象
+        """
+        mapped = self._ensure()
+        deltas = []
+        while True:
+            byte = mapped[offset]
+            kind = (byte >> 4) & 7
+            size = byte & 0x0f
+            shift = 4
+            position = offset + 1
+            while byte & 0x80:
+                byte = mapped[position]
+                position += 1
+                size |= (byte & 0x7f) << shift
+                shift += 7
+
+            if kind == OBJ_OFS_DELTA:
+                byte = mapped[position]
+                position += 1
+                distance = byte & 0x7f
+                while byte & 0x80:
+                    byte = mapped[position]
+                    position += 1
+                    distance = ((distance + 1) << 7) | (byte & 0x7f)
+                deltas.append(self._inflate(position, size))
+                offset -= distance
+                continue
+            if kind == OBJ_REF_DELTA:
+                base_oid = mapped[position:position + self.raw_size].hex()
+                deltas.append(self._inflate(position + self.raw_size, size))
+                base = lookup(base_oid)
+                if base is None:
+                    raise BackendUnsupported("增量的基础对象不存在")
+                type_name, data = base
+                break
+            type_name = TYPE_NAMES.get(kind)
+            if type_name is None:
+                raise ValueError("未知的对象类型")
+            data = self._inflate(position, size)
+            break
+
+        for delta in reversed(deltas):
+            data = apply_delta(data, delta)
+        return type_name, data
+
+    def close(self):
+        self.index.close()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class ObjectStore:
+    """
+    对象存储（只读）
+
+    - 先在各包索引中查找，再查找松散对象；都找不到时若 pack 目录有变化（抓取、重新打包），
+      重新扫描包列表后再查一次
+    - 支持 objects/info/alternates 中的备用对象目录
+    - 对象不可变，按 oid 缓存最近读取的对象
+    """
+
+    def __init__(self, objects_dir: str, hex_size: int):
+        self.raw_size = hex_size // 2
+        self.directories = self._with_alternates(objects_dir)
+        self.cache = LRUCache("进程内对象缓存", Config.NATIVE_OBJECT_CACHE_SIZE)
+        self._packs: Dict[str, PackFile] = {}
+        self._stamp: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _with_alternates(objects_dir: str, depth: int = 0) -> List[str]:
+        directories = [os.path.normpath(objects_dir)]
+        if depth >= 5:
+            return directories
+        try:
+            with open(os.path.join(objects_dir, 'info', 'alternates'), 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return directories
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('"'):
+                raise BackendUnsupported("带引号的备用对象目录")
+            path = line if os.path.isabs(line) else os.path.join(objects_dir, line)
+            for directory in ObjectStore._with_alternates(path, depth + 1):
+                if directory not in directories:
+                    directories.append(directory)
+        return directories
+
+    def _pack_stamp(self) -> Tuple:
+        stamp = []
+        for directory in self.directories:
+            try:
+                stamp.append(os.stat(os.path.join(directory, 'pack')).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _rescan(self) -> bool:
+        """pack 目录变化时重新扫描包列表，返回是否有变化"""
+        stamp = self._pack_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        found = {}
+        for directory in self.directories:
+            pack_dir = os.path.join(directory, 'pack')
+            try:
+                names = sorted(os.listdir(pack_dir))
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith('.idx'):
+                    continue
+                path = os.path.join(pack_dir, name)
+                if not os.path.exists(path[:-len('.idx')] + '.pack'):
+                    continue
+                found[path] = self._packs.get(path) or PackFile(path, self.raw_size)
+        for path, pack in self._packs.items():
+            if path not in found:
+                pack.close()
+        self._packs = found
+        return True
+
+    def _read_loose(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        for directory in self.directories:
+            path = os.path.join(directory, oid[:2], oid[2:])
+            try:
+                with open(path, 'rb') as f:
+                    data = zlib.decompress(f.read())
+            except FileNotFoundError:
+                continue
+            header, _, body = data.partition(b'\0')
+            type_name, _, size = header.decode('ascii').partition(' ')
+            if int(size) != len(body):
+                raise ValueError("松散对象大小不符")
+            return type_name, body
+        return None
+
+    def _read_packed(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        raw = bytes.fromhex(oid)
+        for pack in self._packs.values():
+            offset = pack.index.find(raw)
+            if offset is not None:
+                return pack.read_at(offset, self._read_unlocked)
+        return None
+
+    def _read_unlocked(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        cached = self.cache.get(oid)
+        if cached is not None:
+            return cached
+        if self._stamp is None:
+            self._rescan()
+        result = self._read_packed(oid) or self._read_loose(oid)
+        if result is None and self._rescan():
+            result = self._read_packed(oid)
+        if result is not None:
+            self.cache.put(oid, result)
+        return result
+
+    def read(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        """读取对象 (类型, 内容)，不存在时返回 None"""
+        if len(oid) != self.raw_size * 2:
+            return None
+        with self._lock:
+            try:
+                return self._read_unlocked(oid)
+            except (OSError, ValueError, IndexError, struct.error, zlib.error) as e:
+                raise BackendUnsupported(f"读取对象失败: {e}")
+            finally:
+                if not KEEP_MAPS:
+                    self._close_maps()
+
+    def _close_maps(self):
+        for pack in self._packs.values():
+            pack.close()
+
+    def close(self):
+        with self._lock:
+            self._close_maps()
+
+
+# ==================== 后端 ====================
+
+def discover_git_dirs(worktree: str) -> Optional[Tuple[str, str]]:
+    """
+    由工作树根目录找到 (Git 目录, 公共目录)
+
+    链接工作树和子模块的 .git 是指向实际目录的文件，链接工作树的公共目录由 commondir 文件给出。
+    """
+    entry = os.path.join(worktree, '.git')
+    if os.path.isdir(entry):
+        git_dir = entry
+    elif os.path.isfile(entry):
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+        except OSError:
+            return None
+        if not content.startswith('gitdir:'):
+            return None
+        git_dir = os.path.join(worktree, content[len('gitdir:'):].strip())
+    else:
+        return None
+    git_dir = os.path.normpath(git_dir)
+    common_dir = git_dir
+    try:
+        with open(os.path.join(git_dir, 'commondir'), 'r', encoding='utf-8') as f:
+            common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        pass
+    return git_dir, common_dir
+
+
+def _stat_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class NativeBackend(GitBackend):
+    """
+    进程内只读后端
+
+    - 引用：松散引用文件优先于 packed-refs（按文件 stat 缓存解析结果），符号引用最多解析 5 层
+    - 配置：解析仓库配置；系统 / 全局配置由 outer_config 一次性获取。有 include、
+      url.*.insteadOf、branch.sort 或旧式 remotes/branches 目录等会改变结果的设置时回退
+    - 对象：见 ObjectStore
+    - 分离 HEAD 时的分支列表（git 显示 "HEAD detached at <缩写>"）、有歧义的分支简称等交给 git
+    """
+
+    name = "进程内"
+
+    def __init__(self, worktree: str):
+        self.worktree = worktree
+        if any(os.environ.get(name) for name in UNSUPPORTED_ENVIRONMENT):
+            self.dirs = None
+        else:
+            self.dirs = discover_git_dirs(worktree)
+        self._packed: Tuple[Optional[Tuple], Dict[str, str]] = (None, {})
+        self._config: Tuple[Optional[Tuple], List[Tuple[str, Optional[str]]]] = (None, [])
+        self._store: Optional[ObjectStore] = None
+        self._hex_size: Optional[int] = None  # 对象名的十六进制长度（SHA-1 为 40，SHA-256 为 64）
+        self._lock = threading.Lock()
+
+    # ---------- 基础 ----------
+
+    def _require(self) -> Tuple[str, str]:
+        if self.dirs is None:
+            raise BackendUnsupported("不是可直接读取的仓库")
+        return self.dirs
+
+    def _local_config(self) -> List[Tuple[str, Optional[str]]]:
+        """仓库配置（按文件 stat 缓存）"""
+        git_dir, common_dir = self._require()
+        path = os.path.join(common_dir, 'config')
+        stamp = _stat_stamp(path)
+        with self._lock:
+            if self._config[0] == stamp and stamp is not None:
+                return self._config[1]
+        try:
+            with open(path, 'rb') as f:
+                entries = parse_config(f.read().decode('utf-8', 'surrogateescape'))
+        except (OSError, ValueError):
+            raise BackendUnsupported("无法解析仓库配置")
+        values = dict(entries)
+        version = values.get('core.repositoryformatversion', '0')
+        extensions = [key[len('extensions.'):] for key, _ in entries if key.startswith('extensions.')]
+        if version not in ('0', '1') or any(name not in KNOWN_EXTENSIONS for name in extensions):
+            raise BackendUnsupported("不支持的仓库格式")
+        if values.get('extensions.refstorage', 'files') != 'files':
+            raise BackendUnsupported("不支持的引用存储格式")
+        if any(key.startswith(('include.', 'includeif.')) for key, _ in entries):
+            raise BackendUnsupported("仓库配置包含 include")
+        worktree_config = os.path.join(git_dir, 'config.worktree')
+        if _is_true(values.get('extensions.worktreeconfig', 'false')) and os.path.exists(worktree_config):
+            raise BackendUnsupported("使用了工作树独立配置")
+        with self._lock:
+            self._config = (stamp, entries)
+            self._hex_size = 64 if values.get('extensions.objectformat') == 'sha256' else 40
+        return entries
+
+    def _all_config(self) -> List[Tuple[str, Optional[str]]]:
+        """系统、全局、仓库配置（与 git 的读取顺序相同）"""
+        outer = outer_config()
+        if outer is None:
+            raise BackendUnsupported("无法读取全局配置")
+        return outer + self._local_config()
+
+    def _valid_oid(self, value: str) -> bool:
+        if self._hex_size is None:
+            self._local_config()
+        return len(value) == self._hex_size and all(c in '0123456789abcdef' for c in value)
+
+    # ---------- 引用 ----------
+
+    def _ref_dir(self, name: str) -> str:
+        """引用文件所在的目录（HEAD 等伪引用和每个工作树独立的引用在 Git 目录下）"""
+        git_dir, common_dir = self._require()
+        if not name.startswith('refs/') or name.startswith(PER_WORKTREE_PREFIXES):
+            return git_dir
+        return common_dir
+
+    def _packed_refs(self) -> Dict[str, str]:
+        """packed-refs 中的引用（按文件 stat 缓存）"""
+        _, common_dir = self._require()
+        path = os.path.join(common_dir, 'packed-refs')
+        stamp = _stat_stamp(path)
+        with self._lock:
+            if self._packed[0] == stamp:
+                return self._packed[1]
+        refs: Dict[str, str] = {}
+        if stamp is not None:
+            try:
+                with open(path, 'rb') as f:
+                    lines = f.read().decode('utf-8', 'surrogateescape').splitlines()
+            except OSError:
+                raise BackendUnsupported("无法读取 packed-refs")
+            for line in lines:
+                if not line or line[0] in '#^':
+                    continue
+                oid, _, name = line.partition(' ')
+                if not name:
+                    raise BackendUnsupported("无法解析 packed-refs")
+                refs[name] = oid
+        with self._lock:
+            self._packed = (stamp, refs)
+        return refs
+
+    def _read_loose(self, path: str) -> Optional[str]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8', 'surrogateescape').strip()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+        except OSError:
+            raise BackendUnsupported("无法读取引用")
+
+    def _raw_ref(self, name: str) -> Optional[str]:
+        """单个引用的原始内容（oid 或 "ref: 目标"），不存在时返回 None"""
+        content = self._read_loose(os.path.join(self._ref_dir(name), *name.split('/')))
+        if content is not None:
+            return content
+        return self._packed_refs().get(name)
+
+    def _resolve(self, name: str, lookup=None) -> Optional[str]:
+        """解析引用为 oid（符号引用逐层解析），不存在或损坏时返回 None"""
+        raw_ref = lookup or self._raw_ref
+        for _ in range(MAX_SYMREF_DEPTH):
+            content = raw_ref(name)
+            if content is None:
+                return None
+            if content.startswith(SYMREF_PREFIX):
+                name = content[len(SYMREF_PREFIX):].strip()
+                continue
+            return content if self._valid_oid(content) else None
+        return None
+
+    def _head(self) -> Tuple[Optional[str], Optional[str]]:
+        """(HEAD 指向的分支引用, 提交 oid)；分离 HEAD 时分支为 None，未出生分支时 oid 为 None"""
+        content = self._raw_ref('HEAD')
+        if content is None:
+            raise BackendUnsupported("无法读取 HEAD")
+        if content.startswith(SYMREF_PREFIX):
+            target = content[len(SYMREF_PREFIX):].strip()
+            return target, self._resolve(target)
+        if not self._valid_oid(content):
+            raise BackendUnsupported("无法解析 HEAD")
+        return None, content
+
+    def _loose_refs(self, base: str, include=None, exclude=None) -> Dict[str, str]:
+        refs = {}
+        root = os.path.join(base, 'refs')
+        for directory, _, files in os.walk(root):
+            relative = os.path.relpath(directory, base).replace(os.sep, '/')
+            for filename in files:
+                if filename.endswith('.lock'):
+                    continue
+                name = f"{relative}/{filename}"
+                if include and not name.startswith(include):
+                    continue
+                if exclude and name.startswith(exclude):
+                    continue
+                content = self._read_loose(os.path.join(directory, filename))
+                if content is not None:
+                    refs[name] = content
+        return refs
+
+    def _all_refs(self) -> Dict[str, str]:
+        """refs/ 下的所有引用 -> 原始内容（松散引用覆盖 packed-refs）"""
+        git_dir, common_dir = self._require()
+        linked = git_dir != common_dir
+        refs = dict(self._packed_refs())
+        if linked:
+            refs = {name: oid for name, oid in refs.items() if not name.startswith(PER_WORKTREE_PREFIXES)}
+        refs.update(self._loose_refs(common_dir, exclude=PER_WORKTREE_PREFIXES if linked else None))
+        if linked:
+            refs.update(self._loose_refs(git_dir, include=PER_WORKTREE_PREFIXES))
+        return refs
+
+    # ---------- 查询 ----------
+
+    def head_oid(self) -> Optional[str]:
+        return self._head()[1]
+
+    def current_branch(self) -> str:
+        target, oid = self._head()
+        if target is None:
+            return "HEAD"
+        if oid is None:
+            # 未出生的分支：rev-parse 失败
+            return "未知"
+        if not target.startswith('refs/heads/'):
+            raise BackendUnsupported("HEAD 指向非分支引用")
+        short = target[len('refs/heads/'):]
+        git_dir, common_dir = self._require()
+        # rev-parse --abbrev-ref 在简称有歧义时输出 heads/<name>
+        candidates = (f"refs/{short}", f"refs/tags/{short}", f"refs/remotes/{short}", f"refs/remotes/{short}/HEAD")
+        if (
+            os.path.exists(os.path.join(git_dir, short)) or os.path.exists(os.path.join(common_dir, short))
+            or any(self._raw_ref(name) is not None for name in candidates)
+        ):
+            raise BackendUnsupported("分支简称有歧义")
+        return short
+
+    def branches(self) -> Tuple[str, List[str], List[str]]:
+        target, _ = self._head()
+        if target is None or not target.startswith('refs/heads/'):
+            raise BackendUnsupported("分离 HEAD")
+        if any(key == 'branch.sort' for key, _ in self._all_config()):
+            raise BackendUnsupported("自定义了分支排序")
+        refs = self._all_refs()
+
+        def is_branch(name):
+            content = refs[name]
+            return not content.startswith(SYMREF_PREFIX) and self._valid_oid(content)
+
+        names = sorted(refs)
+        local = [name[len('refs/heads/'):] for name in names if name.startswith('refs/heads/') and is_branch(name)]
+        remote = [
+            name[len('refs/remotes/'):] for name in names
+            if name.startswith('refs/remotes/') and '/' in name[len('refs/remotes/'):] and is_branch(name)
+        ]
+        current = target[len('refs/heads/'):]
+        if current not in local:
+            current = local[0] if local else "未知"
+        return current, local, remote
+
+    def ref_digest(self) -> str:
+        refs = self._all_refs()
+        lines = []
+        for name in sorted(refs):
+            oid = self._resolve(name, refs.get)
+            if oid is not None:
+                lines.append(f"{oid} {name}\n")
+        return digest_refs(''.join(lines))
+
+    def _remote_config(self) -> List[Tuple[str, Optional[str]]]:
+        entries = self._all_config()
+        if any(key.startswith('url.') for key, _ in entries):
+            raise BackendUnsupported("配置了 URL 改写")
+        _, common_dir = self._require()
+        for legacy in ('remotes', 'branches'):
+            try:
+                if os.listdir(os.path.join(common_dir, legacy)):
+                    raise BackendUnsupported("使用了旧式远程定义")
+            except OSError:
+                pass
+        return entries
+
+    def remotes(self) -> List[str]:
+        names = set()
+        for key, _ in self._remote_config():
+            if key.startswith('remote.'):
+                subsection, _, variable = key[len('remote.'):].rpartition('.')
+                if subsection and variable:
+                    names.add(subsection)
+        return sorted(names)
+
+    def remote_url(self, name: str) -> Optional[str]:
+        prefix = f"remote.{name}."
+        entries = self._remote_config()
+        if not any(key.startswith(prefix) for key, _ in entries):
+            return None
+        urls = [value for key, value in entries if key == prefix + 'url']
+        if not urls or not all(urls):
+            raise BackendUnsupported("远程没有配置 URL")
+        return urls[0]
+
+    def _object_store(self) -> ObjectStore:
+        _, common_dir = self._require()
+        if self._hex_size is None:
+            self._local_config()
+        with self._lock:
+            if self._store is None:
+                self._store = ObjectStore(os.path.join(common_dir, 'objects'), self._hex_size)
+            return self._store
+
+    def read_object(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        # 替换引用会改变 git cat-file 的结果
+        _, common_dir = self._require()
+        if os.path.isdir(os.path.join(common_dir, 'refs', 'replace')) or any(
+            name.startswith('refs/replace/') for name in self._packed_refs()
+        ):
+            raise BackendUnsupported("存在替换引用")
+        result = self._object_store().read(oid)
+        if result is None:
+            # 部分克隆等情况下对象可能需要由 git 按需获取
+            raise BackendUnsupported("对象不存在")
+        return result
+
+    def stashes(self) -> List[Tuple[str, str, int, str]]:
+        if self._resolve('refs/stash') is None:
+            return []
+        _, common_dir = self._require()
+        try:
+            with open(os.path.join(common_dir, 'logs', 'refs', 'stash'), 'rb') as f:
+                lines = f.read().split(b'\n')
+        except OSError:
+            raise BackendUnsupported("无法读取储藏日志")
+        entries = [parse_reflog_line(number, line) for number, line in enumerate(lines) if line]
+        if any(entry is None for entry in entries):
+            raise BackendUnsupported("无法解析储藏日志")
+
+        stashes = []
+        for position, entry in enumerate(reversed(entries)):
+            _, body = self.read_object(entry.new_oid)
+            stashes.append((f"stash@{{{position}}}", entry.new_oid, _committer_time(body), entry.message))
+        return stashes
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+
+
+def _committer_time(commit: bytes) -> int:
+    """提交对象头部 committer 行中的时间戳"""
+    for line in commit.split(b'\n'):
+        if not line:
+            break
+        if line.startswith(b'committer '):
+            fields = line.rsplit(b' ', 2)
+            if len(fields) == 3 and fields[1].isdigit():
+                return int(fields[1])
+    raise BackendUnsupported("无法解析提交时间")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+补丁模块
+解析单个文件的统一差异，并按选中的区块或行在内存中构建补丁（用于部分暂存/取消暂存）
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$')
+
+
+class Hunk:
+    """差异区块"""
+
+    __slots__ = ('old_start', 'old_count', 'new_start', 'new_count', 'section', 'lines', 'first_line')
+
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int, section: str):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.section = section  # @@ 之后的函数名等上下文
+        self.lines: List[str] = []  # 带 ' ' / '+' / '-' / '\\' 前缀的原始行
+        self.first_line = 0  # 区块头在整个差异文本中的行号（0 起）
+
+    def change_lines(self) -> List[int]:
+        """获取增删行在 lines 中的下标"""
+        return [i for i, line in enumerate(self.lines) if line[:1] in ('+', '-')]
+
+
+class FileDiff:
+    """单个文件的差异：文件头 + 区块列表"""
+
+    __slots__ = ('header', 'hunks', 'lines')
+
+    def __init__(self, text: str):
+        self.header: List[str] = []
+        self.hunks: List[Hunk] = []
+        # 保留原始行（含 \r），用于显示和行号映射
+        self.lines: List[str] = text.split('\n')
+        if self.lines and self.lines[-1] == '':
+            self.lines.pop()
+        self._parse()
+
+    def _parse(self):
+        current: Optional[Hunk] = None
+        for number, line in enumerate(self.lines):
+            match = _HUNK_HEADER.match(line)
+            if match:
+                old_start, old_count, new_start, new_count, section = match.groups()
+                current = Hunk(
+                    int(old_start), 1 if old_count is None else int(old_count),
+                    int(new_start), 1 if new_count is None else int(new_count),
+                    section
+                )
+                current.first_line = number
+                self.hunks.append(current)
+            elif current is None:
+                self.header.append(line)
+            else:
+                current.lines.append(line)
+
+    @property
+    def is_binary(self) -> bool:
+        return any(line.startswith(('Binary files ', 'GIT binary patch')) for line in self.header)
+
+    @property
+    def is_whole_file_only(self) -> bool:
+        """新建、删除或二进制文件只能整体暂存"""
+        return self.is_binary or any(
+            line.startswith(('new file mode', 'deleted file mode')) for line in self.header
+        )
+
+    def locate(self, line_number: int) -> Optional[Tuple[int, int]]:
+        """
+        将差异文本中的行号（0 起）映射为 (区块下标, 区块内行下标)
+
+        区块头映射为 (区块下标, -1)，文件头返回 None。
+        """
+        for index, hunk in enumerate(self.hunks):
+            if hunk.first_line <= line_number <= hunk.first_line + len(hunk.lines):
+                return index, line_number - hunk.first_line - 1
+        return None
+
+    def selection_for_lines(self, first: int, last: int, whole_hunks: bool) -> Dict[int, Optional[Set[int]]]:
+        """
+        根据差异文本中选中的行范围（0 起，含两端）生成选择
+
+        Returns:
+            区块下标 -> None（整个区块）或选中的区块内行下标集合
+        """
+        selection: Dict[int, Optional[Set[int]]] = {}
+        for number in range(first, last + 1):
+            located = self.locate(number)
+            if located is None:
+                continue
+            index, offset = located
+            if whole_hunks or offset < 0:
+                selection[index] = None
+            elif selection.get(index, set()) is not None:
+                selection.setdefault(index, set()).add(offset)
+        return selection
+
+
+def _build_hunk(hunk: Hunk, selected: Optional[Set[int]], reverse: bool) -> Tuple[List[str], int, int]:
+    """
+    构建单个区块的补丁行
+
+    未选中的行：正向应用时 '-' 行变为上下文、'+' 行丢弃；
+    反向应用（取消暂存）时 '+' 行变为上下文、'-' 行丢弃。
+
+    Returns:
+        (补丁行, 旧侧行数, 新侧行数)；没有选中任何增删行时补丁行为空
+    """
+    keep_as_context = '+' if reverse else '-'
+    out: List[str] = []
+    old_count = new_count = 0
+    has_change = False
+    previous_kept = True
+    for i, line in enumerate(hunk.lines):
+        tag = line[:1]
+        if tag == '\\':
+            # "\ No newline at end of file" 跟随上一行
+            if previous_kept:
+                out.append(line)
+            continue
+        if tag == ' ' or tag == '':
+            out.append(line if tag else ' ')
+            old_count += 1
+            new_count += 1
+            previous_kept = True
+        elif selected is None or i in selected:
+            out.append(line)
+            has_change = True
+            if tag == '-':
+                old_count += 1
+            else:
+                new_count += 1
+            previous_kept = True
+        elif tag == keep_as_context:
+            out.append(' ' + line[1:])
+            old_count += 1
+            new_count += 1
+            previous_kept = True
+        else:
+            previous_kept = False
+    if not has_change:
+        return [], 0, 0
+    return out, old_count, new_count
+
+
+def build_patch(diff: FileDiff, selection: Dict[int, Optional[Set[int]]], reverse: bool = False) -> str:
+    """
+    按选择构建补丁文本（多个区块合并为一个补丁，一次 git apply 完成）
+
+    Args:
+        diff: 文件差异（正向为 索引→工作区，反向为 HEAD→索引）
+        selection: 区块下标 -> None（整个区块）或选中的区块内行下标集合
+        reverse: 是否用于 git apply -R（取消暂存）
+
+    Returns:
+        补丁文本；没有可应用的更改时返回空字符串
+    """
+    body: List[str] = []
+    delta = 0  # 已包含区块造成的行号偏移（新侧 - 旧侧）
+    for index in sorted(selection):
+        if not 0 <= index < len(diff.hunks):
+            continue
+        hunk = diff.hunks[index]
+        lines, old_count, new_count = _build_hunk(hunk, selection[index], reverse)
+        if not lines:
+            continue
+        # 应用目标（正向为旧侧，反向为新侧）的起始行不变，另一侧按累计偏移推算
+        if reverse:
+            new_start = hunk.new_start
+            old_start = new_start - delta
+        else:
+            old_start = hunk.old_start
+            new_start = old_start + delta
+        delta += new_count - old_count
+        body.append(f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{hunk.section}")
+        body.extend(lines)
+    if not body:
+        return ""
+    return '\n'.join(diff.header + body) + '\n'
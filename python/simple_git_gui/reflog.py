@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+引用日志模块
+直接读取 HEAD 的引用日志文件，从上次读到的位置增量解析新追加的行
+"""
+
+import mmap
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from .config import Config
+
+
+# 统计行数时每次读取的块大小
+COUNT_CHUNK_BYTES = 1024 * 1024
+
+
+class ReflogEntry:
+    """引用日志中的一条记录"""
+
+    __slots__ = ('number', 'old_oid', 'new_oid', 'committer', 'timestamp', 'tz', 'message')
+
+    def __init__(self, number: int, old_oid: str, new_oid: str, committer: str,
+                 timestamp: int, tz: str, message: str):
+        self.number = number  # 在文件中的行号（0 为最早的一条）
+        self.old_oid = old_oid
+        self.new_oid = new_oid
+        self.committer = committer
+        self.timestamp = timestamp
+        self.tz = tz
+        self.message = message
+
+    def selector(self, total: int) -> str:
+        """对应的 HEAD@{n} 写法（total 为文件中的总条目数）"""
+        return f"HEAD@{{{total - 1 - self.number}}}"
+
+    def label(self) -> str:
+        """列表显示文本（不含 HEAD@{n}，新条目追加时已有行无需更新）"""
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(self.timestamp))
+        return f"{self.new_oid[:8]}  {when}  {self.message}"
+
+    def describe(self, total: int) -> str:
+        """详细信息"""
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.timestamp))
+        return (
+            f"{self.selector(total)}\n"
+            f"{self.old_oid[:12]} -> {self.new_oid[:12]}\n"
+            f"{self.committer}  {when} {self.tz}\n"
+            f"{self.message}"
+        )
+
+
+def parse_reflog_line(number: int, line: bytes) -> Optional[ReflogEntry]:
+    """
+    解析一行引用日志
+
+    格式: <旧 oid> <新 oid> <姓名> <<邮箱>> <时间戳> <时区>\\t<说明>
+    """
+    text = line.decode('utf-8', 'replace')
+    header, _, message = text.partition('\t')
+    parts = header.split(' ', 2)
+    if len(parts) < 3:
+        return None
+    old_oid, new_oid, identity = parts
+    person, _, when = identity.rpartition('> ')
+    timestamp, _, tz = when.partition(' ')
+    try:
+        seconds = int(timestamp)
+    except ValueError:
+        seconds = 0
+    name = person.split(' <', 1)[0]
+    return ReflogEntry(number, old_oid, new_oid, name, seconds, tz, message.rstrip('\r'))
+
+
+def _count_lines(buffer, start: int, end: int) -> int:
+    """分块统计换行数（内存映射时不一次复制整个区间）"""
+    count = 0
+    for position in range(start, end, COUNT_CHUNK_BYTES):
+        count += buffer[position:min(position + COUNT_CHUNK_BYTES, end)].count(b'\n')
+    return count
+
+
+class ReflogTail:
+    """
+    引用日志增量读取器
+
+    - 文件大小和修改时间未变化时不读取；变化时只读取上次位置之后新增的完整行
+    - 一次要读取的内容超过 REFLOG_MMAP_BYTES 时使用内存映射，并且只解析最后 window 行，
+      之前的行只计数（用于 HEAD@{n} 编号）
+    - 文件被重写（reflog expire 等通过重命名替换文件）或变短时从头重新读取
+    - 内存中最多保留 window 条
+    """
+
+    def __init__(self, path: str, window: Optional[int] = None):
+        self.path = path
+        self.window = window or Config.REFLOG_WINDOW
+        self.entries: deque = deque(maxlen=self.window)
+        self.total = 0  # 文件中的总条目数
+        self.bytes_read = 0
+        self.mapped_reads = 0
+        self.rewrites = 0
+        self._offset = 0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def poll(self) -> Tuple[List[ReflogEntry], bool]:
+        """
+        读取新增的条目
+
+        Returns:
+            (新增条目（由旧到新）, 是否从头重新读取)；重新读取时调用方应按 entries 整体重绘
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                # 尚无引用日志（新仓库或 core.logAllRefUpdates 关闭）
+                reset = self.total > 0
+                self._reset()
+                return [], reset
+
+            identity = (st.st_dev, st.st_ino)
+            reset = False
+            if identity != self._identity or st.st_size < self._offset:
+                reset = self._identity is not None
+                if reset:
+                    self.rewrites += 1
+                self._reset()
+                self._identity = identity
+            elif (st.st_size, st.st_mtime_ns) == self._stamp:
+                return [], False
+            self._stamp = (st.st_size, st.st_mtime_ns)
+            if st.st_size <= self._offset:
+                return [], reset
+            return self._read(st.st_size), reset
+
+    def _reset(self):
+        self.entries.clear()
+        self.total = 0
+        self._offset = 0
+        self._identity = None
+        self._stamp = None
+
+    def _read(self, size: int) -> List[ReflogEntry]:
+        """读取 [_offset, size) 中的完整行"""
+        length = size - self._offset
+        try:
+            with open(self.path, 'rb') as f:
+                if length >= Config.REFLOG_MMAP_BYTES:
+                    with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                        self.mapped_reads += 1
+                        return self._consume(mapped, self._offset, size, 0)
+                f.seek(self._offset)
+                data = f.read(length)
+        except (OSError, ValueError):
+            return []
+        return self._consume(data, 0, len(data), self._offset)
+
+    def _consume(self, buffer, start: int, end: int, base: int) -> List[ReflogEntry]:
+        """
+        解析 buffer[start:end] 中的完整行（末尾未写完的行留到下次）
+
+        Args:
+            base: buffer 中位置 0 对应的文件偏移
+        """
+        complete = buffer.rfind(b'\n', start, end) + 1
+        if complete <= start:
+            return []
+
+        # 从末尾向前找到最后 window 行的起点，之前的行只计数
+        cut = complete - 1
+        for _ in range(self.window):
+            cut = buffer.rfind(b'\n', start, cut)
+            if cut < 0:
+                break
+        cut = start if cut < start else cut + 1
+        skipped = _count_lines(buffer, start, cut) if cut > start else 0
+
+        number = self.total + skipped
+        entries = []
+        for line in buffer[cut:complete].split(b'\n')[:-1]:
+            entry = parse_reflog_line(number, line)
+            number += 1
+            if entry is not None:
+                entries.append(entry)
+
+        self.total = number
+        self.entries.extend(entries)
+        self.bytes_read += complete - start
+        self._offset = base + complete
+        return entries
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        return (
+            f"引用日志: 共 {self.total} 条，内存中 {len(self.entries)} 条，"
+            f"已读取 {self.bytes_read / 1024:.1f} KB（内存映射 {self.mapped_reads} 次），重新读取 {self.rewrites} 次"
+        )
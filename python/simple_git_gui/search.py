@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+内容搜索模块
+基于 git grep 的流式搜索，支持工作区、暂存区和任意引用
+"""
+
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .config import Config
+
+
+# 搜索范围
+SCOPE_WORKTREE = "工作区"
+SCOPE_INDEX = "暂存区"
+SCOPE_REF = "分支/引用"
+SEARCH_SCOPES = (SCOPE_WORKTREE, SCOPE_INDEX, SCOPE_REF)
+
+
+def build_grep_command(
+    query: str,
+    scope: str = SCOPE_WORKTREE,
+    ref: Optional[str] = None,
+    ignore_case: bool = True,
+    regex: bool = False
+) -> List[str]:
+    """
+    构建 git grep 命令
+
+    -z 使路径和行号以 NUL 分隔（路径不做引号转义），-I 跳过二进制文件。
+    """
+    command = ['git', 'grep', '-z', '-n', '-I', '--no-color']
+    if Config.SEARCH_THREADS:
+        command.append(f'--threads={Config.SEARCH_THREADS}')
+    if ignore_case:
+        command.append('-i')
+    command.append('-E' if regex else '-F')
+    command.extend(['-e', query])
+    if scope == SCOPE_INDEX:
+        command.insert(2, '--cached')
+    elif scope == SCOPE_REF and ref:
+        command.append(ref)
+    command.append('--')
+    return command
+
+
+def parse_grep_line(line: str, ref: Optional[str] = None) -> Optional[Tuple[str, int, str]]:
+    """
+    解析一行 git grep -z -n 输出: <路径>\\0<行号>\\0<内容>
+
+    搜索引用时路径带有 "<引用>:" 前缀，这里会去掉。
+    """
+    parts = line.split('\0', 2)
+    if len(parts) != 3:
+        return None
+    path, number, text = parts
+    if ref and path.startswith(ref + ':'):
+        path = path[len(ref) + 1:]
+    try:
+        return path, int(number), text
+    except ValueError:
+        return None
+
+
+class SearchSession:
+    """
+    一次搜索
+
+    后台线程把事件放入 events 队列，由 UI 定时取出：
+        ('match', path, line_number, text)
+        ('done', match_count, elapsed_ms, truncated)
+        ('error', message)
+    """
+
+    def __init__(self, query: str, scope: str, ref: Optional[str]):
+        self.query = query
+        self.scope = scope
+        self.ref = ref
+        self.events: "queue.Queue" = queue.Queue()
+        self.cancelled = False
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """取消搜索（输入变化或关闭面板时调用）"""
+        with self._lock:
+            self.cancelled = True
+            stream = self._stream
+        if stream is not None:
+            stream.cancel()
+
+    def _attach(self, stream) -> bool:
+        """关联命令流；已取消时立即取消该流并返回 False"""
+        with self._lock:
+            self._stream = stream
+            cancelled = self.cancelled
+        if cancelled:
+            stream.cancel()
+        return not cancelled
+
+
+class SearchService:
+    """搜索服务：同一时间只保留一个搜索，新搜索会取代旧搜索"""
+
+    def __init__(self, git):
+        self.git = git
+        self._session: Optional[SearchSession] = None
+
+    def start(
+        self,
+        query: str,
+        scope: str = SCOPE_WORKTREE,
+        ref: Optional[str] = None,
+        ignore_case: bool = True,
+        regex: bool = False
+    ) -> SearchSession:
+        """启动搜索，自动取消上一次未完成的搜索"""
+        self.cancel()
+        if scope != SCOPE_REF:
+            ref = None
+        session = SearchSession(query, scope, ref)
+        self._session = session
+        command = build_grep_command(query, scope, ref, ignore_case, regex)
+        threading.Thread(target=self._run, args=(session, command), daemon=True).start()
+        return session
+
+    def cancel(self):
+        """取消当前搜索"""
+        if self._session is not None:
+            self._session.cancel()
+            self._session = None
+
+    def _run(self, session: SearchSession, command: List[str]):
+        """后台线程：流式读取匹配，达到上限后终止 git grep"""
+        started = time.perf_counter()
+        events = session.events
+        limit = Config.SEARCH_MAX_RESULTS
+        count = 0
+        truncated = False
+
+        stream = self.git.open_stream(command, f"搜索 {session.query}")
+        if not session._attach(stream):
+            return
+        lines = iter(stream)
+        for line in lines:
+            match = parse_grep_line(line, session.ref)
+            if match is None:
+                continue
+            events.put(('match',) + match)
+            count += 1
+            if count >= limit:
+                truncated = True
+                break
+        # 提前结束时立即终止进程
+        lines.close()
+
+        if session.cancelled:
+            return
+        # 退出码 1 表示没有匹配
+        if not truncated and stream.returncode not in (0, 1):
+            events.put(('error', stream.error.strip() or "搜索失败。"))
+            return
+        events.put(('done', count, (time.perf_counter() - started) * 1000, truncated))
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+SSH 连接复用模块
+通过 GIT_SSH_COMMAND 为网络命令启用 OpenSSH ControlMaster，连续的推送/抓取可跳过握手
+"""
+
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from .config import Config
+
+
+# 可能建立 SSH 连接的 git 子命令
+NETWORK_COMMANDS = frozenset({'push', 'pull', 'fetch', 'ls-remote', 'remote', 'clone', 'submodule'})
+
+# 带参数的 git 全局选项（查找子命令时需要跳过其参数）
+_GLOBAL_OPTIONS_WITH_VALUE = frozenset({'-c', '-C', '--git-dir', '--work-tree', '--namespace'})
+
+
+def git_subcommand(command_list: List[str]) -> Optional[str]:
+    """获取 git 命令的子命令名（跳过全局选项）"""
+    args = iter(command_list[1:])
+    for arg in args:
+        if arg in _GLOBAL_OPTIONS_WITH_VALUE:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return None
+
+
+def is_network_command(command_list: List[str]) -> bool:
+    """判断命令是否可能访问远程仓库"""
+    return git_subcommand(command_list) in NETWORK_COMMANDS
+
+
+class SSHMultiplexer:
+    """
+    SSH 连接复用管理器
+
+    - 控制套接字放在私有运行时目录（权限 0700）中，按 %C（主机、端口、用户的哈希）区分
+    - 空闲 SSH_CONTROL_PERSIST_SECONDS 秒后主连接自动退出
+    - 用户已设置 GIT_SSH / GIT_SSH_COMMAND / core.sshCommand 时不做任何改动
+    - Windows 自带的 OpenSSH 不支持 ControlMaster，不启用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runtime_dir: Optional[str] = None
+        self._ssh_command: Optional[str] = None
+        self._repo_overrides: Dict[str, bool] = {}  # 仓库路径 -> 是否配置了 core.sshCommand
+
+    @property
+    def available(self) -> bool:
+        """当前环境是否可以启用连接复用"""
+        if not Config.SSH_MULTIPLEX_ENABLED or os.name == 'nt':
+            return False
+        return 'GIT_SSH' not in os.environ and 'GIT_SSH_COMMAND' not in os.environ
+
+    def _ensure_runtime_dir(self) -> str:
+        """创建私有运行时目录（首次使用时）"""
+        with self._lock:
+            if self._runtime_dir is None or not os.path.isdir(self._runtime_dir):
+                base = os.environ.get('XDG_RUNTIME_DIR')
+                if not base or not os.path.isdir(base):
+                    base = None
+                # 套接字路径长度有限（约 104 字节），目录名保持简短
+                self._runtime_dir = tempfile.mkdtemp(prefix='sgg-ssh-', dir=base)
+                os.chmod(self._runtime_dir, 0o700)
+                control_path = os.path.join(self._runtime_dir, '%C')
+                self._ssh_command = ' '.join([
+                    'ssh',
+                    '-o', 'ControlMaster=auto',
+                    '-o', shlex.quote(f'ControlPath={control_path}'),
+                    '-o', f'ControlPersist={Config.SSH_CONTROL_PERSIST_SECONDS}',
+                ])
+            return self._runtime_dir
+
+    def _has_repo_override(self, repo_path: str, git_runner) -> bool:
+        """仓库是否配置了 core.sshCommand（每个仓库只检查一次）"""
+        with self._lock:
+            cached = self._repo_overrides.get(repo_path)
+        if cached is not None:
+            return cached
+        stdout, _, returncode = git_runner(['git', 'config', '--get', 'core.sshCommand'])
+        result = returncode == 0 and bool(stdout.strip())
+        with self._lock:
+            self._repo_overrides[repo_path] = result
+        return result
+
+    def environment(self, command_list: List[str], repo_path: str, git_runner) -> Dict[str, str]:
+        """
+        获取需要注入的环境变量
+
+        Args:
+            command_list: 将要执行的命令（仅网络命令注入）
+            repo_path: 仓库路径
+            git_runner: 执行非网络 git 命令的函数，返回 (stdout, stderr, returncode)
+        """
+        if not self.available or not is_network_command(command_list):
+            return {}
+        if self._has_repo_override(repo_path, git_runner):
+            return {}
+        self._ensure_runtime_dir()
+        return {'GIT_SSH_COMMAND': self._ssh_command}
+
+    def forget_repository(self, repo_path: str):
+        """仓库配置可能变化时，重新检查 core.sshCommand"""
+        with self._lock:
+            self._repo_overrides.pop(repo_path, None)
+
+    def active_sockets(self) -> List[str]:
+        """当前存在的控制套接字"""
+        runtime_dir = self._runtime_dir
+        if not runtime_dir or not os.path.isdir(runtime_dir):
+            return []
+        return [os.path.join(runtime_dir, name) for name in os.listdir(runtime_dir)]
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        if not self.available:
+            return "SSH 连接复用: 未启用"
+        return f"SSH 连接复用: {len(self.active_sockets())} 个主连接"
+
+    def shutdown(self):
+        """关闭所有主连接并删除运行时目录"""
+        for socket_path in self.active_sockets():
+            try:
+                subprocess.run(
+                    ['ssh', '-o', f'ControlPath={socket_path}', '-O', 'exit', 'simple-git-gui'],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=5,
+                    check=False
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        with self._lock:
+            runtime_dir = self._runtime_dir
+            self._runtime_dir = None
+            self._ssh_command = None
+        if runtime_dir:
+            shutil.rmtree(runtime_dir, ignore_errors=True)
+
+
+# 进程内共享，批量模式下多个仓库访问同一主机时也能复用连接
+_multiplexer = SSHMultiplexer()
+
+
+def get_multiplexer() -> SSHMultiplexer:
+    """获取进程内共享的连接复用管理器"""
+    return _multiplexer
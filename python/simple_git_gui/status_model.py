@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+状态模型模块
+以紧凑的方式存储 git status 结果，避免为每个文件重复构建元组和字符串
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# 重命名 (R) / 复制 (C) 状态字符
+_RENAME_CODES = (ord('R'), ord('C'))
+
+
+class PathSetMatcher:
+    """判断路径是否等于给定路径之一，或位于其中某个目录之下"""
+
+    __slots__ = ('_paths', '_whole_tree')
+
+    def __init__(self, paths):
+        self._paths = set()
+        self._whole_tree = False
+        for path in paths:
+            normalized = path.replace('\\', '/').rstrip('/')
+            if normalized in ('', '.'):
+                self._whole_tree = True
+            self._paths.add(normalized)
+
+    def matches(self, path: str) -> bool:
+        if self._whole_tree:
+            return True
+        candidate = path.rstrip('/')
+        if candidate in self._paths:
+            return True
+        # 逐级检查父目录
+        slash = candidate.rfind('/')
+        while slash > 0:
+            candidate = candidate[:slash]
+            if candidate in self._paths:
+                return True
+            slash = candidate.rfind('/')
+        return False
+
+
+class StatusSnapshot:
+    """
+    紧凑的仓库状态快照
+
+    - paths: 唯一的（驻留的）路径表，每个路径只保存一次
+    - index_codes / worktree_codes: 状态码两个字符分别存为 array('B')
+    - staged / unstaged: 指向路径表的索引视图（array('I')）
+    """
+
+    __slots__ = (
+        'paths', 'index_codes', 'worktree_codes',
+        'staged', 'unstaged', '_path_index'
+    )
+
+    # 两字符状态码的共享字符串，避免重复分配
+    _CODE_STRINGS: Dict[int, str] = {}
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.index_codes = array('B')
+        self.worktree_codes = array('B')
+        self.staged = array('I')
+        self.unstaged = array('I')
+        self._path_index: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def add(self, status_code: str, filepath: str) -> int:
+        """添加一条状态记录，返回其在路径表中的索引"""
+        index = len(self.paths)
+        staged_char = status_code[0]
+        unstaged_char = status_code[1]
+
+        self.paths.append(sys.intern(filepath))
+        self.index_codes.append(ord(staged_char))
+        self.worktree_codes.append(ord(unstaged_char))
+        if self._path_index is not None:
+            self._path_index[self.paths[index]] = index
+
+        # 已暂存（第一个字符不是空格且不是问号）
+        if staged_char != ' ' and staged_char != '?':
+            self.staged.append(index)
+
+        # 未暂存（第二个字符不是空格，或者是未跟踪文件）
+        if unstaged_char != ' ' or status_code == '??':
+            self.unstaged.append(index)
+
+        return index
+
+    def code(self, index: int) -> str:
+        """获取指定条目的两字符状态码"""
+        key = (self.index_codes[index] << 8) | self.worktree_codes[index]
+        code = self._CODE_STRINGS.get(key)
+        if code is None:
+            code = chr(self.index_codes[index]) + chr(self.worktree_codes[index])
+            self._CODE_STRINGS[key] = code
+        return code
+
+    def path(self, index: int) -> str:
+        """获取指定条目的路径"""
+        return self.paths[index]
+
+    def label(self, index: int) -> str:
+        """获取用于列表显示的文本（按需构建，不做缓存）"""
+        return f"{self.code(index)} {self.paths[index]}"
+
+    def index_of(self, filepath: str) -> int:
+        """按路径查找条目索引，不存在返回 -1（首次调用时建立索引）"""
+        if self._path_index is None:
+            self._path_index = {p: i for i, p in enumerate(self.paths)}
+        return self._path_index.get(filepath, -1)
+
+    def mark_worktree_modified(self, index: int):
+        """把条目的工作区状态标记为已修改（用于合并子模块内部的更改）"""
+        if self.worktree_codes[index] == ord(' '):
+            self.worktree_codes[index] = ord('M')
+            self.unstaged.append(index)
+
+    def iter_entries(self, view: array) -> Iterator[Tuple[str, str]]:
+        """按索引视图迭代 (status_code, filepath)"""
+        for index in view:
+            yield self.code(index), self.paths[index]
+
+    def to_lists(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """转换为旧版 (unstaged, staged) 元组列表格式"""
+        return list(self.iter_entries(self.unstaged)), list(self.iter_entries(self.staged))
+
+    def has_rename_or_copy(self, paths) -> bool:
+        """判断受影响路径中是否包含重命名/复制条目（其旧路径不在快照中）"""
+        matcher = PathSetMatcher(paths)
+        for index, path in enumerate(self.paths):
+            if matcher.matches(path) and (
+                self.index_codes[index] in _RENAME_CODES
+                or self.worktree_codes[index] in _RENAME_CODES
+            ):
+                return True
+        return False
+
+    def merge(self, partial: 'StatusSnapshot', paths) -> 'StatusSnapshot':
+        """
+        将针对部分路径的状态结果合并到当前快照，返回新快照
+
+        受影响路径（含其子路径）的旧条目被 partial 中的条目替换，
+        已存在的条目保持原有顺序，新出现的条目追加到末尾。
+        """
+        matcher = PathSetMatcher(paths)
+        replacements = {p: i for i, p in enumerate(partial.paths)}
+        merged = StatusSnapshot()
+
+        for index, path in enumerate(self.paths):
+            if not matcher.matches(path):
+                merged.add(self.code(index), path)
+                continue
+            new_index = replacements.pop(path, None)
+            if new_index is not None:
+                merged.add(partial.code(new_index), path)
+
+        for path, new_index in sorted(replacements.items(), key=lambda item: item[1]):
+            merged.add(partial.code(new_index), path)
+
+        return merged
+
+    def memory_usage(self) -> int:
+        """测量快照占用的内存（字节）"""
+        total = sys.getsizeof(self.paths)
+        total += sum(sys.getsizeof(p) for p in self.paths)
+        for arr in (self.index_codes, self.worktree_codes, self.staged, self.unstaged):
+            total += sys.getsizeof(arr)
+        if self._path_index is not None:
+            total += sys.getsizeof(self._path_index)
+        return total
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+状态目录树模块
+将状态快照的索引视图按目录分组为前缀树，并聚合每个目录下各状态码的数量
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .status_model import StatusSnapshot
+
+
+class TreeNode:
+    """目录节点"""
+
+    __slots__ = ('id', 'name', 'path', 'children', 'files', 'counts', 'total')
+
+    def __init__(self, node_id: int, name: str, path: str):
+        self.id = node_id
+        self.name = name
+        self.path = path  # 以 '/' 结尾的目录路径，根节点为空字符串
+        self.children: Dict[str, 'TreeNode'] = {}
+        self.files = array('I')  # 直接位于该目录下的条目（快照索引）
+        self.counts: Dict[str, int] = {}  # 含所有子目录的 状态码 -> 数量
+        self.total = 0
+
+    def summary(self) -> str:
+        """生成状态码统计文本，如 'M:10, ??:2'"""
+        return ", ".join(
+            f"{code.strip() or code}:{count}"
+            for code, count in sorted(self.counts.items(), key=lambda item: -item[1])
+        )
+
+
+class StatusTree:
+    """
+    状态前缀树
+
+    一次遍历构建：每个条目沿路径逐级创建目录节点，并在所有祖先节点上累加状态码计数。
+    只保存目录节点，文件以快照索引形式存放在所属目录的数组中。
+    """
+
+    def __init__(self, snapshot: StatusSnapshot, rows: array, complete: bool = True):
+        """
+        Args:
+            snapshot: 状态快照
+            rows: 要分组的索引视图
+            complete: rows 是否为完整视图（未经筛选）；不完整时目录不能用单个路径规范代表
+        """
+        self.snapshot = snapshot
+        self.complete = complete
+        self.root = TreeNode(0, '', '')
+        self.nodes: List[TreeNode] = [self.root]
+        self._build(rows)
+
+    def _build(self, rows: array):
+        """一次遍历构建目录树并聚合计数"""
+        paths = self.snapshot.paths
+        nodes = self.nodes
+        for index in rows:
+            path = paths[index]
+            code = self.snapshot.code(index)
+            # 未跟踪目录（如 "build/"）作为其父目录下的单个条目
+            parts = path.rstrip('/').split('/')
+            node = self.root
+            node.total += 1
+            node.counts[code] = node.counts.get(code, 0) + 1
+            for part in parts[:-1]:
+                child = node.children.get(part)
+                if child is None:
+                    child = TreeNode(len(nodes), part, node.path + part + '/')
+                    node.children[part] = child
+                    nodes.append(child)
+                node = child
+                node.total += 1
+                node.counts[code] = node.counts.get(code, 0) + 1
+            node.files.append(index)
+
+    def node(self, node_id: int) -> Optional[TreeNode]:
+        """按 id 获取节点"""
+        if 0 <= node_id < len(self.nodes):
+            return self.nodes[node_id]
+        return None
+
+    def entries(self, node: TreeNode) -> List[Tuple[str, int]]:
+        """
+        获取节点的直接子项，目录在前（按名称排序），文件在后（保持快照顺序）
+
+        Returns:
+            [('d', node_id) 或 ('f', snapshot_index), ...]
+        """
+        items: List[Tuple[str, int]] = [
+            ('d', child.id) for _, child in sorted(node.children.items())
+        ]
+        items.extend(('f', index) for index in node.files)
+        return items
+
+    def iter_files(self, node: TreeNode) -> Iterator[int]:
+        """递归迭代节点下所有条目的快照索引"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield from current.files
+            stack.extend(current.children.values())
+
+    def file_label(self, index: int) -> str:
+        """文件条目的显示文本（仅显示文件名）"""
+        path = self.snapshot.path(index)
+        name = path.rstrip('/').rsplit('/', 1)[-1] + ('/' if path.endswith('/') else '')
+        return f"{self.snapshot.code(index)} {name}"
+
+    @staticmethod
+    def dir_label(node: TreeNode) -> str:
+        """目录节点的显示文本"""
+        return f"{node.name}/  [{node.total}]  {node.summary()}"
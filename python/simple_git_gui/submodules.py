@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+子模块模块
+由 porcelain v2 记录识别子模块，在有界线程池中并发扫描各子模块的工作区
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+from .status_model import StatusSnapshot
+
+
+# --ignore-submodules 策略（与 git 的取值相同）
+IGNORE_NONE = "none"
+IGNORE_UNTRACKED = "untracked"
+IGNORE_DIRTY = "dirty"
+IGNORE_ALL = "all"
+IGNORE_POLICIES = (IGNORE_NONE, IGNORE_UNTRACKED, IGNORE_DIRTY, IGNORE_ALL)
+
+# 每个仓库的策略保存在仓库本地配置中（与 git-gui 的 gui.* 配置相同的做法）
+POLICY_CONFIG_KEY = "simplegitgui.ignoreSubmodules"
+
+
+class SubmoduleStatus:
+    """单个子模块的扫描结果"""
+
+    __slots__ = ('path', 'commit_changed', 'snapshot', 'children', 'elapsed_ms', 'error')
+
+    def __init__(self, path: str):
+        self.path = path  # 相对于父仓库的路径
+        self.commit_changed = False  # 检出的提交与父仓库记录的不同
+        self.snapshot: Optional[StatusSnapshot] = None
+        self.children: Dict[str, "SubmoduleStatus"] = {}  # 嵌套子模块
+        self.elapsed_ms = 0.0
+        self.error = ""
+
+    @property
+    def change_count(self) -> int:
+        """子模块内（含嵌套子模块）的更改条目数"""
+        count = len(self.snapshot) if self.snapshot is not None else 0
+        return count + sum(child.change_count for child in self.children.values())
+
+    @property
+    def dirty(self) -> bool:
+        """工作区或暂存区有更改"""
+        return self.change_count > 0
+
+    def entries(self) -> List[str]:
+        """展开显示的条目文本（嵌套子模块的条目带其路径前缀）"""
+        lines = []
+        if self.snapshot is not None:
+            lines.extend(self.snapshot.label(i) for i in range(len(self.snapshot)))
+        for child in self.children.values():
+            lines.extend(f"[{child.path}] {line}" for line in child.entries())
+        return lines
+
+    def summary(self) -> str:
+        """简要说明"""
+        if self.error:
+            return f"子模块: 扫描失败 ({self.error})"
+        parts = []
+        if self.commit_changed:
+            parts.append("提交已变化")
+        if self.dirty:
+            parts.append(f"{self.change_count} 项更改")
+        return "子模块: " + ("，".join(parts) if parts else "干净")
+
+
+def parse_v2_submodules(output: str) -> Dict[str, str]:
+    """
+    从 git status --porcelain=v2 -z 输出中提取子模块记录
+
+    Returns:
+        子模块路径 -> 子模块状态字段（S<c><m><u>）
+    """
+    records: Dict[str, str] = {}
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        i += 1
+        if not field:
+            continue
+        kind = field[0]
+        if kind == '1':
+            parts = field.split(' ', 8)
+        elif kind == '2':
+            parts = field.split(' ', 9)
+            i += 1  # 重命名记录后跟原路径字段
+        elif kind == 'u':
+            parts = field.split(' ', 10)
+        else:
+            continue
+        if len(parts) > 2 and parts[2].startswith('S'):
+            records[parts[-1]] = parts[2]
+    return records
+
+
+class SubmoduleScanner:
+    """
+    子模块扫描器
+
+    - 子模块列表来自 .gitmodules，提交变化来自父仓库的 porcelain v2 记录（不让 git 串行递归）
+    - 各子模块的 git status 在有界线程池中并发执行，不获取可选锁
+    - 每次扫描都重新运行各子模块的 git status（工作区编辑不会改变 HEAD 和索引，无法据此判断结果是否过期）
+    - 嵌套子模块递归扫描，深度由 SUBMODULE_MAX_DEPTH 限制
+    """
+
+    def __init__(self, git, depth: int = 0):
+        self.git = git
+        self.depth = depth
+        self.results: Dict[str, SubmoduleStatus] = {}  # 当前显示的扫描结果（只在主线程中赋值）
+        self._cores: Dict[str, object] = {}
+        self._policies: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # ==================== 策略 ====================
+
+    def policy(self) -> str:
+        """当前仓库的 --ignore-submodules 策略（每个仓库只读取一次配置）"""
+        repo = self.git.repo_path
+        policy = self._policies.get(repo)
+        if policy is None:
+            stdout, _, returncode = self.git.run_command_sync(['git', 'config', '--get', POLICY_CONFIG_KEY])
+            policy = stdout.strip() if returncode == 0 else ""
+            if policy not in IGNORE_POLICIES:
+                policy = Config.SUBMODULE_IGNORE_DEFAULT
+            self._policies[repo] = policy
+        return policy
+
+    def set_policy(self, policy: str) -> Tuple[bool, str]:
+        """保存当前仓库的策略到仓库本地配置"""
+        if policy not in IGNORE_POLICIES:
+            return False, f"无效的策略: {policy}"
+        _, stderr, returncode = self.git.run_command_sync(
+            ['git', 'config', '--local', POLICY_CONFIG_KEY, policy]
+        )
+        if returncode != 0:
+            return False, stderr
+        self._policies[self.git.repo_path] = policy
+        self.clear()
+        return True, ""
+
+    # ==================== 扫描 ====================
+
+    def submodule_paths(self) -> List[str]:
+        """.gitmodules 中登记的子模块路径"""
+        if not os.path.isfile(os.path.join(self.git.repo_path, '.gitmodules')):
+            return []
+        stdout, _, returncode = self.git.run_command_sync(
+            ['git', 'config', '-z', '-f', '.gitmodules', '--get-regexp', r'^submodule\..*\.path$']
+        )
+        if returncode != 0:
+            return []
+        paths = []
+        for entry in stdout.split('\0'):
+            _, _, value = entry.partition('\n')
+            if value:
+                paths.append(value.rstrip('/'))
+        return paths
+
+    def is_active(self) -> bool:
+        """是否需要自行扫描子模块（由 git 处理的策略或没有子模块时不需要）"""
+        return (
+            Config.SUBMODULE_PARALLEL_SCAN
+            and self.policy() in (IGNORE_NONE, IGNORE_UNTRACKED)
+            and os.path.isfile(os.path.join(self.git.repo_path, '.gitmodules'))
+        )
+
+    def parent_ignore_option(self) -> Optional[str]:
+        """父仓库 git status 使用的 --ignore-submodules 取值"""
+        policy = self.policy()
+        if self.is_active():
+            # 子模块内部由本扫描器并发处理，父仓库只比较提交
+            return IGNORE_DIRTY
+        return None if policy == IGNORE_NONE else policy
+
+    def core_for(self, path: str):
+        """获取子模块对应的 GitCore（共享路径解析缓存）"""
+        with self._lock:
+            core = self._cores.get(path)
+            if core is None:
+                core = type(self.git)(path)
+                core._path_cache = self.git._path_cache
+                self._cores[path] = core
+            return core
+
+    def scan(self, jobs: Optional[int] = None) -> Dict[str, SubmoduleStatus]:
+        """
+        扫描所有已初始化的子模块
+
+        Args:
+            jobs: 并发线程数，默认 Config.SUBMODULE_SCAN_JOBS
+
+        Returns:
+            子模块路径 -> 扫描结果（不修改 self.results，由调用方确认结果仍有效后再赋值）
+        """
+        policy = self.policy()
+        paths = self.submodule_paths() if policy in (IGNORE_NONE, IGNORE_UNTRACKED) else []
+        if not paths:
+            return {}
+
+        stdout, _, _ = self.git.run_command_sync(
+            ['git', '--literal-pathspecs', 'status', '--porcelain=v2', '-z',
+             '--ignore-submodules=dirty', '--untracked-files=no', '--'] + paths,
+            extra_env={'GIT_OPTIONAL_LOCKS': '0'}
+        )
+        records = parse_v2_submodules(stdout)
+
+        repo = self.git.repo_path
+        targets = [p for p in paths if os.path.exists(os.path.join(repo, p, '.git'))]
+
+        def scan_one(relative: str) -> SubmoduleStatus:
+            absolute = os.path.normpath(os.path.join(repo, relative))
+            result = self._scan_submodule(relative, absolute, policy)
+            result.commit_changed = records.get(relative, 'S...')[1] == 'C'
+            return result
+
+        workers = max(1, min(jobs or Config.SUBMODULE_SCAN_JOBS, len(targets) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(scan_one, targets))
+        return {result.path: result for result in results}
+
+    def _scan_submodule(self, relative: str, absolute: str, policy: str) -> SubmoduleStatus:
+        """扫描单个子模块（在线程池中执行）"""
+        started = time.perf_counter()
+        result = SubmoduleStatus(relative)
+        core = self.core_for(absolute)
+        nested = SubmoduleScanner(core, self.depth + 1) if self.depth + 1 < Config.SUBMODULE_MAX_DEPTH else None
+        try:
+            result.snapshot = core.get_status_snapshot(
+                optional_locks=False,
+                ignore_submodules=IGNORE_DIRTY if nested is not None else IGNORE_ALL,
+                untracked=policy != IGNORE_UNTRACKED
+            )
+            if nested is not None:
+                # 嵌套子模块沿用父仓库的策略，在当前线程中串行扫描
+                nested._policies[core.repo_path] = policy
+                result.children = nested.scan(jobs=1)
+        except Exception as e:
+            result.error = str(e)
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def merge_into(self, snapshot: StatusSnapshot, results: Dict[str, SubmoduleStatus]):
+        """
+        把子模块内部的更改合并到父仓库快照
+
+        父仓库状态只比较了提交，内部有更改但提交未变的子模块需要补上未暂存标记。
+        """
+        for path, result in results.items():
+            if not result.dirty:
+                continue
+            index = snapshot.index_of(path)
+            if index < 0:
+                snapshot.add(' M', path)
+            elif snapshot.code(index)[1] == ' ':
+                snapshot.mark_worktree_modified(index)
+
+    def clear(self):
+        """清空结果和子模块 GitCore（仓库或策略变化时调用）"""
+        with self._lock:
+            self._cores.clear()
+        self.results = {}
+
+    def format_stats(self) -> str:
+        """生成统计文本"""
+        if not self.results:
+            return "子模块扫描: 无结果"
+        dirty = sum(1 for r in self.results.values() if r.dirty)
+        slowest = max(self.results.values(), key=lambda r: r.elapsed_ms)
+        return (
+            f"子模块扫描: {len(self.results)} 个，{dirty} 个有更改，"
+            f"最慢 {slowest.path} {slowest.elapsed_ms:.0f} ms"
+        )
@@ -10,12 +10,14 @@ import tkinter.scrolledtext as scrolledtext
 import tkinter.messagebox as messagebox
 
 from .config import Config
+from .file_filter import FILTER_MODES, MODE_SUBSTRING
+from .search import SEARCH_SCOPES, SCOPE_WORKTREE
 
 
 class OutputPanel:
     """输出面板组件"""
     
-    def __init__(self, parent: ttk.Frame):
+    def __init__(self, parent: ttk.Frame, scheduler=None):
         self.frame = ttk.LabelFrame(parent, text="命令输出 / 消息", padding="10")
         self.frame.pack(fill=tk.BOTH, expand=False, padx=10, pady=(5, 10))
         self.frame.rowconfigure(0, weight=1)
@@ -33,23 +35,48 @@ class OutputPanel:
         scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.text.yview)
         scrollbar.grid(row=0, column=1, sticky="ns")
         self.text['yscrollcommand'] = scrollbar.set
+        
+        # 帧调度器：有则把同一帧内的多次输出合并为一次写入
+        self.scheduler = scheduler
+        self._pending = []
+        self._clear_pending = False
     
     def display(self, text: str, clear_previous: bool = False):
-        """显示文本到输出面板"""
+        """显示文本到输出面板（使用帧调度器时在下一帧统一写入）"""
+        if self.scheduler is None:
+            self._write([text + "---\n"], clear_previous)
+            return
+        if clear_previous:
+            if self._pending:
+                self.scheduler.note_dropped(len(self._pending))
+            self._pending = []
+            self._clear_pending = True
+        self._pending.append(text + "---\n")
+        self.scheduler.schedule(self, self.flush)
+    
+    def flush(self):
+        """写入所有待显示的输出"""
+        chunks, clear_previous = self._pending, self._clear_pending
+        self._pending = []
+        self._clear_pending = False
+        if chunks:
+            self._write(chunks, clear_previous)
+    
+    def _write(self, chunks: list, clear_previous: bool):
+        """一次插入多段文本，再按行数上限裁剪"""
         try:
             self.text.config(state=tk.NORMAL)
             
             if clear_previous:
                 self.text.delete("1.0", tk.END)
             
-            self.text.insert(tk.END, text + "---\n")
+            self.text.insert(tk.END, "".join(chunks))
             
-            # 限制输出行数
-            content = self.text.get("1.0", tk.END)
-            lines = content.split('\n')
-            if len(lines) > Config.MAX_OUTPUT_LINES:
-                self.text.delete("1.0", tk.END)
-                self.text.insert("1.0", '\n'.join(lines[-Config.MAX_OUTPUT_LINES:]))
+            # 限制输出行数（按行号计算，不取出全部文本）
+            lines = int(self.text.index("end-1c").split('.')[0])
+            excess = lines - Config.MAX_OUTPUT_LINES
+            if excess > 0:
+                self.text.delete("1.0", f"{excess + 1}.0")
             
             self.text.see(tk.END)
             self.text.config(state=tk.DISABLED)
@@ -58,6 +85,10 @@ class OutputPanel:
     
     def clear(self):
         """清空输出"""
+        if self._pending and self.scheduler is not None:
+            self.scheduler.note_dropped(len(self._pending))
+        self._pending = []
+        self._clear_pending = False
         self.text.config(state=tk.NORMAL)
         self.text.delete("1.0", tk.END)
         self.text.config(state=tk.DISABLED)
@@ -118,6 +149,44 @@ class FileListPanel:
         return [self.listbox.get(i) for i in selections]
 
 
+class FilterBar:
+    """文件列表筛选栏组件"""
+    
+    def __init__(self, parent: ttk.Frame, on_change: callable, row: int = 0):
+        self.frame = ttk.Frame(parent)
+        self.frame.grid(row=row, column=0, columnspan=2, sticky="ew", pady=(0, 2))
+        
+        ttk.Label(self.frame, text="筛选:").pack(side=tk.LEFT, padx=(0, 2))
+        self.query_var = tk.StringVar()
+        self.entry = ttk.Entry(self.frame, textvariable=self.query_var)
+        self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        
+        self.mode_combobox = ttk.Combobox(
+            self.frame, state="readonly", width=5, values=FILTER_MODES
+        )
+        self.mode_combobox.set(MODE_SUBSTRING)
+        self.mode_combobox.pack(side=tk.LEFT, padx=2)
+        
+        self.info_var = tk.StringVar()
+        ttk.Label(self.frame, textvariable=self.info_var).pack(side=tk.LEFT, padx=(2, 0))
+        
+        self.query_var.trace_add('write', lambda *_: on_change())
+        self.mode_combobox.bind('<<ComboboxSelected>>', lambda e: on_change())
+        self.entry.bind('<Escape>', lambda e: self.query_var.set(''))
+    
+    def get(self) -> tuple:
+        """获取 (查询文本, 筛选模式)"""
+        return self.query_var.get(), self.mode_combobox.get()
+    
+    def is_active(self) -> bool:
+        """是否输入了筛选条件"""
+        return bool(self.query_var.get().strip())
+    
+    def set_info(self, text: str):
+        """设置匹配数量等提示信息"""
+        self.info_var.set(text)
+
+
 class BranchCombobox:
     """分支选择下拉框组件"""
     
@@ -205,10 +274,560 @@ class DialogHelper:
         return dialog
 
 
+class BlamePanel:
+    """Blame 面板组件（独立窗口，行首信息随计算进度逐步填充）"""
+    
+    def __init__(self, parent: tk.Tk, gutter_width: int, on_close: callable = None):
+        self.gutter_width = gutter_width
+        self.window = tk.Toplevel(parent)
+        self.window.title("追溯 (Blame)")
+        self.window.geometry("950x600")
+        self.window.rowconfigure(1, weight=1)
+        self.window.columnconfigure(0, weight=1)
+        
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self.window, textvariable=self.status_var, anchor=tk.W, padding=(5, 2)).grid(
+            row=0, column=0, columnspan=2, sticky="ew"
+        )
+        
+        self.text = tk.Text(self.window, wrap=tk.NONE, font=Config.OUTPUT_FONT, state=tk.DISABLED)
+        self.text.grid(row=1, column=0, sticky="nsew")
+        y_scroll = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.text.yview)
+        y_scroll.grid(row=1, column=1, sticky="ns")
+        x_scroll = ttk.Scrollbar(self.window, orient=tk.HORIZONTAL, command=self.text.xview)
+        x_scroll.grid(row=2, column=0, sticky="ew")
+        self.text['yscrollcommand'] = y_scroll.set
+        self.text['xscrollcommand'] = x_scroll.set
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def set_content(self, lines: list):
+        """显示文件内容，行首留空等待填充"""
+        blank = " " * self.gutter_width + " │ "
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(blank + line for line in lines))
+        self.text.config(state=tk.DISABLED)
+    
+    def apply_chunks(self, chunks: list):
+        """批量填充行首信息，chunks 为 [(起始行号, 行数, 行首文本), ...]"""
+        if not chunks:
+            return
+        width = self.gutter_width
+        self.text.config(state=tk.NORMAL)
+        for start, count, label in chunks:
+            for line in range(start, start + count):
+                self.text.replace(f"{line}.0", f"{line}.{width}", label)
+        self.text.config(state=tk.DISABLED)
+
+
+class SearchPanel:
+    """内容搜索面板组件（独立窗口，匹配结果逐步追加）"""
+    
+    def __init__(self, parent: tk.Tk, on_change: callable, on_close: callable = None):
+        self.window = tk.Toplevel(parent)
+        self.window.title("搜索内容 (git grep)")
+        self.window.geometry("900x500")
+        self.window.rowconfigure(1, weight=1)
+        self.window.columnconfigure(0, weight=1)
+        
+        bar = ttk.Frame(self.window, padding=(5, 5))
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew")
+        ttk.Label(bar, text="搜索:").pack(side=tk.LEFT, padx=(0, 2))
+        self.query_var = tk.StringVar()
+        self.entry = ttk.Entry(bar, textvariable=self.query_var)
+        self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        
+        self.scope_combobox = ttk.Combobox(bar, state="readonly", width=9, values=SEARCH_SCOPES)
+        self.scope_combobox.set(SCOPE_WORKTREE)
+        self.scope_combobox.pack(side=tk.LEFT, padx=2)
+        
+        self.ignore_case_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(bar, text="忽略大小写", variable=self.ignore_case_var,
+                        command=on_change).pack(side=tk.LEFT, padx=2)
+        self.regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="正则", variable=self.regex_var,
+                        command=on_change).pack(side=tk.LEFT, padx=2)
+        
+        self.results = tk.Listbox(self.window, font=Config.OUTPUT_FONT, activestyle=tk.NONE)
+        self.results.grid(row=1, column=0, sticky="nsew")
+        y_scroll = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.results.yview)
+        y_scroll.grid(row=1, column=1, sticky="ns")
+        self.results['yscrollcommand'] = y_scroll.set
+        
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self.window, textvariable=self.status_var, anchor=tk.W, padding=(5, 2)).grid(
+            row=2, column=0, columnspan=2, sticky="ew"
+        )
+        
+        self.query_var.trace_add('write', lambda *_: on_change())
+        self.scope_combobox.bind('<<ComboboxSelected>>', lambda e: on_change())
+        self.entry.bind('<Escape>', lambda e: self.query_var.set(''))
+        self.entry.focus_set()
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def get(self) -> tuple:
+        """获取 (查询文本, 搜索范围, 忽略大小写, 正则)"""
+        return (
+            self.query_var.get(), self.scope_combobox.get(),
+            self.ignore_case_var.get(), self.regex_var.get()
+        )
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def clear(self):
+        """清空结果"""
+        self.results.delete(0, tk.END)
+    
+    def append(self, items: list):
+        """批量追加结果行"""
+        if items:
+            self.results.insert(tk.END, *items)
+
+
+class StashPanel:
+    """储藏管理面板组件（独立窗口：左侧储藏列表，右侧按需加载的内容）"""
+    
+    def __init__(self, parent: tk.Tk, actions: dict, on_select: callable, on_close: callable = None):
+        """
+        Args:
+            actions: 按钮文本 -> 回调函数（按顺序排列在列表下方）
+            on_select: 选中储藏时的回调
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("储藏管理 (Stash)")
+        self.window.geometry("950x550")
+        
+        paned = ttk.PanedWindow(self.window, orient=tk.HORIZONTAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        left = ttk.Frame(paned)
+        left.rowconfigure(0, weight=1)
+        left.columnconfigure(0, weight=1)
+        self.listbox = tk.Listbox(left, selectmode=tk.BROWSE, width=45, exportselection=False)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        list_scroll = ttk.Scrollbar(left, orient=tk.VERTICAL, command=self.listbox.yview)
+        list_scroll.grid(row=0, column=1, sticky="ns")
+        self.listbox['yscrollcommand'] = list_scroll.set
+        
+        buttons = ttk.Frame(left)
+        buttons.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        for text, command in actions.items():
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, expand=True, fill=tk.X, padx=2
+            )
+        paned.add(left, weight=1)
+        
+        self.text = scrolledtext.ScrolledText(
+            paned, wrap=tk.NONE, state=tk.DISABLED, font=Config.OUTPUT_FONT
+        )
+        paned.add(self.text, weight=2)
+        
+        self.listbox.bind('<<ListboxSelect>>', lambda e: on_select())
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_items(self, items: list):
+        """设置储藏列表显示文本"""
+        self.listbox.delete(0, tk.END)
+        if items:
+            self.listbox.insert(tk.END, *items)
+    
+    def selected_index(self):
+        """获取选中行号（未选中时返回 None）"""
+        selection = self.listbox.curselection()
+        return selection[0] if selection else None
+    
+    def show_text(self, text: str):
+        """显示储藏内容"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", text)
+        self.text.config(state=tk.DISABLED)
+
+
+class ReflogPanel:
+    """引用日志面板组件（独立窗口：最新的条目在最上方，下方显示选中条目的详细信息）"""
+    
+    def __init__(self, parent: tk.Tk, actions: dict, on_select: callable, on_close: callable = None):
+        """
+        Args:
+            actions: 按钮文本 -> 回调函数（按顺序排列在列表下方）
+            on_select: 选中条目时的回调
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("引用日志 (Reflog)")
+        self.window.geometry("850x550")
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var).pack(fill=tk.X, padx=5, pady=(5, 0))
+        
+        body = ttk.Frame(self.window)
+        body.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+        self.listbox = tk.Listbox(body, selectmode=tk.BROWSE, exportselection=False, font=Config.OUTPUT_FONT)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        list_scroll = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.listbox.yview)
+        list_scroll.grid(row=0, column=1, sticky="ns")
+        self.listbox['yscrollcommand'] = list_scroll.set
+        
+        self.detail = tk.Text(body, height=4, wrap=tk.WORD, state=tk.DISABLED, font=Config.OUTPUT_FONT)
+        self.detail.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        
+        buttons = ttk.Frame(body)
+        buttons.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        for text, command in actions.items():
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, expand=True, fill=tk.X, padx=2
+            )
+        
+        self.listbox.bind('<<ListboxSelect>>', lambda e: on_select())
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def set_items(self, items: list):
+        """整体设置条目（最新的在前）"""
+        self.listbox.delete(0, tk.END)
+        if items:
+            self.listbox.insert(tk.END, *items)
+    
+    def prepend(self, items: list, limit: int):
+        """在顶部插入新条目（最新的在前），并删除超出 limit 的最旧条目"""
+        if items:
+            self.listbox.insert(0, *items)
+        if self.listbox.size() > limit:
+            self.listbox.delete(limit, tk.END)
+    
+    def selected_index(self):
+        """获取选中行号（未选中时返回 None）"""
+        selection = self.listbox.curselection()
+        return selection[0] if selection else None
+    
+    def show_detail(self, text: str):
+        """显示选中条目的详细信息"""
+        self.detail.config(state=tk.NORMAL)
+        self.detail.delete("1.0", tk.END)
+        self.detail.insert("1.0", text)
+        self.detail.config(state=tk.DISABLED)
+
+
+class MaintenancePanel:
+    """仓库体检面板组件（独立窗口：上方为体检结果和维护输出，下方为可多选的维护建议）"""
+    
+    def __init__(self, parent: tk.Tk, actions: dict, on_close: callable = None):
+        """
+        Args:
+            actions: 按钮文本 -> 回调函数（按顺序排列在建议列表下方）
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("仓库体检与维护")
+        self.window.geometry("800x550")
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var).pack(fill=tk.X, padx=5, pady=(5, 0))
+        
+        body = ttk.Frame(self.window)
+        body.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+        self.text = scrolledtext.ScrolledText(body, wrap=tk.WORD, state=tk.DISABLED, font=Config.OUTPUT_FONT)
+        self.text.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        
+        ttk.Label(body, text="维护建议（可多选）:").grid(row=1, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        self.listbox = tk.Listbox(body, selectmode=tk.MULTIPLE, height=5, exportselection=False)
+        self.listbox.grid(row=2, column=0, sticky="ew")
+        list_scroll = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.listbox.yview)
+        list_scroll.grid(row=2, column=1, sticky="ns")
+        self.listbox['yscrollcommand'] = list_scroll.set
+        
+        buttons = ttk.Frame(body)
+        buttons.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        for text, command in actions.items():
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, expand=True, fill=tk.X, padx=2
+            )
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def set_items(self, items: list):
+        """设置建议列表（默认全部选中）"""
+        self.listbox.delete(0, tk.END)
+        if items:
+            self.listbox.insert(tk.END, *items)
+            self.listbox.selection_set(0, tk.END)
+    
+    def selected_indices(self) -> list:
+        """获取选中的行号"""
+        return list(self.listbox.curselection())
+    
+    def show_text(self, text: str):
+        """替换上方文本"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", text)
+        self.text.config(state=tk.DISABLED)
+    
+    def append_text(self, text: str):
+        """在上方文本末尾追加一行"""
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, text + "\n")
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+
+class ConflictPanel:
+    """冲突解决面板组件（独立窗口：左侧可多选的冲突列表，右侧分页显示选中路径的各阶段内容）"""
+    
+    def __init__(self, parent: tk.Tk, stage_names: dict, actions: dict, on_select: callable,
+                 on_close: callable = None):
+        """
+        Args:
+            stage_names: 阶段编号 -> 分页标题
+            actions: 按钮文本 -> 回调函数（按顺序排列在列表下方）
+            on_select: 选中条目时的回调
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("解决冲突")
+        self.window.geometry("1000x600")
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var).pack(fill=tk.X, padx=5, pady=(5, 0))
+        
+        paned = ttk.PanedWindow(self.window, orient=tk.HORIZONTAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        left = ttk.Frame(paned)
+        left.rowconfigure(0, weight=1)
+        left.columnconfigure(0, weight=1)
+        self.listbox = tk.Listbox(left, selectmode=tk.EXTENDED, width=40, exportselection=False)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        list_scroll = ttk.Scrollbar(left, orient=tk.VERTICAL, command=self.listbox.yview)
+        list_scroll.grid(row=0, column=1, sticky="ns")
+        self.listbox['yscrollcommand'] = list_scroll.set
+        
+        buttons = ttk.Frame(left)
+        buttons.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        for text, command in actions.items():
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, expand=True, fill=tk.X, padx=2
+            )
+        paned.add(left, weight=1)
+        
+        notebook = ttk.Notebook(paned)
+        self.stage_texts = {}
+        for stage, title in stage_names.items():
+            text = scrolledtext.ScrolledText(notebook, wrap=tk.NONE, state=tk.DISABLED, font=Config.OUTPUT_FONT)
+            notebook.add(text, text=title)
+            self.stage_texts[stage] = text
+        paned.add(notebook, weight=2)
+        
+        self.listbox.bind('<<ListboxSelect>>', lambda e: on_select())
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def set_items(self, items: list):
+        """设置冲突列表显示文本"""
+        self.listbox.delete(0, tk.END)
+        if items:
+            self.listbox.insert(tk.END, *items)
+    
+    def selected_indices(self) -> list:
+        """获取选中的行号"""
+        return list(self.listbox.curselection())
+    
+    def show_stages(self, texts: dict, missing_text: str = ""):
+        """显示各阶段内容（texts: 阶段编号 -> 文本，缺少的阶段显示 missing_text）"""
+        for stage, widget in self.stage_texts.items():
+            widget.config(state=tk.NORMAL)
+            widget.delete("1.0", tk.END)
+            widget.insert("1.0", texts.get(stage, missing_text))
+            widget.config(state=tk.DISABLED)
+
+
+class DiffPanel:
+    """差异面板组件（独立窗口：选中文本行后可按行或按区块暂存/取消暂存）"""
+    
+    def __init__(self, parent: tk.Tk, on_apply: callable, on_close: callable = None):
+        """
+        Args:
+            on_apply: 回调 on_apply(whole_hunks)，由面板按钮触发
+        """
+        self.window = tk.Toplevel(parent)
+        self.window.title("差异 / 部分暂存")
+        self.window.geometry("900x600")
+        self.window.rowconfigure(1, weight=1)
+        self.window.columnconfigure(0, weight=1)
+        
+        bar = ttk.Frame(self.window, padding=(5, 5))
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew")
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(bar, textvariable=self.status_var, anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.hunk_button = ttk.Button(bar, text="暂存所在区块", command=lambda: on_apply(True))
+        self.hunk_button.pack(side=tk.RIGHT, padx=2)
+        self.line_button = ttk.Button(bar, text="暂存选中行", command=lambda: on_apply(False))
+        self.line_button.pack(side=tk.RIGHT, padx=2)
+        
+        self.text = tk.Text(self.window, wrap=tk.NONE, font=Config.OUTPUT_FONT)
+        self.text.grid(row=1, column=0, sticky="nsew")
+        y_scroll = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.text.yview)
+        y_scroll.grid(row=1, column=1, sticky="ns")
+        x_scroll = ttk.Scrollbar(self.window, orient=tk.HORIZONTAL, command=self.text.xview)
+        x_scroll.grid(row=2, column=0, sticky="ew")
+        self.text['yscrollcommand'] = y_scroll.set
+        self.text['xscrollcommand'] = x_scroll.set
+        self.text.tag_configure('add', foreground='#1a7f37')
+        self.text.tag_configure('del', foreground='#cf222e')
+        self.text.tag_configure('hunk', foreground='#0550ae')
+        # 只读但允许选择和复制
+        self.text.bind('<Key>', lambda e: None if (e.state & 0x4 or e.keysym in (
+            'Up', 'Down', 'Left', 'Right', 'Prior', 'Next', 'Home', 'End')) else 'break')
+        
+        def close():
+            if on_close:
+                on_close()
+            self.window.destroy()
+        
+        self.window.protocol("WM_DELETE_WINDOW", close)
+    
+    def exists(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def set_mode(self, staged: bool):
+        """切换按钮文本：已暂存文件为取消暂存"""
+        prefix = "取消暂存" if staged else "暂存"
+        self.line_button.config(text=f"{prefix}选中行")
+        self.hunk_button.config(text=f"{prefix}所在区块")
+    
+    def set_status(self, text: str):
+        """设置状态文本"""
+        self.status_var.set(text)
+    
+    def show_lines(self, lines: list):
+        """显示差异行（按前缀着色）"""
+        self.text.delete("1.0", tk.END)
+        for line in lines:
+            tag = ()
+            if line.startswith('@@'):
+                tag = ('hunk',)
+            elif line.startswith('+') and not line.startswith('+++'):
+                tag = ('add',)
+            elif line.startswith('-') and not line.startswith('---'):
+                tag = ('del',)
+            self.text.insert(tk.END, line + "\n", tag)
+    
+    def selected_line_range(self) -> tuple:
+        """获取选中的行范围 (first, last)，0 起；无选择时使用光标所在行"""
+        try:
+            first = int(self.text.index(tk.SEL_FIRST).split('.')[0])
+            last_index = self.text.index(tk.SEL_LAST)
+            last_line, last_column = map(int, last_index.split('.'))
+            # 选择止于行首时不包含该行
+            last = last_line - 1 if last_column == 0 and last_line > first else last_line
+        except tk.TclError:
+            first = last = int(self.text.index(tk.INSERT).split('.')[0])
+        return first - 1, last - 1
+
+
 class StatusBar:
     """状态栏组件"""
     
-    def __init__(self, parent: tk.Tk):
+    def __init__(self, parent: tk.Tk, on_cancel: callable = None):
         self.frame = ttk.Frame(parent)
         self.frame.pack(fill=tk.X, side=tk.BOTTOM)
         
@@ -219,7 +838,15 @@ class StatusBar:
             relief=tk.SUNKEN,
             padding=(5, 2)
         )
-        self.label.pack(fill=tk.X)
+        
+        # 取消按钮（仅在有命令执行时可用）
+        self.cancel_button = None
+        if on_cancel:
+            self.cancel_button = ttk.Button(
+                self.frame, text="取消", command=on_cancel, state=tk.DISABLED
+            )
+            self.cancel_button.pack(side=tk.RIGHT, padx=(2, 0))
+        self.label.pack(fill=tk.X, side=tk.LEFT, expand=True)
     
     def set_text(self, text: str):
         """设置状态文本"""
@@ -231,3 +858,16 @@ class StatusBar:
             self.label_var.set("正在处理...")
         else:
             self.label_var.set("就绪")
+        if self.cancel_button is not None:
+            self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+    
+    def show_commands(self, descriptions: list):
+        """显示正在执行的命令列表"""
+        if not descriptions:
+            self.set_busy(False)
+            return
+        text = "正在执行: " + "；".join(descriptions)
+        if text != self.label_var.get():
+            self.label_var.set(text)
+        if self.cancel_button is not None:
+            self.cancel_button.config(state=tk.NORMAL)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+撤销日志模块
+在暂存 / 取消暂存 / 排除操作之前记录状态快照，撤销时一次恢复
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .cache import normalize_repo_key
+from .commands import CommandHandle
+from .config import Config
+
+
+# 日志条目类型
+KIND_INDEX = "index"  # 索引快照（树对象 oid）
+KIND_EXCLUDE = "exclude"  # 排除规则快照
+
+
+class JournalEntry:
+    """一次可撤销的操作"""
+
+    __slots__ = ('description', 'kind', 'tree', 'head_oid', 'patterns', 'paths', 'created_at')
+
+    def __init__(
+        self,
+        description: str,
+        kind: str,
+        tree: Optional[str] = None,
+        head_oid: Optional[str] = None,
+        patterns: Optional[List[str]] = None,
+        paths: Optional[List[str]] = None
+    ):
+        self.description = description
+        self.kind = kind
+        self.tree = tree  # 操作前索引对应的树对象
+        self.head_oid = head_oid  # 记录快照时 HEAD 指向的提交（HEAD 移动后快照不再可撤销）
+        self.patterns = patterns  # 操作前的排除规则
+        self.paths = paths  # 受影响的路径（用于局部刷新），None 表示整个仓库
+        self.created_at = time.time()
+
+    def label(self) -> str:
+        """显示文本"""
+        return f"{time.strftime('%H:%M:%S', time.localtime(self.created_at))} {self.description}"
+
+
+class UndoJournal:
+    """
+    按仓库保存的操作日志
+
+    - 修改索引的操作之前执行一次 git write-tree，撤销时一次 git read-tree 恢复，
+      与涉及的文件数量无关
+    - 树对象不被任何引用指向，会在 gc.pruneExpire（默认两周）后被清理，日志只用于当前会话
+    - 索引快照只相对于记录时的 HEAD 有意义：提交、拉取、切换、重置后应调用 clear_index，
+      撤销前也应通过 is_stale 核对 HEAD
+    - 每个仓库最多保留 UNDO_JOURNAL_SIZE 条，超出时丢弃最早的条目
+    """
+
+    def __init__(self, git):
+        self.git = git
+        self._journals: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _journal(self, repo_path: Optional[str] = None) -> deque:
+        key = normalize_repo_key(repo_path or self.git.repo_path)
+        with self._lock:
+            journal = self._journals.get(key)
+            if journal is None:
+                journal = deque(maxlen=Config.UNDO_JOURNAL_SIZE)
+                self._journals[key] = journal
+            return journal
+
+    def record_index(
+        self,
+        description: str,
+        paths: Optional[List[str]] = None,
+        handle: Optional[CommandHandle] = None
+    ) -> Optional[JournalEntry]:
+        """
+        记录当前索引快照（在后台任务中、修改索引的命令之前调用）
+
+        Returns:
+            新条目；索引中有未合并条目等无法写出树时返回 None（该操作不可撤销）
+        """
+        tree = self.git.write_index_tree(handle)
+        if tree is None:
+            return None
+        entry = JournalEntry(
+            description, KIND_INDEX, tree=tree, head_oid=self.git.get_head_oid(),
+            paths=list(paths) if paths else None
+        )
+        journal = self._journal()
+        with self._lock:
+            journal.append(entry)
+        return entry
+
+    def record_exclusions(self, description: str, patterns: List[str]) -> JournalEntry:
+        """记录修改前的排除规则"""
+        entry = JournalEntry(description, KIND_EXCLUDE, patterns=list(patterns))
+        journal = self._journal()
+        with self._lock:
+            journal.append(entry)
+        return entry
+
+    def discard(self, entry: JournalEntry):
+        """操作失败时移除对应条目"""
+        journal = self._journal()
+        with self._lock:
+            try:
+                journal.remove(entry)
+            except ValueError:
+                pass
+
+    def clear_index(self, repo_path: Optional[str] = None) -> int:
+        """
+        移除仓库的所有索引快照（HEAD 移动后调用；排除规则条目保留）
+
+        Returns:
+            移除的条目数
+        """
+        journal = self._journal(repo_path)
+        with self._lock:
+            kept = [entry for entry in journal if entry.kind != KIND_INDEX]
+            removed = len(journal) - len(kept)
+            if removed:
+                journal.clear()
+                journal.extend(kept)
+            return removed
+
+    def is_stale(self, entry: JournalEntry, head_oid: Optional[str]) -> bool:
+        """索引快照是否因 HEAD 移动而失效（恢复它会暂存对新提交的反向修改）"""
+        return entry.kind == KIND_INDEX and entry.head_oid != head_oid
+
+    def last(self) -> Optional[JournalEntry]:
+        """最近一条可撤销的操作"""
+        journal = self._journal()
+        with self._lock:
+            return journal[-1] if journal else None
+
+    def entries(self) -> List[JournalEntry]:
+        """当前仓库的日志（最新的在前）"""
+        journal = self._journal()
+        with self._lock:
+            return list(reversed(journal))
+
+    def undo_index(self, entry: JournalEntry, handle: Optional[CommandHandle] = None) -> Tuple[bool, str, str]:
+        """
+        把索引恢复到条目记录的快照（后台任务中调用），成功后移除该条目及其之后的条目
+
+        Returns:
+            (success, stdout, stderr) 元组
+        """
+        success, stdout, stderr = self.git.restore_index_tree(entry.tree, handle)
+        if success:
+            self.truncate(entry)
+        return success, stdout, stderr
+
+    def truncate(self, entry: JournalEntry):
+        """移除条目及其之后的所有条目（恢复到该条目之前的状态后，之后的快照不再有意义）"""
+        journal = self._journal()
+        with self._lock:
+            if entry not in journal:
+                return
+            while journal:
+                if journal.pop() is entry:
+                    break
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+工作树模块
+枚举链接工作树，并发刷新各工作树的状态，缓存快照以便即时切换
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+from .status_model import StatusSnapshot
+
+
+class WorktreeInfo:
+    """git worktree list 中的一条记录"""
+
+    __slots__ = ('path', 'head', 'branch', 'detached', 'bare', 'locked', 'prunable')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.head = ""
+        self.branch = ""  # 去掉 refs/heads/ 前缀的分支名
+        self.detached = False
+        self.bare = False
+        self.locked = False
+        self.prunable = False
+
+    def label(self) -> str:
+        """下拉框显示文本"""
+        if self.bare:
+            name = "(裸仓库)"
+        elif self.detached:
+            name = f"(分离 {self.head[:8]})"
+        else:
+            name = self.branch or "?"
+        flags = "".join([" [锁定]" if self.locked else "", " [可清理]" if self.prunable else ""])
+        return f"{name}  —  {self.path}{flags}"
+
+
+def parse_worktree_list(output: str) -> List[WorktreeInfo]:
+    """
+    解析 git worktree list --porcelain -z 输出
+
+    每个字段以 NUL 结尾，记录之间以一个空字段分隔。
+    """
+    worktrees: List[WorktreeInfo] = []
+    current: Optional[WorktreeInfo] = None
+    for field in output.split('\0'):
+        if not field:
+            current = None
+            continue
+        key, _, value = field.partition(' ')
+        if key == 'worktree':
+            current = WorktreeInfo(os.path.normpath(value))
+            worktrees.append(current)
+        elif current is None:
+            continue
+        elif key == 'HEAD':
+            current.head = value
+        elif key == 'branch':
+            current.branch = value[len('refs/heads/'):] if value.startswith('refs/heads/') else value
+        elif key == 'detached':
+            current.detached = True
+        elif key == 'bare':
+            current.bare = True
+        elif key == 'locked':
+            current.locked = True
+        elif key == 'prunable':
+            current.prunable = True
+    return worktrees
+
+
+class WorktreeManager:
+    """
+    工作树管理器
+
+    - 每个工作树使用独立的 GitCore（各自的启动上下文），共享路径解析缓存和 SSH 连接复用
+    - 状态并发刷新，后台刷新不获取可选锁，避免与前台命令争用 index.lock
+    - 快照按工作树路径缓存，切换工作树时先显示缓存结果
+    """
+
+    def __init__(self, git):
+        self.git = git
+        self.worktrees: List[WorktreeInfo] = []
+        self._cores: Dict[str, object] = {}
+        self._snapshots: Dict[str, Tuple[StatusSnapshot, float]] = {}
+        self._lock = threading.Lock()
+
+    def refresh_list(self) -> List[WorktreeInfo]:
+        """重新枚举工作树（移除已不存在的工作树的缓存）"""
+        self.worktrees = [wt for wt in self.git.list_worktrees() if not wt.bare]
+        paths = {wt.path for wt in self.worktrees}
+        with self._lock:
+            for path in list(self._snapshots):
+                if path not in paths:
+                    self._snapshots.pop(path, None)
+                    self._cores.pop(path, None)
+        return self.worktrees
+
+    def core_for(self, path: str):
+        """获取工作树对应的 GitCore（复用实例及其启动上下文）"""
+        path = os.path.normpath(path)
+        with self._lock:
+            core = self._cores.get(path)
+            if core is None:
+                core = type(self.git)(path)
+                # 路径解析缓存与仓库无关，可在工作树之间共享
+                core._path_cache = self.git._path_cache
+                self._cores[path] = core
+            return core
+
+    def cached_snapshot(self, path: str) -> Optional[Tuple[StatusSnapshot, float]]:
+        """获取缓存的 (快照, 刷新时间)"""
+        with self._lock:
+            return self._snapshots.get(os.path.normpath(path))
+
+    def store_snapshot(self, path: str, snapshot: StatusSnapshot):
+        """更新工作树的快照缓存（前台刷新后调用）"""
+        with self._lock:
+            self._snapshots[os.path.normpath(path)] = (snapshot, time.time())
+
+    def refresh_all(self, jobs: Optional[int] = None) -> Dict[str, Tuple[Optional[StatusSnapshot], float]]:
+        """
+        并发刷新所有工作树的状态
+
+        Returns:
+            工作树路径 -> (快照或 None, 耗时毫秒)
+        """
+        worktrees = [wt for wt in self.worktrees if not wt.prunable]
+        if not worktrees:
+            return {}
+
+        def refresh(path: str) -> Tuple[str, Optional[StatusSnapshot], float]:
+            started = time.perf_counter()
+            core = self.core_for(path)
+            if not os.path.isdir(path):
+                return path, None, 0.0
+            snapshot = core.get_status_snapshot(optional_locks=False)
+            self.store_snapshot(path, snapshot)
+            return path, snapshot, (time.perf_counter() - started) * 1000
+
+        workers = max(1, min(jobs or Config.WORKTREE_STATUS_JOBS, len(worktrees)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(refresh, [wt.path for wt in worktrees]))
+        return {path: (snapshot, elapsed) for path, snapshot, elapsed in results}